@@ -0,0 +1,234 @@
+"""
+Admission control for the database-backed actions.
+
+A single conversation stuck in a loop (for example a WhatsApp thread through the
+twilio channel) can otherwise fill the connection pool and slow everyone down.
+Before a guarded action touches the database it has to pass two checks:
+
+    - a token bucket per tracker.sender_id, refilled at ACTION_RATE_LIMIT_PER_SECOND
+      up to ACTION_RATE_LIMIT_BURST runs
+    - a cap of ACTION_MAX_CONCURRENCY runs in flight across the process, where a run
+      that waits longer than ACTION_MAX_QUEUE_MS for a slot is shed
+
+A rejected run answers with utter_busy and returns without using the pool or the
+database executor. The limits apply per action server process, and each launcher
+worker has its own. Rejections are counted in rasa_action_shed_total{action, reason}.
+"""
+import os
+import time
+import asyncio
+import logging
+import functools
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Optional, Tuple
+
+from monitoring.metrics import REGISTRY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_PER_SECOND = float(os.getenv("ACTION_RATE_LIMIT_PER_SECOND", "2"))  # 0 disables the per-sender limit
+RATE_LIMIT_BURST = float(os.getenv("ACTION_RATE_LIMIT_BURST", "10"))
+# Senders whose buckets are kept; the least recently seen are forgotten (and start full again)
+RATE_LIMIT_SENDERS = int(os.getenv("ACTION_RATE_LIMIT_SENDERS", "10000"))
+# 0 disables the cap; unset means twice the pool size limit (see default_max_concurrency())
+_MAX_CONCURRENCY_SETTING = os.getenv("ACTION_MAX_CONCURRENCY")
+MAX_CONCURRENCY = int(_MAX_CONCURRENCY_SETTING) if _MAX_CONCURRENCY_SETTING else None
+MAX_QUEUE_SECONDS = float(os.getenv("ACTION_MAX_QUEUE_MS", "250")) / 1000
+
+BUSY_RESPONSE = "utter_busy"
+
+ACTIONS_SHED = REGISTRY.counter(
+    "rasa_action_shed_total", "Guarded action runs rejected before touching the database", ["action", "reason"])
+ACTION_QUEUE_WAIT = REGISTRY.histogram(
+    "rasa_action_queue_wait_seconds", "Time admitted action runs waited for a concurrency slot", ["action"])
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by sender.
+
+    Each key holds up to burst tokens and regains rate tokens per second; a run
+    takes one. Only used from the event loop, so there is no locking.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_PER_SECOND, burst: float = RATE_LIMIT_BURST,
+                 max_keys: int = RATE_LIMIT_SENDERS):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_keys = max_keys
+        # key -> (tokens, monotonic time of the last update), least recently seen first
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def allow(self, key: str, now: Optional[float] = None) -> bool:
+        """
+        Take a token for key if one is available.
+
+        Args:
+            key: Sender ID
+            now: Monotonic time (default: now)
+
+        Returns:
+            True if the run may proceed
+        """
+        if not self.enabled:
+            return True
+        now = time.monotonic() if now is None else now
+        tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+def default_max_concurrency() -> int:
+    """
+    Default cap on runs in flight. Actions spend part of a run outside the database,
+    so allow somewhat more runs than connections.
+
+    db.connection (and psycopg2) is imported here rather than at module level, because
+    rasa_sdk imports this module with the action package at startup.
+    """
+    from db.connection import POOL_SIZE_LIMIT
+    return 2 * POOL_SIZE_LIMIT
+
+
+class ConcurrencyLimiter:
+    """
+    Caps how many runs are in flight, queueing the rest in FIFO order for a bounded time.
+
+    Slots are handed straight to the oldest waiter on release, so a run that has
+    waited longest is admitted first and a newcomer cannot jump the queue.
+    """
+
+    def __init__(self, limit: Optional[int] = MAX_CONCURRENCY, max_queue_seconds: float = MAX_QUEUE_SECONDS):
+        """
+        Initialize the limiter.
+
+        Args:
+            limit: Runs allowed in flight; 0 disables the cap, None means default_max_concurrency(),
+                   resolved on the first run
+            max_queue_seconds: Longest a run waits for a slot before it is shed
+        """
+        self._limit = limit
+        self.max_queue_seconds = max_queue_seconds
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        if self._limit is None:
+            self._limit = default_max_concurrency()
+        return self._limit
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """
+        Wait up to max_queue_seconds for a slot.
+
+        Returns:
+            True if a slot was taken (call release() when done), False if the run should be shed
+        """
+        if not self.enabled:
+            return True
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            return True
+        if self.max_queue_seconds <= 0:
+            return False
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        timer = loop.call_later(self.max_queue_seconds, self._expire, waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the caller was cancelled
+            if not waiter.cancelled() and waiter.result():
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(False)
+
+    def release(self) -> None:
+        """Give the slot to the oldest live waiter, or free it."""
+        if not self.enabled:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.in_flight -= 1
+
+
+sender_limiter = TokenBucketLimiter()
+concurrency_limiter = ConcurrencyLimiter()
+
+
+def admit_action(run: Callable) -> Callable:
+    """
+    Decorator for async Action.run methods that use the database. It applies the
+    per-sender rate limit and the concurrency cap, and answers utter_busy instead
+    of running when either rejects the run.
+
+    Place it above @instrument_action, so shed runs stay out of the action latency histogram.
+
+    Example:
+        ```python
+        class ActionListReminders(Action):
+            @admit_action
+            @instrument_action
+            async def run(self, dispatcher, tracker, domain):
+                ...
+        ```
+    """
+    @functools.wraps(run)
+    async def wrapper(self, dispatcher: Any, tracker: Any, domain: Any) -> Any:
+        action_name = self.name()
+        if not sender_limiter.allow(tracker.sender_id):
+            ACTIONS_SHED.inc(action_name, "rate_limited")
+            logger.info(f"Rate limited {action_name} for sender {tracker.sender_id}")
+            dispatcher.utter_message(response=BUSY_RESPONSE)
+            return []
+
+        started = time.perf_counter()
+        if not await concurrency_limiter.acquire():
+            ACTIONS_SHED.inc(action_name, "overloaded")
+            logger.warning(f"Shed {action_name}: {concurrency_limiter.in_flight} runs in flight, "
+                           f"{concurrency_limiter.waiting} waiting")
+            dispatcher.utter_message(response=BUSY_RESPONSE)
+            return []
+        ACTION_QUEUE_WAIT.observe(time.perf_counter() - started, action_name)
+
+        try:
+            return await run(self, dispatcher, tracker, domain)
+        finally:
+            concurrency_limiter.release()
+    return wrapper
@@ -1 +1,73 @@
- 
\ No newline at end of file
+"""
+Twilio messaging service used to deliver reminder notifications over SMS/WhatsApp.
+"""
+import os
+import logging
+from typing import Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class TwilioService:
+    """
+    Thin wrapper around the Twilio REST client.
+    The client is created lazily so importing this module never requires credentials.
+    """
+
+    def __init__(self, account_sid: Optional[str] = None, auth_token: Optional[str] = None,
+                 from_number: Optional[str] = None):
+        """
+        Initialize the service from explicit values or environment variables.
+
+        Args:
+            account_sid: Twilio account SID (default: TWILIO_ACCOUNT_SID)
+            auth_token: Twilio auth token (default: TWILIO_AUTH_TOKEN)
+            from_number: Sender number (default: TWILIO_PHONE_NUMBER)
+        """
+        self.account_sid = account_sid or os.getenv("TWILIO_ACCOUNT_SID")
+        self.auth_token = auth_token or os.getenv("TWILIO_AUTH_TOKEN")
+        self.from_number = from_number or os.getenv("TWILIO_PHONE_NUMBER")
+        self.whatsapp_number = os.getenv("TWILIO_WHATSAPP_NUMBER")
+        self._client = None
+
+    @property
+    def is_configured(self) -> bool:
+        """Whether credentials and a sender number are available."""
+        return bool(self.account_sid and self.auth_token and (self.from_number or self.whatsapp_number))
+
+    def _get_client(self):
+        if self._client is None:
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    def _sender_for(self, to: str) -> Optional[str]:
+        """Pick the WhatsApp sender for whatsapp: recipients, the SMS number otherwise."""
+        if to.startswith("whatsapp:"):
+            return self.whatsapp_number or f"whatsapp:{self.from_number}"
+        return self.from_number
+
+    def send_message(self, to: str, body: str) -> Optional[str]:
+        """
+        Send a message to a single recipient.
+
+        Args:
+            to: Destination number, optionally prefixed with "whatsapp:"
+            body: Message text
+
+        Returns:
+            The Twilio message SID, or None if the message could not be sent
+        """
+        if not self.is_configured:
+            logger.error("Twilio is not configured; cannot send message")
+            return None
+
+        try:
+            message = self._get_client().messages.create(to=to, from_=self._sender_for(to), body=body)
+            logger.info(f"Sent message {message.sid} to {to}")
+            return message.sid
+        except Exception as e:
+            logger.error(f"Failed to send message to {to}: {e}")
+            return None
@@ -0,0 +1,3 @@
+"""
+Benchmark and load-testing tools for the reminder bot.
+"""
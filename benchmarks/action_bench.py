@@ -0,0 +1,281 @@
+"""
+Action-server micro-benchmark.
+
+Runs the custom actions in-process, with hand-built Trackers and a
+CollectingDispatcher, against a seeded PostgreSQL database. This skips the
+Rasa server and the HTTP hop. Each scenario is run many times at a fixed
+concurrency, and ops/sec and latency percentiles are reported. The dataset is
+reseeded with a fixed seed before every run, and the JSON report records the
+commit and settings, so results from different commits can be compared.
+
+    python -m benchmarks.action_bench --reminders 100000 --concurrency 32 --iterations 2000 --output bench.json
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import logging
+import platform
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+from rasa_sdk import Action, Tracker
+from rasa_sdk.executor import CollectingDispatcher
+
+from actions.admission import BUSY_RESPONSE
+from actions.actions import (
+    ActionListReminders,
+    ActionWhatsNext,
+    ActionDeleteReminder,
+    ActionSnoozeReminder,
+    ActionRescheduleReminder,
+    ValidateReminderForm,
+)
+from benchmarks.seed import seed_dataset, sender_id_for, TASKS, DEFAULT_SENDER_PREFIX
+from benchmarks.stats import summarize, format_table
+from db.connection import DatabaseConnectionPool, POOL_SIZE_LIMIT
+from db.models.sender import forget_sender
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ERROR_TEXT_PREFIX = "Sorry, I encountered an error"
+
+# A scenario builds the tracker for one invocation: (rng, sender_id, slot names) -> Tracker
+TrackerBuilder = Callable[[random.Random, str, List[str]], Tracker]
+
+
+def build_tracker(sender_id: str, slot_names: List[str], slots: Optional[Dict[str, Any]] = None,
+                  intent: Optional[str] = None, text: str = "", events: Optional[List[Dict[str, Any]]] = None,
+                  active_loop: Optional[str] = None) -> Tracker:
+    """
+    Build a Tracker as the action server would receive it from Rasa.
+
+    Args:
+        sender_id: Conversation ID
+        slot_names: All slots in the domain (unset ones are None)
+        slots: Slot values to set
+        intent: Intent of the latest user message
+        text: Text of the latest user message
+        events: Conversation events (e.g. slot events for form validation)
+        active_loop: Name of the active form, if any
+
+    Returns:
+        Tracker instance
+    """
+    return Tracker.from_dict({
+        "sender_id": sender_id,
+        "slots": dict({name: None for name in slot_names}, **(slots or {})),
+        "latest_message": {"intent": {"name": intent, "confidence": 1.0}, "entities": [], "text": text},
+        "events": events or [],
+        "paused": False,
+        "followup_action": None,
+        "active_loop": {"name": active_loop} if active_loop else {},
+        "latest_action_name": "action_listen",
+    })
+
+
+def _list_tracker(rng: random.Random, sender_id: str, slot_names: List[str]) -> Tracker:
+    return build_tracker(sender_id, slot_names, intent="list_reminders", text="show my reminders")
+
+
+def _whats_next_tracker(rng: random.Random, sender_id: str, slot_names: List[str]) -> Tracker:
+    return build_tracker(sender_id, slot_names, intent="ask_whats_next", text="what's next")
+
+
+def _delete_missing_tracker(rng: random.Random, sender_id: str, slot_names: List[str]) -> Tracker:
+    # ID 0 never exists: exercises sender resolution and the DELETE without changing the dataset
+    return build_tracker(sender_id, slot_names, slots={"reminder_id": "0"}, intent="provide_reminder_id", text="0")
+
+
+def _delete_by_description_tracker(rng: random.Random, sender_id: str, slot_names: List[str]) -> Tracker:
+    task = rng.choice(TASKS)
+    return build_tracker(sender_id, slot_names, slots={"task": task}, intent="delete_reminder",
+                         text=f"delete the {task} reminder")
+
+
+def _snooze_tracker(rng: random.Random, sender_id: str, slot_names: List[str]) -> Tracker:
+    return build_tracker(sender_id, slot_names, slots={"duration": "10 minutes"}, intent="snooze_reminder",
+                         text="snooze 10 minutes")
+
+
+def _reschedule_tracker(rng: random.Random, sender_id: str, slot_names: List[str]) -> Tracker:
+    return build_tracker(sender_id, slot_names, slots={"date": "tomorrow", "time": f"{rng.randint(7, 20)}:00"},
+                         intent="reschedule_reminder", text="move it to tomorrow")
+
+
+def _validate_form_tracker(rng: random.Random, sender_id: str, slot_names: List[str]) -> Tracker:
+    task = rng.choice(TASKS)
+    events = [
+        {"event": "action", "name": "action_listen"},
+        {"event": "user", "text": task, "parse_data": {"intent": {"name": "provide_task"}, "entities": []}},
+        {"event": "slot", "name": "task", "value": task},
+        {"event": "slot", "name": "time_zone", "value": "Europe/Berlin"},
+    ]
+    return build_tracker(sender_id, slot_names, slots={"task": task, "time_zone": "Europe/Berlin",
+                                                        "requested_slot": "task"},
+                         intent="provide_task", text=task, events=events, active_loop="reminder_form")
+
+
+# name -> (action class, tracker builder, whether it changes the dataset)
+SCENARIOS: Dict[str, Tuple[Callable[[], Action], TrackerBuilder, bool]] = {
+    "list_reminders": (ActionListReminders, _list_tracker, False),
+    "whats_next": (ActionWhatsNext, _whats_next_tracker, False),
+    "delete_missing_id": (ActionDeleteReminder, _delete_missing_tracker, False),
+    "delete_by_description": (ActionDeleteReminder, _delete_by_description_tracker, True),
+    "snooze": (ActionSnoozeReminder, _snooze_tracker, True),
+    "reschedule": (ActionRescheduleReminder, _reschedule_tracker, True),
+    "validate_reminder_form": (ValidateReminderForm, _validate_form_tracker, False),
+}
+
+
+def load_domain(path: str = "domain.yml") -> Dict[str, Any]:
+    with open(path) as domain_file:
+        return yaml.safe_load(domain_file) or {}
+
+
+async def run_scenario(name: str, domain: Dict[str, Any], num_users: int, iterations: int, concurrency: int,
+                       seed: int, sender_prefix: str, cold_sender_cache: bool = False) -> Dict[str, Any]:
+    """
+    Invoke one scenario's action repeatedly at a fixed concurrency.
+
+    Args:
+        name: Key of SCENARIOS
+        domain: Parsed domain.yml
+        num_users: Number of seeded users to spread invocations over
+        iterations: Invocations to measure
+        concurrency: Invocations in flight at once
+        seed: Random seed for user and slot choices
+        sender_prefix: Sender ID prefix of the seeded users
+        cold_sender_cache: Clear the sender cache before every invocation
+
+    Returns:
+        Latency summary plus ops/sec, error count and the number of runs shed by
+        admission control (actions/admission.py), which are left out of the latencies
+    """
+    action_class, tracker_builder, _ = SCENARIOS[name]
+    action = action_class()
+    slot_names = list((domain.get("slots") or {}).keys())
+    rng = random.Random(seed)
+    trackers = [tracker_builder(rng, sender_id_for(rng.randrange(num_users), sender_prefix), slot_names)
+                for _ in range(iterations)]
+
+    latencies: List[float] = []
+    errors = 0
+    shed = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def invoke(tracker: Tracker) -> None:
+        nonlocal errors, shed
+        async with semaphore:
+            if cold_sender_cache:
+                forget_sender(tracker.sender_id)
+            dispatcher = CollectingDispatcher()
+            started = time.perf_counter()
+            try:
+                await action.run(dispatcher, tracker, domain)
+            except Exception as e:
+                logger.debug(f"{name} raised: {e}")
+                errors += 1
+                return
+            if any(message.get("response") == BUSY_RESPONSE for message in dispatcher.messages):
+                shed += 1
+                return
+            latencies.append(time.perf_counter() - started)
+            if any((message.get("text") or "").startswith(ERROR_TEXT_PREFIX) for message in dispatcher.messages):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(invoke(tracker) for tracker in trackers))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies)
+    result.update({"ops_per_second": round(iterations / elapsed, 2) if elapsed else 0.0, "errors": errors,
+                   "shed": shed})
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    domain = load_domain(args.domain)
+    num_users = args.users or max(1, args.reminders // 50)
+    scenarios = args.scenarios or list(SCENARIOS)
+
+    report: Dict[str, Any] = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "settings": {
+            "reminders": args.reminders, "users": num_users, "seed": args.seed, "iterations": args.iterations,
+            "concurrency": args.concurrency, "warmup": args.warmup, "cold_sender_cache": args.cold_sender_cache,
+            "db_pool_limit": POOL_SIZE_LIMIT,
+        },
+        "scenarios": {},
+    }
+
+    def reseed() -> None:
+        if not args.no_seed:
+            seed_dataset(args.reminders, num_users, sender_prefix=args.sender_prefix, seed=args.seed)
+            # Reseeding recreates the users, so cached sender mappings point at deleted ones
+            forget_sender()
+
+    # Reseed after anything that wrote, including a scenario's own warm-up, so each scenario
+    # of every commit measures the same data. Warm-ups run on whatever data is there.
+    reseed()
+    dataset_changed = False
+    for name in scenarios:
+        writes = SCENARIOS[name][2]
+        if args.warmup:
+            await run_scenario(name, domain, num_users, args.warmup, args.concurrency, args.seed + 1,
+                               args.sender_prefix, args.cold_sender_cache)
+            dataset_changed = dataset_changed or writes
+        if dataset_changed:
+            reseed()
+        dataset_changed = writes
+        report["scenarios"][name] = await run_scenario(name, domain, num_users, args.iterations, args.concurrency,
+                                                       args.seed, args.sender_prefix, args.cold_sender_cache)
+        logger.info(f"{name}: {report['scenarios'][name]}")
+
+    report["pool"] = DatabaseConnectionPool().stats()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark custom actions in-process against a seeded database")
+    parser.add_argument("--reminders", type=int, default=100000, help="Reminders to seed")
+    parser.add_argument("--users", type=int, default=None, help="Users to seed (default: reminders / 50)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the dataset and invocations")
+    parser.add_argument("--sender-prefix", default=DEFAULT_SENDER_PREFIX, help="Sender ID prefix of benchmark users")
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the existing benchmark dataset")
+    parser.add_argument("-n", "--iterations", type=int, default=2000, help="Measured invocations per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="Invocations in flight at once")
+    parser.add_argument("--warmup", type=int, default=100, help="Unmeasured invocations before each scenario")
+    parser.add_argument("--cold-sender-cache", action="store_true", help="Clear the sender cache before each call")
+    parser.add_argument("--scenarios", nargs="*", choices=list(SCENARIOS), help="Scenarios to run (default: all)")
+    parser.add_argument("--domain", default="domain.yml", help="Domain file passed to the actions")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+
+    print(f"\nCommit {report['commit']}, {args.reminders} reminders, concurrency {args.concurrency}\n")
+    print(format_table(report["scenarios"], label="scenario"))
+    print("\n" + "\n".join(f"{name}: {result['ops_per_second']} ops/s, {result['errors']} errors, {result['shed']} shed"
+                           for name, result in report["scenarios"].items()))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, default=str)
+        logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
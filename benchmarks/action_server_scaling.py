@@ -0,0 +1,234 @@
+"""
+Action server scaling benchmark.
+
+Starts the multi-worker launcher (server/launcher.py) with increasing worker
+counts and drives POST /webhook over HTTP with the action_bench scenarios at a
+fixed concurrency. Reports throughput and latency per worker count, plus the
+speedup and scaling efficiency relative to the smallest worker count. The
+connection budget stays the same for every run, so the results show how well
+the extra cores are used, not the effect of extra database connections.
+
+    python -m benchmarks.action_server_scaling --workers 1 2 4 8 --requests 4000 --concurrency 64 --output scaling.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import logging
+import platform
+import subprocess
+from typing import Any, Dict, List
+
+import aiohttp
+import rasa_sdk
+
+from actions.admission import BUSY_RESPONSE
+from benchmarks.action_bench import SCENARIOS, ERROR_TEXT_PREFIX, load_domain, _git_commit
+from benchmarks.seed import seed_dataset, sender_id_for, DEFAULT_SENDER_PREFIX
+from benchmarks.stats import summarize, format_table
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCENARIOS = ["validate_reminder_form", "list_reminders", "whats_next"]
+
+
+def build_payloads(name: str, domain: Dict[str, Any], num_users: int, count: int, seed: int,
+                   sender_prefix: str) -> List[Dict[str, Any]]:
+    """
+    Build webhook request bodies for a scenario, as the Rasa server would send them.
+
+    Args:
+        name: Key of action_bench.SCENARIOS
+        domain: Parsed domain.yml
+        num_users: Number of seeded users to spread requests over
+        count: Number of payloads
+        seed: Random seed for user and slot choices
+        sender_prefix: Sender ID prefix of the seeded users
+
+    Returns:
+        JSON bodies for POST /webhook
+    """
+    action_class, tracker_builder, _ = SCENARIOS[name]
+    action_name = action_class().name()
+    slot_names = list((domain.get("slots") or {}).keys())
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        sender_id = sender_id_for(rng.randrange(num_users), sender_prefix)
+        tracker = tracker_builder(rng, sender_id, slot_names)
+        payloads.append({"next_action": action_name, "sender_id": sender_id, "tracker": tracker.current_state(),
+                         "domain": domain, "version": rasa_sdk.__version__})
+    return payloads
+
+
+async def wait_healthy(url: str, timeout: float) -> None:
+    """Poll the action server's /health until it answers."""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"Action server at {url} did not become healthy within {timeout}s")
+
+
+async def drive(url: str, payloads: List[Dict[str, Any]], concurrency: int, timeout: float) -> Dict[str, Any]:
+    """
+    Send every payload to /webhook with a fixed number of requests in flight.
+
+    Returns:
+        Latency summary plus ops/sec, error count and the number of requests shed by admission control
+    """
+    latencies: List[float] = []
+    errors = 0
+    shed = 0
+    queue = list(reversed(payloads))
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async def worker() -> None:
+            nonlocal errors, shed
+            while queue:
+                payload = queue.pop()
+                started = time.perf_counter()
+                try:
+                    async with session.post(f"{url}/webhook", json=payload) as response:
+                        body = await response.json()
+                        ok = response.status == 200
+                except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    logger.debug(f"Request failed: {e}")
+                    errors += 1
+                    continue
+                messages = body.get("responses", []) if ok else []
+                if any(message.get("response") == BUSY_RESPONSE for message in messages):
+                    shed += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if not ok or any((message.get("text") or "").startswith(ERROR_TEXT_PREFIX) for message in messages):
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    result = summarize(latencies)
+    result.update({"ops_per_second": round(len(payloads) / elapsed, 2) if elapsed else 0.0, "errors": errors,
+                   "shed": shed})
+    return result
+
+
+def start_launcher(workers: int, port: int, pool_budget: int) -> subprocess.Popen:
+    """Start server.launcher with the given worker count."""
+    command = [sys.executable, "-m", "server.launcher", "--workers", str(workers), "--port", str(port),
+               "--pool-budget", str(pool_budget)]
+    return subprocess.Popen(command, start_new_session=True)
+
+
+def stop_launcher(process: subprocess.Popen) -> None:
+    """Shut the launcher and its workers down gracefully."""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(60)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    domain = load_domain(args.domain)
+    num_users = args.users or max(1, args.reminders // 50)
+    url = f"http://127.0.0.1:{args.port}"
+    report: Dict[str, Any] = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "reminders": args.reminders, "users": num_users, "seed": args.seed, "requests": args.requests,
+            "concurrency": args.concurrency, "warmup": args.warmup, "pool_budget": args.pool_budget,
+            "workers": args.workers, "scenarios": args.scenarios,
+        },
+        "runs": {},
+    }
+
+    writes = any(SCENARIOS[name][2] for name in args.scenarios)
+    for index, workers in enumerate(args.workers):
+        if not args.no_seed and (index == 0 or writes):
+            seed_dataset(args.reminders, num_users, sender_prefix=args.sender_prefix, seed=args.seed)
+
+        launcher = start_launcher(workers, args.port, args.pool_budget)
+        try:
+            await wait_healthy(url, args.startup_timeout)
+            results = {}
+            for name in args.scenarios:
+                if args.warmup:
+                    await drive(url, build_payloads(name, domain, num_users, args.warmup, args.seed + 1,
+                                                    args.sender_prefix), args.concurrency, args.timeout)
+                payloads = build_payloads(name, domain, num_users, args.requests, args.seed, args.sender_prefix)
+                results[name] = await drive(url, payloads, args.concurrency, args.timeout)
+                logger.info(f"{workers} workers, {name}: {results[name]}")
+            report["runs"][str(workers)] = results
+        finally:
+            stop_launcher(launcher)
+
+    # Speedup and efficiency against the first (smallest) worker count
+    base_workers = args.workers[0]
+    base = report["runs"][str(base_workers)]
+    for workers in args.workers:
+        for name, result in report["runs"][str(workers)].items():
+            speedup = result["ops_per_second"] / base[name]["ops_per_second"] if base[name]["ops_per_second"] else 0.0
+            result["speedup"] = round(speedup, 2)
+            result["efficiency"] = round(speedup / (workers / base_workers), 2)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure action server throughput across worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to run, ascending")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=DEFAULT_SCENARIOS,
+                        help="action_bench scenarios to send")
+    parser.add_argument("--reminders", type=int, default=100000, help="Reminders to seed")
+    parser.add_argument("--users", type=int, default=None, help="Users to seed (default: reminders / 50)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the dataset and requests")
+    parser.add_argument("--sender-prefix", default=DEFAULT_SENDER_PREFIX, help="Sender ID prefix of benchmark users")
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the existing benchmark dataset")
+    parser.add_argument("-n", "--requests", type=int, default=4000, help="Measured requests per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=64, help="Requests in flight at once")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests before each scenario")
+    parser.add_argument("--pool-budget", type=int, default=20, help="DB connections shared by all workers")
+    parser.add_argument("--port", type=int, default=5155, help="Port for the benchmarked action server")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=120, help="Seconds to wait for the workers")
+    parser.add_argument("--domain", default="domain.yml", help="Domain file sent with each request")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+    args.workers = sorted(set(args.workers))
+
+    report = asyncio.run(run_benchmark(args))
+
+    rows = {f"{name} x{workers}": result for workers, results in report["runs"].items()
+            for name, result in results.items()}
+    print(f"\nCommit {report['commit']}, {report['cpus']} CPUs, concurrency {args.concurrency}, "
+          f"pool budget {args.pool_budget}\n")
+    print(format_table(rows, label="scenario x workers"))
+    print("\n" + "\n".join(f"{row}: {result['ops_per_second']} ops/s, speedup {result['speedup']}, "
+                           f"efficiency {result['efficiency']}, {result['errors']} errors, {result['shed']} shed"
+                           for row, result in rows.items()))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, default=str)
+        logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+End-to-end conversation load generator.
+
+Turns the stories in data/stories.yml into synthetic conversations, filling each
+user turn with a random example of its intent from data/nlu.yml, and replays
+them against the REST channel with many distinct sender IDs concurrently.
+Reports turn latency percentiles, throughput and a per-intent breakdown.
+
+Start the bot with the in-memory tracker store first, so conversation state
+does not pile up in PostgreSQL:
+
+    rasa run --enable-api -m models --endpoints benchmarks/endpoints.loadtest.yml
+    python -m server --actions actions
+
+Then run:
+
+    python -m benchmarks.load_conversations --conversations 2000 --concurrency 100
+"""
+import re
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+import aiohttp
+
+from benchmarks.stats import summarize, format_table
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = "http://localhost:5005/webhooks/rest/webhook"
+
+# [text](entity), [text]{"entity": ...} and [text]{...}(...) annotations in NLU examples
+_ENTITY_ANNOTATION = re.compile(r"\[([^\]]+)\](?:\([^)]*\)|\{[^}]*\})")
+
+Turn = Tuple[str, str]  # (intent, message text)
+
+
+def strip_annotations(example: str) -> str:
+    """
+    Remove entity markup from an NLU example, keeping the annotated text.
+
+    Args:
+        example: Example such as "Remind me to [call mom](task)"
+
+    Returns:
+        Plain message text
+    """
+    return _ENTITY_ANNOTATION.sub(r"\1", example).strip()
+
+
+def load_nlu_examples(path: str) -> Dict[str, List[str]]:
+    """
+    Read intent examples from an NLU training file.
+
+    Args:
+        path: Path to nlu.yml
+
+    Returns:
+        Mapping of intent name to plain example messages
+    """
+    with open(path) as nlu_file:
+        data = yaml.safe_load(nlu_file) or {}
+
+    examples: Dict[str, List[str]] = defaultdict(list)
+    for item in data.get("nlu", []):
+        intent = item.get("intent")
+        if not intent:
+            continue
+        for line in (item.get("examples") or "").splitlines():
+            line = line.strip()
+            if line.startswith("- "):
+                examples[intent].append(strip_annotations(line[2:]))
+    return dict(examples)
+
+
+def load_story_intents(path: str) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Read the user turns of each story.
+
+    Args:
+        path: Path to stories.yml
+
+    Returns:
+        List of (story name, user steps); each step has "intent" and optionally "user" text
+    """
+    with open(path) as stories_file:
+        data = yaml.safe_load(stories_file) or {}
+
+    stories = []
+    for story in data.get("stories", []):
+        steps = [step for step in story.get("steps", []) if isinstance(step, dict) and "intent" in step]
+        if steps:
+            stories.append((story.get("story", "unnamed"), steps))
+    return stories
+
+
+class ConversationGenerator:
+    """Builds randomized conversations from stories and NLU examples."""
+
+    def __init__(self, stories: List[Tuple[str, List[Dict[str, Any]]]], examples: Dict[str, List[str]],
+                 seed: Optional[int] = None):
+        """
+        Initialize the generator.
+
+        Args:
+            stories: Output of load_story_intents()
+            examples: Output of load_nlu_examples()
+            seed: Random seed for reproducible runs
+        """
+        self.stories = [(name, steps) for name, steps in stories
+                        if all(step.get("user") or examples.get(step["intent"]) for step in steps)]
+        skipped = [name for name, _ in stories if name not in {kept for kept, _ in self.stories}]
+        if skipped:
+            logger.warning(f"Skipping stories with intents that have no NLU examples: {', '.join(skipped)}")
+        if not self.stories:
+            raise ValueError("No stories can be turned into conversations")
+        self.examples = examples
+        self.random = random.Random(seed)
+
+    def conversation(self) -> Tuple[str, List[Turn]]:
+        """
+        Generate one conversation.
+
+        Returns:
+            Tuple of (story name, list of (intent, message) turns)
+        """
+        name, steps = self.random.choice(self.stories)
+        turns = []
+        for step in steps:
+            text = step.get("user") or self.random.choice(self.examples[step["intent"]])
+            turns.append((step["intent"], strip_annotations(text)))
+        return name, turns
+
+
+class LoadResults:
+    """Collects per-turn outcomes of a load run."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.conversations = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, intent: str, latency: float, ok: bool) -> None:
+        if ok:
+            self.latencies[intent].append(latency)
+        else:
+            self.errors[intent] += 1
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Summarize the run.
+
+        Returns:
+            Dictionary with overall and per-intent latency summaries, throughput and errors
+        """
+        all_latencies = [latency for values in self.latencies.values() for latency in values]
+        turns = len(all_latencies) + sum(self.errors.values())
+        return {
+            "conversations": self.conversations,
+            "turns": turns,
+            "errors": sum(self.errors.values()),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "turns_per_second": round(turns / self.elapsed, 2) if self.elapsed else 0.0,
+            "overall": summarize(all_latencies),
+            "by_intent": {intent: dict(summarize(self.latencies.get(intent, [])), errors=self.errors.get(intent, 0))
+                          for intent in sorted(set(self.latencies) | set(self.errors))},
+        }
+
+
+async def run_conversation(session: aiohttp.ClientSession, url: str, sender_id: str, turns: List[Turn],
+                           results: LoadResults, think_time: float, rng: random.Random) -> None:
+    """
+    Send a conversation's turns in order, waiting for each reply.
+
+    Args:
+        session: HTTP session
+        url: REST webhook URL
+        sender_id: Conversation ID
+        turns: (intent, message) pairs
+        results: Collector for latencies and errors
+        think_time: Maximum random pause between turns, in seconds
+        rng: Random source for think time
+    """
+    for intent, message in turns:
+        started = time.perf_counter()
+        try:
+            async with session.post(url, json={"sender": sender_id, "message": message}) as response:
+                await response.read()
+                ok = response.status == 200
+                if not ok:
+                    logger.debug(f"{sender_id}: HTTP {response.status} for '{message}'")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.debug(f"{sender_id}: request failed for '{message}': {e}")
+            ok = False
+        results.record(intent, time.perf_counter() - started, ok)
+        if think_time:
+            await asyncio.sleep(rng.uniform(0, think_time))
+    results.conversations += 1
+
+
+async def run_load(url: str, generator: ConversationGenerator, conversations: int, concurrency: int,
+                   think_time: float = 0.0, timeout: float = 30.0, duration: Optional[float] = None) -> LoadResults:
+    """
+    Replay generated conversations with a fixed number of concurrent users.
+
+    Args:
+        url: REST webhook URL
+        generator: Source of conversations
+        conversations: Number of conversations (distinct sender IDs) to run
+        concurrency: Conversations in flight at once
+        think_time: Maximum random pause between a user's turns, in seconds
+        timeout: Per-request timeout in seconds
+        duration: Stop starting new conversations after this many seconds
+
+    Returns:
+        Collected results
+    """
+    results = LoadResults()
+    run_id = uuid.uuid4().hex[:8]
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(conversations):
+        queue.put_nowait((f"loadtest-{run_id}-{index}", generator.conversation()[1]))
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        async def worker(worker_id: int) -> None:
+            rng = random.Random(worker_id)
+            while not queue.empty():
+                if duration and results.elapsed >= duration:
+                    return
+                sender_id, turns = queue.get_nowait()
+                await run_conversation(session, url, sender_id, turns, results, think_time, rng)
+
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+
+    results.finished = time.perf_counter()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay synthetic conversations against the REST webhook")
+    parser.add_argument("--url", default=DEFAULT_URL, help="REST channel webhook URL")
+    parser.add_argument("--stories", default="data/stories.yml", help="Stories file")
+    parser.add_argument("--nlu", default="data/nlu.yml", help="NLU training data file")
+    parser.add_argument("-n", "--conversations", type=int, default=1000, help="Conversations (distinct senders) to run")
+    parser.add_argument("-c", "--concurrency", type=int, default=50, help="Concurrent conversations")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Maximum pause between turns (seconds)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--duration", type=float, default=None, help="Stop starting conversations after N seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible conversations")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    generator = ConversationGenerator(load_story_intents(args.stories), load_nlu_examples(args.nlu), seed=args.seed)
+    logger.info(f"Running {args.conversations} conversations from {len(generator.stories)} stories "
+                f"with concurrency {args.concurrency} against {args.url}")
+
+    results = asyncio.run(run_load(args.url, generator, args.conversations, args.concurrency,
+                                   think_time=args.think_time, timeout=args.timeout, duration=args.duration))
+    report = results.report()
+
+    print(f"\n{report['conversations']} conversations, {report['turns']} turns in {report['elapsed_seconds']}s "
+          f"({report['turns_per_second']} turns/s), {report['errors']} errors\n")
+    print(format_table(dict([("ALL", report["overall"])] + list(report["by_intent"].items())), label="intent"))
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+NLU inference benchmark and pipeline profile comparison.
+
+`measure` loads a trained model and parses every example of an NLU file, timing
+the whole parse and each pipeline component separately:
+
+    python -m benchmarks.nlu_bench measure --model models/nlu.tar.gz --output nlu.json
+
+`compare` trains each pipeline profile in benchmarks/pipelines/ on the same
+stratified split of data/nlu.yml, then measures every model in its own process
+(so memory figures are not shared) on the held-out examples. The report gives
+latency percentiles, per-component time, memory, model size, training time and
+intent F1 per profile:
+
+    python -m benchmarks.nlu_bench compare --output nlu_profiles.json
+"""
+import os
+import sys
+import glob
+import json
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import logging
+import resource
+import tempfile
+import subprocess
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+from benchmarks.stats import summarize, format_table
+from benchmarks.load_conversations import strip_annotations, load_nlu_examples
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pipelines")
+# Training files other than nlu.yml that every profile needs (lookups, regexes, synonyms)
+SHARED_NLU_FILES = ["lookups.yml", "regex.yml", "synonyms.yml"]
+
+Example = Tuple[str, str]  # (message text, expected intent)
+
+
+class _TrainingDataDumper(yaml.SafeDumper):
+    """Writes multi-line strings as block literals, like the files in data/."""
+
+
+_TrainingDataDumper.add_representer(
+    str, lambda dumper, value: dumper.represent_scalar("tag:yaml.org,2002:str", value,
+                                                       style="|" if "\n" in value else None))
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def load_labelled_examples(path: str) -> List[Example]:
+    """
+    Read an NLU training file as (text, intent) pairs with entity markup removed.
+
+    Args:
+        path: Path to an NLU YAML file
+
+    Returns:
+        List of (message text, intent) pairs
+    """
+    return [(text, intent) for intent, texts in load_nlu_examples(path).items() for text in texts]
+
+
+def split_training_data(nlu_path: str, out_dir: str, holdout: float, seed: int) -> List[Example]:
+    """
+    Write a training data directory with a stratified share of each intent's examples held out.
+
+    Every intent keeps at least one training example. The shared lookup, regex and
+    synonym files next to nlu_path are copied unchanged.
+
+    Args:
+        nlu_path: Path to nlu.yml
+        out_dir: Directory to write the training files to
+        holdout: Fraction of each intent's examples to hold out
+        seed: Random seed for the split
+
+    Returns:
+        Held-out (text, intent) pairs
+    """
+    rng = random.Random(seed)
+    with open(nlu_path) as nlu_file:
+        data = yaml.safe_load(nlu_file) or {}
+
+    train_items = []
+    test_examples: List[Example] = []
+    for item in data.get("nlu", []):
+        intent = item.get("intent")
+        if not intent:
+            train_items.append(item)
+            continue
+        lines = [line.strip()[2:] for line in (item.get("examples") or "").splitlines()
+                 if line.strip().startswith("- ")]
+        rng.shuffle(lines)
+        held_out = min(int(round(len(lines) * holdout)), len(lines) - 1)
+        test_examples.extend((strip_annotations(line), intent) for line in lines[:held_out])
+        train_items.append(dict(item, examples="".join(f"- {line}\n" for line in lines[held_out:])))
+
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "nlu.yml"), "w") as train_file:
+        yaml.dump({"version": data.get("version", "3.1"), "nlu": train_items}, train_file,
+                  Dumper=_TrainingDataDumper, sort_keys=False, allow_unicode=True)
+    for name in SHARED_NLU_FILES:
+        shared_path = os.path.join(os.path.dirname(nlu_path), name)
+        if os.path.exists(shared_path):
+            shutil.copy(shared_path, out_dir)
+    return test_examples
+
+
+def intent_scores(expected: List[str], predicted: List[Optional[str]]) -> Dict[str, Any]:
+    """
+    Compute intent accuracy and F1. Fallback predictions count as misses.
+
+    Args:
+        expected: True intent per example
+        predicted: Predicted intent per example
+
+    Returns:
+        Dictionary with accuracy, macro_f1, weighted_f1 and per-intent precision/recall/F1/support
+    """
+    true_positives: Dict[str, int] = defaultdict(int)
+    predicted_counts: Dict[str, int] = defaultdict(int)
+    support: Dict[str, int] = defaultdict(int)
+    for truth, guess in zip(expected, predicted):
+        support[truth] += 1
+        predicted_counts[guess] += 1
+        if truth == guess:
+            true_positives[truth] += 1
+
+    per_intent = {}
+    for intent in sorted(support):
+        precision = true_positives[intent] / predicted_counts[intent] if predicted_counts[intent] else 0.0
+        recall = true_positives[intent] / support[intent]
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_intent[intent] = {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4),
+                              "support": support[intent]}
+
+    total = sum(support.values())
+    return {
+        "accuracy": round(sum(true_positives.values()) / total, 4) if total else 0.0,
+        "macro_f1": round(sum(s["f1"] for s in per_intent.values()) / len(per_intent), 4) if per_intent else 0.0,
+        "weighted_f1": round(sum(s["f1"] * s["support"] for s in per_intent.values()) / total, 4) if total else 0.0,
+        "per_intent": per_intent,
+    }
+
+
+def _component_timing_hook():
+    from rasa.engine.graph import GraphNodeHook
+
+    class ComponentTimingHook(GraphNodeHook):
+        """Records the wall time of every graph node execution."""
+
+        def __init__(self):
+            self.durations: Dict[str, List[float]] = defaultdict(list)
+
+        def on_before_node(self, node_name, execution_context, config, received_inputs) -> Dict[str, Any]:
+            return {"started": time.perf_counter()}
+
+        def on_after_node(self, node_name, execution_context, config, output, input_hook_data) -> None:
+            self.durations[node_name].append(time.perf_counter() - input_hook_data["started"])
+
+    return ComponentTimingHook()
+
+
+async def measure_model(model_path: str, examples: List[Example], repeat: int = 1,
+                        warmup: int = 20) -> Dict[str, Any]:
+    """
+    Load a model and time parse_message() over the examples.
+
+    Args:
+        model_path: Path to a trained model archive
+        examples: (text, intent) pairs to parse
+        repeat: Passes over the examples (intent scores use the first pass)
+        warmup: Unmeasured parses before timing starts
+
+    Returns:
+        Dictionary with load time, parse latency, per-component latency, memory and intent scores
+    """
+    from rasa.core.agent import Agent
+
+    rss_before_load = _peak_rss_mb()
+    started = time.perf_counter()
+    agent = Agent.load(model_path)
+    load_seconds = time.perf_counter() - started
+
+    # The graph runner does not expose its nodes; attach the hook to each one so every
+    # component's run is timed on its own
+    hook = _component_timing_hook()
+    for node in agent.processor.graph_runner._instantiated_nodes.values():
+        node._hooks.append(hook)
+
+    for text, _ in examples[:warmup]:
+        await agent.parse_message(text)
+    hook.durations.clear()
+
+    latencies: List[float] = []
+    predicted: List[Optional[str]] = []
+    for iteration in range(repeat):
+        for text, _ in examples:
+            started = time.perf_counter()
+            result = await agent.parse_message(text)
+            latencies.append(time.perf_counter() - started)
+            if iteration == 0:
+                predicted.append((result.get("intent") or {}).get("name"))
+
+    return {
+        "model": model_path,
+        "model_size_mb": round(os.path.getsize(model_path) / (1024 * 1024), 2),
+        "load_seconds": round(load_seconds, 3),
+        "parses_per_second": round(len(latencies) / sum(latencies), 2) if latencies else 0.0,
+        "parse": summarize(latencies),
+        "components": {name: summarize(values) for name, values in hook.durations.items()},
+        "peak_rss_mb": _peak_rss_mb(),
+        "model_rss_mb": round(_peak_rss_mb() - rss_before_load, 1),
+        "intent": intent_scores([intent for _, intent in examples], predicted),
+    }
+
+
+def train_profile(profile_path: str, data_dir: str, out_dir: str) -> Tuple[str, float]:
+    """
+    Train an NLU-only model for a pipeline profile with the rasa CLI.
+
+    Args:
+        profile_path: Pipeline config file
+        data_dir: Training data directory
+        out_dir: Directory for the model archive
+
+    Returns:
+        Tuple of (model archive path, training time in seconds)
+    """
+    name = os.path.splitext(os.path.basename(profile_path))[0]
+    started = time.perf_counter()
+    subprocess.run(["rasa", "train", "nlu", "--config", profile_path, "--nlu", data_dir, "--out", out_dir,
+                    "--fixed-model-name", name], check=True)
+    return os.path.join(out_dir, f"{name}.tar.gz"), time.perf_counter() - started
+
+
+def _measure_in_subprocess(model_path: str, examples: List[Example], repeat: int, warmup: int,
+                           work_dir: str) -> Dict[str, Any]:
+    examples_path = os.path.join(work_dir, "examples.json")
+    with open(examples_path, "w") as examples_file:
+        json.dump(examples, examples_file)
+    result_path = os.path.join(work_dir, f"{os.path.basename(model_path)}.json")
+    subprocess.run([sys.executable, "-m", "benchmarks.nlu_bench", "measure", "--model", model_path,
+                    "--examples", examples_path, "--repeat", str(repeat), "--warmup", str(warmup),
+                    "--output", result_path, "--quiet"], check=True)
+    with open(result_path) as result_file:
+        return json.load(result_file)
+
+
+def compare_profiles(args: argparse.Namespace) -> Dict[str, Any]:
+    profiles = args.profiles or sorted(glob.glob(os.path.join(PROFILES_DIR, "*.yml")))
+    work_dir = tempfile.mkdtemp(prefix="nlu_bench_")
+    models_dir = args.models_dir or os.path.join(work_dir, "models")
+    try:
+        test_examples = split_training_data(args.nlu, os.path.join(work_dir, "data"), args.holdout, args.seed)
+        logger.info(f"Holding out {len(test_examples)} examples for evaluation")
+
+        report: Dict[str, Any] = {"settings": {"nlu": args.nlu, "holdout": args.holdout, "seed": args.seed,
+                                               "test_examples": len(test_examples), "repeat": args.repeat},
+                                  "profiles": {}}
+        for profile_path in profiles:
+            name = os.path.splitext(os.path.basename(profile_path))[0]
+            logger.info(f"Training profile '{name}'")
+            model_path, train_seconds = train_profile(profile_path, os.path.join(work_dir, "data"), models_dir)
+            result = _measure_in_subprocess(model_path, test_examples, args.repeat, args.warmup, work_dir)
+            result.update({"config": profile_path, "train_seconds": round(train_seconds, 1)})
+            report["profiles"][name] = result
+        return report
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _print_profiles(report: Dict[str, Any]) -> None:
+    profiles = report["profiles"]
+    print(format_table({name: result["parse"] for name, result in profiles.items()}, label="profile"))
+    width = max([len("profile")] + [len(name) for name in profiles])
+    print(f"\n{'profile':<{width}}  {'macro F1':>8}  {'accuracy':>8}  {'RSS MB':>7}  {'size MB':>7}  {'train s':>7}")
+    for name, result in profiles.items():
+        print(f"{name:<{width}}  {result['intent']['macro_f1']:>8.3f}  {result['intent']['accuracy']:>8.3f}  "
+              f"{result['model_rss_mb']:>7.1f}  {result['model_size_mb']:>7.2f}  {result['train_seconds']:>7.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark NLU inference and compare pipeline profiles")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    measure = commands.add_parser("measure", help="Time parsing with one trained model")
+    measure.add_argument("--model", required=True, help="Trained model archive")
+    measure.add_argument("--nlu", default="data/nlu.yml", help="NLU file whose examples are parsed")
+    measure.add_argument("--examples", default=None, help="JSON list of [text, intent] pairs (overrides --nlu)")
+    measure.add_argument("--repeat", type=int, default=3, help="Passes over the examples")
+    measure.add_argument("--warmup", type=int, default=20, help="Unmeasured parses before timing")
+    measure.add_argument("--output", default=None, help="Write the JSON report to this file")
+    measure.add_argument("--quiet", action="store_true", help="Do not print the summary tables")
+
+    compare = commands.add_parser("compare", help="Train and compare pipeline profiles")
+    compare.add_argument("--profiles", nargs="*", help="Pipeline configs (default: benchmarks/pipelines/*.yml)")
+    compare.add_argument("--nlu", default="data/nlu.yml", help="NLU training data to split")
+    compare.add_argument("--holdout", type=float, default=0.2, help="Share of each intent's examples held out")
+    compare.add_argument("--seed", type=int, default=42, help="Random seed for the split")
+    compare.add_argument("--repeat", type=int, default=5, help="Passes over the held-out examples")
+    compare.add_argument("--warmup", type=int, default=20, help="Unmeasured parses before timing")
+    compare.add_argument("--models-dir", default=None, help="Keep trained models here (default: discarded)")
+    compare.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    if args.command == "measure":
+        if args.examples:
+            with open(args.examples) as examples_file:
+                examples = [tuple(example) for example in json.load(examples_file)]
+        else:
+            examples = load_labelled_examples(args.nlu)
+        report = asyncio.run(measure_model(args.model, examples, args.repeat, args.warmup))
+        if not args.quiet:
+            print(f"\n{args.model}: {report['parses_per_second']} parses/s, load {report['load_seconds']}s, "
+                  f"peak RSS {report['peak_rss_mb']} MB, intent macro F1 {report['intent']['macro_f1']}\n")
+            print(format_table(dict([("parse", report["parse"])] + sorted(report["components"].items())),
+                               label="component"))
+    else:
+        report = compare_profiles(args)
+        print()
+        _print_profiles(report)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
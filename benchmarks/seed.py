@@ -0,0 +1,169 @@
+"""
+Bulk loader for benchmark datasets.
+
+Creates sender-mapped users and reminders with COPY, using distributions that
+resemble production: a few heavy users and a long tail, reminder times clustered
+around morning and evening, a share of past reminders already notified or
+completed, and most users with a phone number (the dispatcher only notifies
+those). Every benchmark user has sender_id "<prefix>-<n>", so actions can be
+driven as those users and the whole dataset can be removed again by prefix.
+"""
+import io
+import csv
+import random
+import hashlib
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from db.connection import get_db_connection
+from db.models.sender import forget_sender
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SENDER_PREFIX = "bench"
+COPY_CHUNK_ROWS = 100000
+
+TASKS = [
+    "call mom", "pay the electricity bill", "team meeting", "doctor's appointment", "take my medication",
+    "water the plants", "walk the dog", "submit the report", "pick up groceries", "renew passport",
+    "book flight tickets", "dentist appointment", "gym session", "send invoice to client", "car service",
+    "birthday gift for Sam", "weekly review", "pay rent", "call the plumber", "school pickup",
+]
+TIME_ZONES = ["UTC", "Europe/London", "Europe/Berlin", "America/New_York", "America/Los_Angeles", "Asia/Kolkata"]
+# Relative weight of each hour of the day for reminder times (peaks at 8-9h and 17-19h)
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 12, 10, 7, 6, 7, 6, 5, 6, 8, 11, 12, 9, 6, 4, 2, 1]
+# Area code 555 is not assigned, so seeded numbers never reach a real phone
+PHONE_PREFIX = "+1555"
+
+
+def sender_id_for(index: int, sender_prefix: str = DEFAULT_SENDER_PREFIX) -> str:
+    return f"{sender_prefix}-{index}"
+
+
+def _phone_number_for(index: int) -> str:
+    return f"{PHONE_PREFIX}{index:07d}"
+
+
+def _username_for(sender_id: str) -> str:
+    # Same scheme as get_or_create_user_for_sender(), so lookups resolve to the seeded users
+    return "sender_" + hashlib.md5(sender_id.encode()).hexdigest()
+
+
+def _copy_rows(cursor, table: str, columns: List[str], rows: List[List[object]]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def clear_dataset(sender_prefix: str = DEFAULT_SENDER_PREFIX) -> int:
+    """
+    Delete benchmark users (and, by cascade, their reminders and sender mappings).
+
+    Args:
+        sender_prefix: Prefix the dataset was seeded with
+
+    Returns:
+        Number of users deleted
+    """
+    with get_db_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM users WHERE id IN (SELECT user_id FROM sender_users WHERE sender_id LIKE %s)",
+                (f"{sender_prefix}-%",),
+            )
+            deleted = cursor.rowcount
+        connection.commit()
+    logger.info(f"Removed {deleted} benchmark users with prefix '{sender_prefix}'")
+    return deleted
+
+
+def seed_dataset(num_reminders: int, num_users: Optional[int] = None, sender_prefix: str = DEFAULT_SENDER_PREFIX,
+                 seed: int = 42, past_fraction: float = 0.3, pending_fraction: float = 0.02,
+                 zipf_exponent: float = 1.1, phone_fraction: float = 0.8,
+                 now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Replace the benchmark dataset with freshly generated users and reminders.
+
+    Args:
+        num_reminders: Total reminders to create
+        num_users: Users to spread them over (default: one per 50 reminders)
+        sender_prefix: Sender ID prefix of the benchmark users
+        seed: Random seed; the same arguments produce the same dataset
+        past_fraction: Share of reminders whose time has passed
+        pending_fraction: Share of past reminders left unnotified (due for the dispatcher)
+        zipf_exponent: Skew of reminders per user (higher means heavier top users)
+        phone_fraction: Share of users with a phone number; the rest are chat-only
+        now: Reference time for past/future reminders (default: current time)
+
+    Returns:
+        Dictionary with the number of users and reminders created
+    """
+    rng = random.Random(seed)
+    num_users = num_users or max(1, num_reminders // 50)
+    now = now or datetime.now(timezone.utc)
+    clear_dataset(sender_prefix)
+
+    with get_db_connection() as connection:
+        with connection.cursor() as cursor:
+            sender_ids = [sender_id_for(index, sender_prefix) for index in range(num_users)]
+            # An empty CSV field is NULL, so chat-only users get no phone number
+            _copy_rows(cursor, "users", ["username", "time_zone", "phone_number"],
+                       [[_username_for(sender_id), rng.choice(TIME_ZONES),
+                         _phone_number_for(index) if rng.random() < phone_fraction else None]
+                        for index, sender_id in enumerate(sender_ids)])
+            cursor.execute("SELECT id, username FROM users WHERE username = ANY(%s)",
+                           ([_username_for(sender_id) for sender_id in sender_ids],))
+            user_ids_by_name = dict((username, user_id) for user_id, username in cursor.fetchall())
+            user_ids = [user_ids_by_name[_username_for(sender_id)] for sender_id in sender_ids]
+            _copy_rows(cursor, "sender_users", ["sender_id", "user_id"],
+                       [[sender_id, user_id] for sender_id, user_id in zip(sender_ids, user_ids)])
+
+            # Power-law reminders per user: rank r gets weight 1 / r^s
+            weights = [1 / (rank ** zipf_exponent) for rank in range(1, num_users + 1)]
+            rng.shuffle(weights)
+            cumulative_weights = []
+            total = 0.0
+            for weight in weights:
+                total += weight
+                cumulative_weights.append(total)
+
+            created = 0
+            while created < num_reminders:
+                chunk_size = min(COPY_CHUNK_ROWS, num_reminders - created)
+                owners = rng.choices(user_ids, cum_weights=cumulative_weights, k=chunk_size)
+                hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=chunk_size)
+                rows = []
+                for owner, hour in zip(owners, hours):
+                    is_past = rng.random() < past_fraction
+                    days = rng.expovariate(1 / 7) * (-1 if is_past else 1)
+                    day = (now + timedelta(days=days)).replace(hour=hour, minute=rng.randrange(0, 60, 5),
+                                                              second=0, microsecond=0)
+                    task = rng.choice(TASKS)
+                    rows.append([
+                        owner,
+                        task if rng.random() < 0.7 else f"{task} #{rng.randint(1, 99)}",
+                        "",
+                        day.isoformat(),
+                        is_past and rng.random() < 0.6,
+                        # A small backlog of past reminders is still waiting for its notification
+                        is_past and rng.random() > pending_fraction,
+                    ])
+                _copy_rows(cursor, "reminders",
+                           ["user_id", "title", "description", "reminder_time", "is_completed", "notification_sent"],
+                           rows)
+                created += chunk_size
+                logger.info(f"Seeded {created}/{num_reminders} reminders")
+
+            cursor.execute("ANALYZE users")
+            cursor.execute("ANALYZE reminders")
+        connection.commit()
+
+    # Cached sender mappings from a previous dataset would point at deleted users
+    forget_sender()
+
+    logger.info(f"Seeded {num_users} users and {num_reminders} reminders (prefix '{sender_prefix}', seed {seed})")
+    return {"users": num_users, "reminders": num_reminders}
@@ -0,0 +1,180 @@
+"""
+Action server cold-start benchmark.
+
+Starts `python -m server` repeatedly, with and without the warm-up
+(server/warmup.py), and for each start measures:
+
+    - ready: seconds from spawning the process until /health answers
+    - first_request: latency of the first /webhook call, sent as soon as the server is ready
+    - time_to_first_response: ready plus first_request, what a request waiting on a new container sees
+    - steady: latency percentiles of the calls after the first one
+
+It also times importing the action package in a fresh interpreter.
+
+    python -m benchmarks.startup_bench --runs 5 --scenario list_reminders --output startup.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import logging
+import platform
+import statistics
+import subprocess
+from typing import Any, Dict, List
+
+import aiohttp
+
+from benchmarks.action_bench import SCENARIOS, load_domain, _git_commit
+from benchmarks.action_server_scaling import build_payloads
+from benchmarks.seed import seed_dataset, DEFAULT_SENDER_PREFIX
+from benchmarks.stats import summarize
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = {"warm": [], "cold": ["--no-warmup"]}
+HEALTH_POLL_SECONDS = 0.01
+
+
+def time_import(package: str) -> float:
+    """Seconds a fresh interpreter takes to import the action package and its modules, as rasa_sdk does."""
+    code = ("import time, pkgutil, importlib; started = time.perf_counter(); "
+            f"package = importlib.import_module({package!r}); "
+            f"[importlib.import_module(module.name) for module in pkgutil.walk_packages(package.__path__, {package + '.'!r})]; "
+            "print(time.perf_counter() - started)")
+    return float(subprocess.check_output([sys.executable, "-c", code], stderr=subprocess.DEVNULL).decode().strip())
+
+
+async def wait_until_ready(session: aiohttp.ClientSession, url: str, process: subprocess.Popen,
+                           timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Action server exited with code {process.returncode} before it was ready")
+        try:
+            async with session.get(f"{url}/health") as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(HEALTH_POLL_SECONDS)
+    raise TimeoutError(f"Action server at {url} did not become ready within {timeout}s")
+
+
+async def post(session: aiohttp.ClientSession, url: str, payload: Dict[str, Any]) -> float:
+    started = time.perf_counter()
+    async with session.post(f"{url}/webhook", json=payload) as response:
+        await response.read()
+        if response.status != 200:
+            raise RuntimeError(f"/webhook answered {response.status}")
+    return time.perf_counter() - started
+
+
+async def measure_start(args: argparse.Namespace, mode: str, payloads: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Start one server, time readiness and its first requests, then stop it."""
+    url = f"http://127.0.0.1:{args.port}"
+    command = [sys.executable, "-m", "server", "--actions", args.actions, "--port", str(args.port)] + MODES[mode]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, start_new_session=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+            await wait_until_ready(session, url, process, args.startup_timeout)
+            ready = time.perf_counter() - started
+            first_request = await post(session, url, payloads[0])
+            steady = [await post(session, url, payload) for payload in payloads[1:]]
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.wait()
+
+    return {"ready": ready, "first_request": first_request, "time_to_first_response": ready + first_request,
+            "steady": steady}
+
+
+def _milliseconds(values: List[float]) -> Dict[str, float]:
+    return {"median_ms": round(statistics.median(values) * 1000, 2), "max_ms": round(max(values) * 1000, 2)}
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    domain = load_domain(args.domain)
+    num_users = args.users or max(1, args.reminders // 50)
+    if not args.no_seed:
+        seed_dataset(args.reminders, num_users, sender_prefix=args.sender_prefix, seed=args.seed)
+
+    report: Dict[str, Any] = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "settings": {
+            "runs": args.runs, "scenario": args.scenario, "requests": args.requests, "reminders": args.reminders,
+            "users": num_users, "seed": args.seed,
+        },
+        "import_seconds": round(statistics.median(time_import(args.actions) for _ in range(args.runs)), 4),
+        "modes": {},
+    }
+
+    rng = random.Random(args.seed)
+    runs: Dict[str, List[Dict[str, Any]]] = {mode: [] for mode in args.modes}
+    # Interleave modes so drift in the database or host affects both equally
+    for run in range(args.runs):
+        for mode in args.modes:
+            payloads = build_payloads(args.scenario, domain, num_users, args.requests, rng.randrange(1 << 30),
+                                      args.sender_prefix)
+            runs[mode].append(await measure_start(args, mode, payloads))
+            logger.info(f"Run {run + 1}/{args.runs} {mode}: ready {runs[mode][-1]['ready']:.3f}s, "
+                        f"first request {runs[mode][-1]['first_request'] * 1000:.1f}ms")
+
+    for mode, results in runs.items():
+        report["modes"][mode] = {
+            "ready": _milliseconds([result["ready"] for result in results]),
+            "first_request": _milliseconds([result["first_request"] for result in results]),
+            "time_to_first_response": _milliseconds([result["time_to_first_response"] for result in results]),
+            "steady": summarize([latency for result in results for latency in result["steady"]]),
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure action server cold start with and without warm-up")
+    parser.add_argument("--runs", type=int, default=5, help="Server starts per mode")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES), help="Modes to compare")
+    parser.add_argument("--scenario", choices=list(SCENARIOS), default="list_reminders",
+                        help="action_bench scenario sent after each start")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="Requests sent after each start")
+    parser.add_argument("--actions", default="actions", help="Package containing the custom actions")
+    parser.add_argument("--reminders", type=int, default=10000, help="Reminders to seed")
+    parser.add_argument("--users", type=int, default=None, help="Users to seed (default: reminders / 50)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the dataset and requests")
+    parser.add_argument("--sender-prefix", default=DEFAULT_SENDER_PREFIX, help="Sender ID prefix of benchmark users")
+    parser.add_argument("--no-seed", action="store_true", help="Reuse the existing benchmark dataset")
+    parser.add_argument("--port", type=int, default=5156, help="Port for the benchmarked action server")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=120, help="Seconds to wait for readiness")
+    parser.add_argument("--domain", default="domain.yml", help="Domain file sent with each request")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+
+    print(f"\nCommit {report['commit']}, importing {args.actions}: {report['import_seconds'] * 1000:.1f}ms\n")
+    for mode, result in report["modes"].items():
+        print(f"{mode:>5}: ready {result['ready']['median_ms']}ms, first request {result['first_request']['median_ms']}ms, "
+              f"time to first response {result['time_to_first_response']['median_ms']}ms "
+              f"(max {result['time_to_first_response']['max_ms']}ms), steady p50 {result['steady']['p50_ms']}ms")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2, default=str)
+        logger.info(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Latency summary helpers shared by the benchmark tools.
+"""
+import math
+from typing import Dict, Iterable, List, Sequence
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted sequence.
+
+    Args:
+        sorted_values: Values in ascending order
+        fraction: Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        The percentile value, or 0.0 for an empty sequence
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: Iterable[float]) -> Dict[str, float]:
+    """
+    Summarize latencies given in seconds.
+
+    Args:
+        latencies: Observed durations in seconds
+
+    Returns:
+        Dictionary with count, mean, p50, p95, p99 and max in milliseconds
+    """
+    values: List[float] = sorted(latencies)
+    if not values:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3),
+    }
+
+
+def format_table(rows: Dict[str, Dict[str, float]], label: str = "name") -> str:
+    """
+    Render summaries as a fixed-width text table.
+
+    Args:
+        rows: Mapping of row label to summarize() output
+        label: Header of the label column
+
+    Returns:
+        Table text
+    """
+    width = max([len(label)] + [len(name) for name in rows])
+    header = f"{label:<{width}}  {'count':>7}  {'mean':>9}  {'p50':>9}  {'p95':>9}  {'p99':>9}  {'max':>9}"
+    lines = [header, "-" * len(header)]
+    for name, summary in rows.items():
+        lines.append(f"{name:<{width}}  {summary['count']:>7}  {summary['mean_ms']:>7.1f}ms  {summary['p50_ms']:>7.1f}ms  "
+                     f"{summary['p95_ms']:>7.1f}ms  {summary['p99_ms']:>7.1f}ms  {summary['max_ms']:>7.1f}ms")
+    return "\n".join(lines)
@@ -0,0 +1,3 @@
+"""
+Custom Rasa NLU components referenced from config.yml.
+"""
@@ -0,0 +1,302 @@
+"""
+Lookup-table entity extractor backed by a word-level Aho-Corasick automaton.
+
+RegexEntityExtractor (use_lookup_tables: True) compiles every lookup entry into one
+alternation regex, so matching time and model size grow with the table. This
+component matches all entries in one pass over the message's words instead
+(components/token_automaton.py). It reads the lookup tables from the training
+data and, optionally, large plain-text lookup files and time zone names and aliases:
+
+    - name: components.lookup_extractor.TrieLookupEntityExtractor
+      lookup_files:
+        task: data/lookups/tasks.txt
+      time_zone_aliases: time_zone
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+from rasa.engine.graph import ExecutionContext, GraphComponent
+from rasa.engine.recipes.default_recipe import DefaultV1Recipe
+from rasa.engine.storage.resource import Resource
+from rasa.engine.storage.storage import ModelStorage
+from rasa.nlu.extractors.extractor import EntityExtractorMixin
+from rasa.shared.nlu.constants import (
+    ENTITIES,
+    ENTITY_ATTRIBUTE_END,
+    ENTITY_ATTRIBUTE_START,
+    ENTITY_ATTRIBUTE_TYPE,
+    ENTITY_ATTRIBUTE_VALUE,
+    TEXT,
+)
+from rasa.shared.nlu.training_data.message import Message
+from rasa.shared.nlu.training_data.training_data import TrainingData
+
+from components.token_automaton import TokenAutomaton
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ENTRIES_FILE = "lookup_entries.json"
+
+# (phrase, entity, canonical value or None to report the matched text)
+Entry = Tuple[str, str, Optional[str]]
+
+
+def read_lookup_file(path: str, entity: str) -> List[Entry]:
+    """
+    Read a plain-text lookup file with one entry per line.
+
+    A line may map an alias to a canonical value with a tab: "nyc<TAB>America/New_York".
+    Empty lines and lines starting with # are skipped.
+
+    Args:
+        path: File path
+        entity: Entity type for all entries
+
+    Returns:
+        List of entries
+    """
+    entries = []
+    with open(path, encoding="utf-8") as lookup_file:
+        for line in lookup_file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            phrase, _, value = line.partition("\t")
+            entries.append((phrase.strip(), entity, value.strip() or None))
+    return entries
+
+
+# Aliases people actually type for a zone. Deliberately short: deriving aliases from every
+# zone's city turned ordinary words into zones ("wake up" -> Pacific/Wake, "Christmas",
+# "Easter", "Casey", "Davis"), so only abbreviations and unambiguous major cities are listed.
+TIME_ZONE_ALIASES: Dict[str, str] = {
+    # Abbreviations, resolved to the zone most users mean by them
+    "UTC": "UTC",
+    "GMT": "GMT",
+    "BST": "Europe/London",
+    "CET": "Europe/Paris",
+    "CEST": "Europe/Paris",
+    "EET": "Europe/Athens",
+    "EEST": "Europe/Athens",
+    "EST": "America/New_York",
+    "EDT": "America/New_York",
+    "CST": "America/Chicago",
+    "CDT": "America/Chicago",
+    "MST": "America/Denver",
+    "MDT": "America/Denver",
+    "PST": "America/Los_Angeles",
+    "PDT": "America/Los_Angeles",
+    "AKST": "America/Anchorage",
+    "HST": "Pacific/Honolulu",
+    "IST": "Asia/Kolkata",
+    "JST": "Asia/Tokyo",
+    "KST": "Asia/Seoul",
+    "SGT": "Asia/Singapore",
+    "HKT": "Asia/Hong_Kong",
+    "AEST": "Australia/Sydney",
+    "AEDT": "Australia/Sydney",
+    "NZST": "Pacific/Auckland",
+    "eastern time": "America/New_York",
+    "central time": "America/Chicago",
+    "mountain time": "America/Denver",
+    "pacific time": "America/Los_Angeles",
+    # Major cities
+    "London": "Europe/London",
+    "Dublin": "Europe/Dublin",
+    "Lisbon": "Europe/Lisbon",
+    "Paris": "Europe/Paris",
+    "Berlin": "Europe/Berlin",
+    "Madrid": "Europe/Madrid",
+    "Rome": "Europe/Rome",
+    "Amsterdam": "Europe/Amsterdam",
+    "Brussels": "Europe/Brussels",
+    "Zurich": "Europe/Zurich",
+    "Vienna": "Europe/Vienna",
+    "Stockholm": "Europe/Stockholm",
+    "Warsaw": "Europe/Warsaw",
+    "Athens": "Europe/Athens",
+    "Istanbul": "Europe/Istanbul",
+    "Moscow": "Europe/Moscow",
+    "Cairo": "Africa/Cairo",
+    "Lagos": "Africa/Lagos",
+    "Nairobi": "Africa/Nairobi",
+    "Johannesburg": "Africa/Johannesburg",
+    "Dubai": "Asia/Dubai",
+    "Karachi": "Asia/Karachi",
+    "Mumbai": "Asia/Kolkata",
+    "Delhi": "Asia/Kolkata",
+    "New Delhi": "Asia/Kolkata",
+    "Bangkok": "Asia/Bangkok",
+    "Jakarta": "Asia/Jakarta",
+    "Singapore": "Asia/Singapore",
+    "Hong Kong": "Asia/Hong_Kong",
+    "Shanghai": "Asia/Shanghai",
+    "Beijing": "Asia/Shanghai",
+    "Seoul": "Asia/Seoul",
+    "Tokyo": "Asia/Tokyo",
+    "Sydney": "Australia/Sydney",
+    "Melbourne": "Australia/Melbourne",
+    "Auckland": "Pacific/Auckland",
+    "Honolulu": "Pacific/Honolulu",
+    "Anchorage": "America/Anchorage",
+    "Los Angeles": "America/Los_Angeles",
+    "San Francisco": "America/Los_Angeles",
+    "Seattle": "America/Los_Angeles",
+    "Vancouver": "America/Vancouver",
+    "Denver": "America/Denver",
+    "Phoenix": "America/Phoenix",
+    "Chicago": "America/Chicago",
+    "Mexico City": "America/Mexico_City",
+    "New York": "America/New_York",
+    "Toronto": "America/Toronto",
+    "Bogota": "America/Bogota",
+    "Sao Paulo": "America/Sao_Paulo",
+    "Buenos Aires": "America/Argentina/Buenos_Aires",
+}
+
+
+def time_zone_aliases(entity: str) -> List[Entry]:
+    """
+    Build the time zone entries: every common IANA name plus TIME_ZONE_ALIASES.
+
+    Full names ("Europe/Berlin") match as written. Bare city names only match if
+    they are listed in TIME_ZONE_ALIASES.
+
+    Args:
+        entity: Entity type for the aliases
+
+    Returns:
+        List of entries whose value is the IANA zone name
+    """
+    import pytz
+
+    entries: List[Entry] = [(zone, entity, zone) for zone in pytz.common_timezones if "/" in zone]
+    entries.extend((alias, entity, zone) for alias, zone in TIME_ZONE_ALIASES.items())
+    return entries
+
+
+@DefaultV1Recipe.register(
+    [DefaultV1Recipe.ComponentType.ENTITY_EXTRACTOR], is_trainable=True
+)
+class TrieLookupEntityExtractor(GraphComponent, EntityExtractorMixin):
+    """Extracts lookup-table entities with a word-level Aho-Corasick automaton."""
+
+    @staticmethod
+    def get_default_config() -> Dict[Text, Any]:
+        return {
+            # Lookup tables to use from the training data (None: see use_only_entities)
+            "entities": None,
+            # With entities unset, only use tables named after an entity annotated in the
+            # training data, so helper tables such as common_time_patterns are skipped
+            "use_only_entities": True,
+            # Entity name -> plain-text lookup file, for tables too large for YAML
+            "lookup_files": {},
+            # Entity to fill with IANA time zone names and TIME_ZONE_ALIASES (None disables)
+            "time_zone_aliases": None,
+            "case_sensitive": False,
+        }
+
+    def __init__(self, config: Dict[Text, Any], model_storage: ModelStorage, resource: Resource,
+                 entries: Optional[List[Entry]] = None):
+        self._config = config
+        self._model_storage = model_storage
+        self._resource = resource
+        self._entries: List[Entry] = entries or []
+        self._automaton = TokenAutomaton.from_phrases(self._entries, case_sensitive=config["case_sensitive"])
+
+    @classmethod
+    def create(cls, config: Dict[Text, Any], model_storage: ModelStorage, resource: Resource,
+               execution_context: ExecutionContext) -> "TrieLookupEntityExtractor":
+        return cls(config, model_storage, resource)
+
+    def _collect_entries(self, training_data: TrainingData) -> List[Entry]:
+        wanted = self._config["entities"]
+        if wanted is None and self._config["use_only_entities"]:
+            wanted = training_data.entities
+        entries: List[Entry] = []
+        for table in training_data.lookup_tables:
+            name = table.get("name")
+            elements = table.get("elements")
+            if wanted is not None and name not in wanted:
+                continue
+            if isinstance(elements, str):
+                # Rasa 2 style reference to an external file
+                entries.extend(read_lookup_file(elements, name))
+            else:
+                entries.extend((str(element), name, None) for element in elements or [])
+
+        for entity, path in (self._config["lookup_files"] or {}).items():
+            if not os.path.exists(path):
+                logger.warning(f"Lookup file for '{entity}' not found: {path}")
+                continue
+            entries.extend(read_lookup_file(path, entity))
+
+        if self._config["time_zone_aliases"]:
+            entries.extend(time_zone_aliases(self._config["time_zone_aliases"]))
+        return entries
+
+    def train(self, training_data: TrainingData) -> Resource:
+        """
+        Collect the lookup entries and build the automaton.
+
+        Args:
+            training_data: NLU training data with lookup tables
+
+        Returns:
+            The persisted resource
+        """
+        self._entries = self._collect_entries(training_data)
+        self._automaton = TokenAutomaton.from_phrases(self._entries, case_sensitive=self._config["case_sensitive"])
+        logger.info(f"Built lookup automaton with {len(self._automaton)} entries")
+        self.persist()
+        return self._resource
+
+    def process(self, messages: List[Message]) -> List[Message]:
+        """
+        Add lookup entities to each message.
+
+        Args:
+            messages: Messages to process
+
+        Returns:
+            The same messages with entities appended
+        """
+        for message in messages:
+            text = message.get(TEXT)
+            if not text:
+                continue
+            entities = [
+                {
+                    ENTITY_ATTRIBUTE_TYPE: entity,
+                    ENTITY_ATTRIBUTE_START: start,
+                    ENTITY_ATTRIBUTE_END: end,
+                    ENTITY_ATTRIBUTE_VALUE: value,
+                }
+                for start, end, entity, value in self._automaton.find(text)
+            ]
+            if entities:
+                entities = self.add_extractor_name(entities)
+                message.set(ENTITIES, message.get(ENTITIES, []) + entities, add_to_output=True)
+        return messages
+
+    def persist(self) -> None:
+        with self._model_storage.write_to(self._resource) as model_dir:
+            with open(os.path.join(model_dir, ENTRIES_FILE), "w", encoding="utf-8") as entries_file:
+                json.dump(self._entries, entries_file, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, config: Dict[Text, Any], model_storage: ModelStorage, resource: Resource,
+             execution_context: ExecutionContext, **kwargs: Any) -> "TrieLookupEntityExtractor":
+        # Only the entries are stored; rebuilding the automaton is linear in their size
+        try:
+            with model_storage.read_from(resource) as model_dir:
+                with open(os.path.join(model_dir, ENTRIES_FILE), encoding="utf-8") as entries_file:
+                    entries = [tuple(entry) for entry in json.load(entries_file)]
+        except (ValueError, FileNotFoundError):
+            logger.warning(f"No lookup entries found for {cls.__name__}; it will not extract any entities")
+            entries = []
+        return cls(config, model_storage, resource, entries)
@@ -0,0 +1,192 @@
+"""
+Token-level Aho-Corasick automaton for matching large phrase lists.
+
+Phrases and messages are split into words with the same rule, and all phrases are
+matched in a single left-to-right pass over the message's words. Matching time is
+linear in the message length plus the number of matches, independent of how many
+phrases were added. Memory grows with the number of distinct word prefixes, not
+with the size of a compiled regular expression.
+"""
+import re
+import sys
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Words are runs of letters/digits, optionally joined by apostrophes ("doctor's")
+_WORD = re.compile(r"\w+(?:['’]\w+)*")
+
+# (start character, end character, label, value)
+Match = Tuple[int, int, str, str]
+
+
+def words(text: str) -> List[Tuple[str, int, int]]:
+    """
+    Split text into words with their character offsets.
+
+    Args:
+        text: Input text
+
+    Returns:
+        List of (word, start, end)
+    """
+    return [(match.group(), match.start(), match.end()) for match in _WORD.finditer(text)]
+
+
+class TokenAutomaton:
+    """Aho-Corasick automaton over words instead of characters."""
+
+    def __init__(self, case_sensitive: bool = False):
+        """
+        Initialize an empty automaton.
+
+        Args:
+            case_sensitive: Match words exactly instead of case-folded
+        """
+        self.case_sensitive = case_sensitive
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._depth: List[int] = [0]
+        # (label, value) pairs of phrases ending at each state
+        self._outputs: List[Optional[List[Tuple[str, str]]]] = [None]
+        # Nearest state on the failure chain that has outputs (0 = none)
+        self._output_link: List[int] = [0]
+        self._built = True
+        self.phrases = 0
+
+    def _normalize(self, word: str) -> str:
+        return sys.intern(word if self.case_sensitive else word.casefold())
+
+    def add(self, phrase: str, label: str, value: Optional[str] = None) -> bool:
+        """
+        Add a phrase. build() must be called again before matching.
+
+        Args:
+            phrase: Text to match, e.g. "New York"
+            label: Entity type reported for matches
+            value: Entity value reported for matches (default: the matched text)
+
+        Returns:
+            False if the phrase contains no words and was ignored
+        """
+        phrase_words = [self._normalize(word) for word, _, _ in words(phrase)]
+        if not phrase_words:
+            return False
+
+        state = 0
+        for word in phrase_words:
+            next_state = self._goto[state].get(word)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][word] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._depth.append(self._depth[state] + 1)
+                self._outputs.append(None)
+                self._output_link.append(0)
+            state = next_state
+
+        output = (label, value)
+        if self._outputs[state] is None:
+            self._outputs[state] = [output]
+        elif output not in self._outputs[state]:
+            self._outputs[state].append(output)
+        self.phrases += 1
+        self._built = False
+        return True
+
+    def build(self) -> "TokenAutomaton":
+        """
+        Compute failure and output links (breadth-first, linear in the number of states).
+
+        Returns:
+            The automaton itself
+        """
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            self._output_link[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for word, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(word, 0)
+                failure = self._fail[child]
+                self._output_link[child] = failure if self._outputs[failure] else self._output_link[failure]
+                queue.append(child)
+
+        self._built = True
+        return self
+
+    def find_all(self, text: str) -> List[Match]:
+        """
+        Find every phrase occurrence, including overlapping ones.
+
+        Args:
+            text: Message text
+
+        Returns:
+            List of (start, end, label, value); value is the matched text unless the phrase set one
+        """
+        if not self._built:
+            self.build()
+
+        tokens = words(text)
+        matches: List[Match] = []
+        state = 0
+        for index, (word, _, end) in enumerate(tokens):
+            word = self._normalize(word)
+            while state and word not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(word, 0)
+
+            emitting = state if self._outputs[state] else self._output_link[state]
+            while emitting:
+                start = tokens[index - self._depth[emitting] + 1][1]
+                for label, value in self._outputs[emitting]:
+                    matches.append((start, end, label, value if value is not None else text[start:end]))
+                emitting = self._output_link[emitting]
+        return matches
+
+    def find(self, text: str) -> List[Match]:
+        """
+        Find non-overlapping phrase occurrences per label, preferring leftmost then longest.
+
+        Args:
+            text: Message text
+
+        Returns:
+            List of (start, end, label, value) ordered by start
+        """
+        selected: List[Match] = []
+        last_end: Dict[str, int] = {}
+        for match in sorted(self.find_all(text), key=lambda m: (m[0], -(m[1] - m[0]))):
+            start, end, label, _ = match
+            if start >= last_end.get(label, 0):
+                selected.append(match)
+                last_end[label] = end
+        return selected
+
+    def __len__(self) -> int:
+        return self.phrases
+
+    @classmethod
+    def from_phrases(cls, phrases: Iterable[Tuple[str, str, Optional[str]]],
+                     case_sensitive: bool = False) -> "TokenAutomaton":
+        """
+        Build an automaton from (phrase, label, value) triples.
+
+        Args:
+            phrases: Phrases to add
+            case_sensitive: Match words exactly instead of case-folded
+
+        Returns:
+            Built automaton
+        """
+        automaton = cls(case_sensitive)
+        for phrase, label, value in phrases:
+            automaton.add(phrase, label, value)
+        return automaton.build()
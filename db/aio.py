@@ -0,0 +1,57 @@
+"""
+Async bridge for calling the synchronous database layer from asyncio code
+such as the Rasa action server.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from db.connection import POOL_SIZE_LIMIT
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """
+    Get the thread pool used for database calls.
+
+    It has as many threads as the primary pool can hold connections, so queued
+    calls wait for a thread instead of exhausting the connection pool.
+
+    Returns:
+        The process-wide database executor
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=POOL_SIZE_LIMIT, thread_name_prefix="db")
+    return _executor
+
+
+async def run_db(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a database function without blocking the event loop.
+
+    Args:
+        func: Function from db.models (or any blocking callable)
+        *args: Positional arguments for func
+        **kwargs: Keyword arguments for func
+
+    Returns:
+        Whatever func returns; exceptions propagate to the caller
+
+    Example:
+        ```python
+        reminders = await run_db(get_reminders_by_user_id, user_id)
+        ```
+    """
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the current trace span) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(context.run, func, *args, **kwargs))
@@ -2,16 +2,24 @@
 PostgreSQL connection utility with connection pooling.
 """
 import os
+import re
+import time
 import logging
+import functools
+import threading
 import contextlib
-from typing import Dict, Any, Optional, Generator
+import contextvars
+from typing import Dict, Any, Callable, Optional, Generator, Sequence, List
 
 import psycopg2
-from psycopg2 import pool
 from psycopg2.extensions import connection as pg_connection
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
+from monitoring.metrics import DB_STATEMENT_LATENCY
+from db.slow_query import slow_query_cursor, register_prepared_query
+from db.pool import MonitoredConnectionPool, PoolTimeout, ADAPTIVE_SIZING, ADAPTIVE_MAX_CONNECTIONS
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,11 +27,61 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
+# Pool size defaults; each process keeps a single pool
+DEFAULT_MIN_CONNECTIONS = int(os.getenv("DB_POOL_MIN_CONNECTIONS", "1"))
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "10"))
+# Most connections the primary pool can hold once adaptive sizing has grown it
+POOL_SIZE_LIMIT = max(DEFAULT_MAX_CONNECTIONS, ADAPTIVE_MAX_CONNECTIONS if ADAPTIVE_SIZING else 0)
+
+# Read replica routing
+REPLICA_STRATEGY = os.getenv("DB_REPLICA_STRATEGY", "least_busy")  # or "round_robin"
+REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+# After a user's write, that user's reads stay on the primary for this long so they see their own changes
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+
+
+class PreparingConnection(pg_connection):
+    """
+    Connection that remembers which named statements have been prepared on it.
+    Prepared statements live for the lifetime of the server session, so the set
+    is tied to the connection object kept by the pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+class _ReplicaPool:
+    """A read replica's connection pool plus the bookkeeping used to route reads to it."""
+
+    def __init__(self, name: str, connection_pool: MonitoredConnectionPool):
+        self.name = name
+        self.pool = connection_pool
+        self.in_use = 0
+        self.down_until = 0.0
+
+    @property
+    def is_available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self, retry_after: float) -> None:
+        self.down_until = time.monotonic() + retry_after
+
 
 class DatabaseConnectionPool:
     """
     A connection pool manager for PostgreSQL database connections.
     Implements connection pooling for efficient database access.
+    
+    Callers wait up to DB_POOL_ACQUIRE_TIMEOUT seconds for a connection when the
+    pool is exhausted; see db/pool.py for health checks, recycling and adaptive sizing.
+    
+    Optionally routes read-only work to replicas listed in DB_REPLICA_URLS
+    (comma-separated DSNs). Replicas are picked round-robin or by fewest
+    connections in use (DB_REPLICA_STRATEGY), a failing replica is skipped for
+    DB_REPLICA_RETRY_SECONDS, and reads fall back to the primary when no replica
+    is available.
     """
     _instance = None
     _pool = None
@@ -35,21 +93,33 @@ class DatabaseConnectionPool:
             cls._instance._initialized = False
         return cls._instance
 
-    def __init__(self, min_connections: int = 1, max_connections: int = 10):
+    def __init__(self, min_connections: int = DEFAULT_MIN_CONNECTIONS, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 replica_dsns: Optional[List[str]] = None):
         """
         Initialize the connection pool.
         
         Args:
             min_connections: Minimum number of connections to keep in the pool
             max_connections: Maximum number of connections allowed in the pool
+            replica_dsns: DSNs of read replicas (default: DB_REPLICA_URLS)
         """
         if self._initialized:
             return
             
         self.db_config = self._get_db_config()
+        self.max_connections = max_connections
         self._create_pool(min_connections, max_connections)
+        self._replicas: List[_ReplicaPool] = []
+        self._replica_lock = threading.Lock()
+        self._next_replica = 0
+        # Maps id(connection) to the replica it was borrowed from
+        self._borrowed_from: Dict[int, _ReplicaPool] = {}
+        if replica_dsns is None:
+            replica_dsns = [dsn.strip() for dsn in os.getenv("DB_REPLICA_URLS", "").split(",") if dsn.strip()]
+        self._create_replica_pools(replica_dsns, min_connections, max_connections)
         self._initialized = True
-        logger.info(f"Database connection pool initialized with {min_connections}-{max_connections} connections")
+        logger.info(f"Database connection pool initialized with {min_connections}-{max_connections} connections"
+                    + (f" and {len(self._replicas)} read replicas" if self._replicas else ""))
 
     def _get_db_config(self) -> Dict[str, Any]:
         """
@@ -67,8 +137,9 @@ class DatabaseConnectionPool:
             "password": os.getenv("POSTGRES_PASSWORD", "password")
         }
         
-        # Check if we have a DB_URL defined (takes precedence if available)
-        db_url = os.getenv("DB_URL")
+        # Check if we have a DB_URL defined (takes precedence if available);
+        # DATABASE_URL is what the action server containers are given
+        db_url = os.getenv("DB_URL") or os.getenv("DATABASE_URL")
         if db_url:
             config["dsn"] = db_url
             
@@ -85,38 +156,108 @@ class DatabaseConnectionPool:
         try:
             # If we have a DSN, use it instead of individual parameters
             if "dsn" in self.db_config:
-                self._pool = pool.ThreadedConnectionPool(
+                self._pool = MonitoredConnectionPool(
                     min_connections,
                     max_connections,
-                    dsn=self.db_config["dsn"]
+                    name="primary",
+                    dsn=self.db_config["dsn"],
+                    connection_factory=PreparingConnection
                 )
             else:
-                self._pool = pool.ThreadedConnectionPool(
+                self._pool = MonitoredConnectionPool(
                     min_connections,
                     max_connections,
+                    name="primary",
                     host=self.db_config["host"],
                     port=self.db_config["port"],
                     database=self.db_config["database"],
                     user=self.db_config["user"],
-                    password=self.db_config["password"]
+                    password=self.db_config["password"],
+                    connection_factory=PreparingConnection
                 )
             logger.info("Database connection pool created successfully")
         except Exception as e:
             logger.error(f"Failed to create database connection pool: {e}")
             raise
 
-    def get_connection(self) -> pg_connection:
+    def _create_replica_pools(self, replica_dsns: List[str], min_connections: int, max_connections: int) -> None:
+        """
+        Create one connection pool per read replica. Replicas that cannot be reached
+        at startup are logged and skipped; reads then use the remaining replicas or the primary.
+        
+        Args:
+            replica_dsns: Replica connection strings
+            min_connections: Minimum number of connections per replica
+            max_connections: Maximum number of connections per replica
+        """
+        for index, dsn in enumerate(replica_dsns):
+            name = f"replica{index}"
+            try:
+                replica_pool = MonitoredConnectionPool(
+                    min_connections,
+                    max_connections,
+                    name=name,
+                    dsn=dsn,
+                    connection_factory=PreparingConnection
+                )
+                self._replicas.append(_ReplicaPool(name, replica_pool))
+                logger.info(f"Read replica pool {name} created successfully")
+            except Exception as e:
+                logger.error(f"Failed to create read replica pool {name}: {e}")
+
+    @property
+    def has_replicas(self) -> bool:
+        return bool(self._replicas)
+
+    def _candidate_replicas(self) -> List[_ReplicaPool]:
+        """Available replicas in the order they should be tried."""
+        with self._replica_lock:
+            available = [replica for replica in self._replicas if replica.is_available]
+            if REPLICA_STRATEGY == "round_robin" and available:
+                start = self._next_replica % len(available)
+                self._next_replica += 1
+                return available[start:] + available[:start]
+            return sorted(available, key=lambda replica: replica.in_use)
+
+    def _get_replica_connection(self) -> Optional[pg_connection]:
+        """Borrow a connection from the best available replica, or None if none can serve."""
+        for replica in self._candidate_replicas():
+            try:
+                # Do not queue on a busy replica; try the next one or fall back to the primary
+                connection = replica.pool.getconn(timeout=0)
+            except PoolTimeout:
+                continue
+            except Exception as e:
+                logger.warning(f"Read replica {replica.name} unavailable, skipping for {REPLICA_RETRY_SECONDS}s: {e}")
+                replica.mark_down(REPLICA_RETRY_SECONDS)
+                continue
+            with self._replica_lock:
+                replica.in_use += 1
+                self._borrowed_from[id(connection)] = replica
+            return connection
+        return None
+
+    def get_connection(self, readonly: bool = False) -> pg_connection:
         """
         Get a connection from the pool.
         
+        Args:
+            readonly: Whether the caller only reads; read-only work is served by a replica when one is available
+        
         Returns:
             A database connection from the pool
         
         Raises:
-            Exception: If no connections are available or an error occurs
+            PoolTimeout: If no connection became available within DB_POOL_ACQUIRE_TIMEOUT
+            Exception: If the pool is not initialized or connecting fails
         """
         if not self._pool:
             raise Exception("Connection pool not initialized")
+        
+        if readonly and self._replicas:
+            connection = self._get_replica_connection()
+            if connection is not None:
+                return connection
             
         try:
             connection = self._pool.getconn()
@@ -125,6 +266,34 @@ class DatabaseConnectionPool:
             logger.error(f"Failed to get connection from pool: {e}")
             raise
 
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Usage statistics for the primary pool and each replica pool.
+        
+        Returns:
+            One MonitoredConnectionPool.stats() dictionary per pool, primary first
+        """
+        if not self._pool:
+            return []
+        return [self._pool.stats()] + [replica.pool.stats() for replica in self._replicas]
+
+    def is_replica_connection(self, connection: pg_connection) -> bool:
+        """Whether a borrowed connection belongs to a read replica."""
+        return id(connection) in self._borrowed_from
+
+    def report_failure(self, connection: pg_connection) -> None:
+        """
+        Record that a query failed on a connection; a replica whose connection broke
+        is taken out of rotation for DB_REPLICA_RETRY_SECONDS.
+        
+        Args:
+            connection: The connection the failure happened on
+        """
+        replica = self._borrowed_from.get(id(connection))
+        if replica is not None and connection.closed:
+            logger.warning(f"Read replica {replica.name} connection lost, skipping for {REPLICA_RETRY_SECONDS}s")
+            replica.mark_down(REPLICA_RETRY_SECONDS)
+
     def return_connection(self, connection: pg_connection) -> None:
         """
         Return a connection to the pool.
@@ -135,13 +304,51 @@ class DatabaseConnectionPool:
         if not self._pool:
             logger.warning("Attempting to return connection to uninitialized pool")
             return
+        
+        with self._replica_lock:
+            replica = self._borrowed_from.pop(id(connection), None)
+            if replica is not None:
+                replica.in_use -= 1
+        target_pool = replica.pool if replica is not None else self._pool
             
         try:
-            self._pool.putconn(connection)
+            target_pool.putconn(connection, close=bool(connection.closed))
         except Exception as e:
             logger.error(f"Failed to return connection to pool: {e}")
             raise
 
+    def warm_up(self, connections: Optional[int] = None) -> int:
+        """
+        Open connections and prepare every registered statement on them before traffic arrives.
+        
+        Args:
+            connections: Connections to warm per pool (default: each pool's minimum, capped at its limit)
+        
+        Returns:
+            Number of statements prepared across all warmed connections
+        
+        Raises:
+            Exception: If the primary cannot be reached; unreachable replicas are logged and skipped
+        """
+        prepared = 0
+        for connection_pool in [self._pool] + [replica.pool for replica in self._replicas]:
+            count = min(connections or connection_pool.minconn, connection_pool.maxconn)
+            # Hold all of them at once so each statement is prepared on distinct connections
+            borrowed = []
+            try:
+                for _ in range(count):
+                    borrowed.append(connection_pool.getconn())
+                for connection in borrowed:
+                    prepared += prepare_statements(connection)
+            except Exception as e:
+                if connection_pool is self._pool:
+                    raise
+                logger.warning(f"Could not warm up read replica pool {connection_pool.name}: {e}")
+            finally:
+                for connection in borrowed:
+                    connection_pool.putconn(connection, close=bool(connection.closed))
+        return prepared
+
     def close_all(self) -> None:
         """Close all connections in the pool."""
         if not self._pool:
@@ -150,17 +357,124 @@ class DatabaseConnectionPool:
             
         try:
             self._pool.closeall()
+            for replica in self._replicas:
+                replica.pool.closeall()
             logger.info("All database connections closed")
         except Exception as e:
             logger.error(f"Failed to close all connections: {e}")
             raise
 
 
+class _RecentWrites:
+    """
+    Remembers which users wrote recently in this process, so their reads can be pinned to the primary.
+
+    This only covers reads in the process that made the write. A user's next request may
+    be served by another pre-fork worker, and the dispatcher writes from its own process,
+    so callers that know of writes from elsewhere pass them in with last_write_at().
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._written_at: Dict[Any, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._written_at[key] = now
+            # Prune occasionally so the map only holds users inside the window
+            if len(self._written_at) > 1000:
+                cutoff = now - self.window_seconds
+                self._written_at = {k: t for k, t in self._written_at.items() if t >= cutoff}
+
+    def is_recent(self, key: Any) -> bool:
+        written_at = self._written_at.get(key)
+        return written_at is not None and time.monotonic() - written_at < self.window_seconds
+
+
+_recent_writes = _RecentWrites(READ_YOUR_WRITES_SECONDS)
+
+# Unix time of the current user's last write, as known to a store shared by all processes
+_last_write_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("db_last_write_at", default=None)
+# Set while reads must use the primary (a retry after a replica failure)
+_primary_only: contextvars.ContextVar[bool] = contextvars.ContextVar("db_primary_only", default=False)
+# Set when a read in the current call failed on a replica connection
+_replica_failed: contextvars.ContextVar[bool] = contextvars.ContextVar("db_replica_failed", default=False)
+
+
 @contextlib.contextmanager
-def get_db_connection() -> Generator[pg_connection, None, None]:
+def last_write_at(timestamp: Optional[float]) -> Generator[None, None, None]:
+    """
+    Pin read-only cursors opened inside the block to the primary if the user wrote within
+    DB_READ_YOUR_WRITES_SECONDS of timestamp.
+
+    Use it with a write time every process can see, such as the conversation tracker's
+    events, so read-your-writes holds when a write happened in another worker. The
+    setting is a context variable, so it follows run_db() into the database executor.
+
+    Args:
+        timestamp: Unix time of the user's last write, or None if unknown
+    """
+    token = _last_write_at.set(timestamp)
+    try:
+        yield
+    finally:
+        _last_write_at.reset(token)
+
+
+def _wrote_recently(user_id: Optional[Any]) -> bool:
+    written_at = _last_write_at.get()
+    if written_at is not None and time.time() - written_at < READ_YOUR_WRITES_SECONDS:
+        return True
+    return user_id is not None and _recent_writes.is_recent(user_id)
+
+
+def retry_reads_on_primary(func: Callable) -> Callable:
+    """
+    Decorator for read functions that use get_db_cursor(readonly=True). If a read fails
+    with a connection or query error on a replica (dropped connection, a query cancelled
+    by replay), the whole function runs again on the primary. The function must be
+    safe to repeat.
+
+    Example:
+        ```python
+        @instrument_query
+        @retry_reads_on_primary
+        def get_user_by_id(user_id):
+            ...
+        ```
+    """
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _replica_failed.set(False)
+        try:
+            return func(*args, **kwargs)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if not _replica_failed.get() or _primary_only.get():
+                raise
+            logger.warning(f"{func.__name__} failed on a read replica, retrying on the primary: {e}")
+            primary_token = _primary_only.set(True)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _primary_only.reset(primary_token)
+        finally:
+            _replica_failed.reset(token)
+    return wrapper
+
+# Every PreparedStatement by name, so a warm-up can prepare them ahead of first use
+_statements: Dict[str, "PreparedStatement"] = {}
+
+
+@contextlib.contextmanager
+def get_db_connection(readonly: bool = False) -> Generator[pg_connection, None, None]:
     """
     Context manager for safe database connection handling.
     
+    Args:
+        readonly: Whether the connection may come from a read replica (default: False)
+    
     Yields:
         A database connection that will be automatically returned to the pool
         
@@ -176,45 +490,163 @@ def get_db_connection() -> Generator[pg_connection, None, None]:
     connection = None
     
     try:
-        connection = pool_manager.get_connection()
+        connection = pool_manager.get_connection(readonly=readonly)
         yield connection
+    except Exception:
+        if connection:
+            pool_manager.report_failure(connection)
+        raise
     finally:
         if connection:
             pool_manager.return_connection(connection)
 
 
 @contextlib.contextmanager
-def get_db_cursor(cursor_factory: Optional[Any] = RealDictCursor) -> Generator[Any, None, None]:
+def get_db_cursor(cursor_factory: Optional[Any] = RealDictCursor, readonly: bool = False,
+                  user_id: Optional[Any] = None) -> Generator[Any, None, None]:
     """
     Context manager for safe database cursor handling.
     
     Args:
         cursor_factory: The cursor factory to use (default: RealDictCursor for dict-like results)
+        readonly: Whether the work only reads, so it may run on a read replica (default: False)
+        user_id: User the work is for. Writes record it; reads for a user who wrote within
+                 DB_READ_YOUR_WRITES_SECONDS stay on the primary so they see their own changes.
+                 This record is per process; see last_write_at() for writes made elsewhere.
     
     Yields:
-        A database cursor that will be automatically closed
+        A database cursor that will be automatically closed; statements slower than
+        DB_SLOW_QUERY_MS are logged (see db/slow_query.py)
         
     Example:
         ```python
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-            user = cursor.fetchone()
+        with get_db_cursor(readonly=True, user_id=user_id) as cursor:
+            cursor.execute("SELECT * FROM reminders WHERE user_id = %s", (user_id,))
+            reminders = cursor.fetchall()
         ```
     """
-    with get_db_connection() as connection:
+    use_replica = readonly and not _primary_only.get() and not _wrote_recently(user_id)
+    
+    with get_db_connection(readonly=use_replica) as connection:
         cursor = None
         try:
-            cursor = connection.cursor(cursor_factory=cursor_factory)
+            cursor = connection.cursor(cursor_factory=slow_query_cursor(cursor_factory))
+            cursor.read_only = readonly
             yield cursor
             connection.commit()
+            if not readonly and user_id is not None:
+                _recent_writes.record(user_id)
         except Exception:
-            connection.rollback()
+            if use_replica and DatabaseConnectionPool().is_replica_connection(connection):
+                # Lets retry_reads_on_primary() tell a replica failure from one the primary would repeat
+                _replica_failed.set(True)
+            if not connection.closed:
+                connection.rollback()
             raise
         finally:
             if cursor:
                 cursor.close()
 
 
+class PreparedStatement:
+    """
+    A named server-side prepared statement.
+    
+    Queries are written with PostgreSQL positional parameters ($1, $2, ...) and
+    prepared once per pooled connection on first use; later executions only send
+    the statement name and parameters, so the server skips parsing and planning.
+    
+    Example:
+        ```python
+        LIST_BY_USER = PreparedStatement(
+            "reminders_list_by_user",
+            "SELECT * FROM reminders WHERE user_id = $1 ORDER BY reminder_time LIMIT $2",
+        )
+        
+        with get_db_cursor() as cursor:
+            LIST_BY_USER.execute(cursor, (user_id, 10))
+            reminders = cursor.fetchall()
+        ```
+    """
+
+    def __init__(self, name: str, query: str):
+        """
+        Args:
+            name: Statement name, unique per process
+            query: SQL using $1..$n placeholders
+        """
+        self.name = name
+        self.query = query.strip()
+        register_prepared_query(name, self.query)
+        _statements[name] = self
+        # Fallback for connections not created by the pool (e.g. plain psycopg2.connect)
+        self._plain_query = re.sub(r"\$(\d+)", r"%(p\1)s", self.query.replace("%", "%%"))
+
+    def execute(self, cursor: Any, params: Sequence[Any] = ()) -> None:
+        """
+        Execute the statement on a cursor, preparing it on the connection if needed.
+        
+        Args:
+            cursor: Cursor from get_db_cursor()
+            params: Values for $1..$n, in order
+        """
+        started = time.perf_counter()
+        prepared = getattr(cursor.connection, "prepared_statements", None)
+        if prepared is None:
+            cursor.execute(self._plain_query, {f"p{i}": value for i, value in enumerate(params, start=1)})
+        else:
+            self.prepare(cursor)
+            if params:
+                cursor.execute(f"EXECUTE {self.name} ({', '.join(['%s'] * len(params))})", tuple(params))
+            else:
+                cursor.execute(f"EXECUTE {self.name}")
+        DB_STATEMENT_LATENCY.observe(time.perf_counter() - started, self.name)
+
+    def prepare(self, cursor: Any) -> None:
+        """
+        Prepare the statement on the cursor's pooled connection unless it already is.
+        
+        Args:
+            cursor: Cursor on a connection created by the pool
+        """
+        prepared = cursor.connection.prepared_statements
+        if self.name not in prepared:
+            cursor.execute(f"PREPARE {self.name} AS {self.query}")
+            prepared.add(self.name)
+
+
+def prepare_statements(connection: pg_connection) -> int:
+    """
+    Prepare every PreparedStatement defined so far on a pooled connection.
+    
+    Statements register themselves when their model module is imported. One
+    that fails to prepare is logged and left to be prepared on first use.
+    
+    Args:
+        connection: Connection created by the pool
+    
+    Returns:
+        Number of statements newly prepared
+    """
+    if getattr(connection, "prepared_statements", None) is None:
+        return 0
+    
+    count = 0
+    with connection.cursor() as cursor:
+        for statement in list(_statements.values()):
+            if statement.name in connection.prepared_statements:
+                continue
+            try:
+                statement.prepare(cursor)
+                connection.commit()
+                count += 1
+            except Exception as e:
+                connection.rollback()
+                connection.prepared_statements.discard(statement.name)
+                logger.warning(f"Could not prepare statement {statement.name}: {e}")
+    return count
+
+
 def convert_to_utc(datetime_value, user_timezone: str = 'UTC'):
     """
     Convert a datetime from user timezone to UTC for storage.
@@ -10,6 +10,7 @@ from db.models.user import (
     update_password,
     delete_user,
     authenticate_user,
+    get_common_time_zones,
 )
 
 from db.models.reminder import (
@@ -17,10 +18,30 @@ from db.models.reminder import (
     get_reminder_by_id,
     get_reminders_by_user_id,
     get_upcoming_reminders,
+    find_reminders_by_title,
     get_pending_notifications,
+    get_notifications_by_ids,
     update_reminder,
+    snooze_reminder,
+    reschedule_reminder,
     mark_reminder_completed,
     mark_notification_sent,
+    mark_notifications_sent,
     delete_reminder,
     delete_completed_reminders,
-) 
\ No newline at end of file
+) 
+
+from db.models.sender import (
+    get_or_create_user_for_sender,
+    forget_sender,
+)
+
+from db.models.followup import (
+    schedule_followup,
+    cancel_followups,
+    get_due_followups,
+)
+
+from db.models.summary import (
+    get_reminder_summary,
+)
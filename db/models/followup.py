@@ -0,0 +1,149 @@
+"""
+Follow-up model: conversational follow-ups persisted as reminders.
+
+A follow-up replaces Rasa's ReminderScheduled event. It is a row in the reminders
+table carrying the conversation (sender_id) and the intent to trigger. The
+dispatcher fires it through Rasa's trigger_intent API when due, so pending
+follow-ups cost no Rasa server memory and are not lost on restart.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from psycopg2.extras import Json
+
+from db.connection import get_db_cursor, convert_to_utc
+from db.models.sender import get_or_create_user_for_sender
+from db.models.shard import shard_predicate
+from monitoring.metrics import instrument_query
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FOLLOWUP_COLUMNS = ("id, user_id, sender_id, title, reminder_time, followup_intent, followup_entities, "
+                    "followup_name, created_at")
+
+
+@instrument_query
+def schedule_followup(sender_id: str, intent: str, trigger_at: datetime, entities: Optional[Dict[str, Any]] = None,
+                      name: Optional[str] = None, title: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Schedule an intent to be triggered in a conversation at a given time.
+
+    Args:
+        sender_id: Conversation to trigger the intent in (tracker.sender_id)
+        intent: Intent to trigger, e.g. "EXTERNAL_followup_reminder"; must exist in the domain
+        trigger_at: When to trigger it (converted to UTC)
+        entities: Entities passed with the intent, e.g. {"task": "call mom"}
+        name: Follow-up name; replaces this conversation's pending follow-up with the same name
+        title: Description stored in the reminders title (default: the intent)
+
+    Returns:
+        Dictionary containing the created follow-up
+
+    Raises:
+        Exception: If scheduling fails
+    """
+    user_id = get_or_create_user_for_sender(sender_id)
+    try:
+        with get_db_cursor(user_id=user_id) as cursor:
+            if name:
+                cursor.execute(
+                    """
+                    DELETE FROM reminders
+                    WHERE sender_id = %s AND followup_name = %s
+                    AND followup_intent IS NOT NULL AND notification_sent = FALSE
+                    """,
+                    (sender_id, name),
+                )
+            cursor.execute(
+                f"""
+                INSERT INTO reminders (user_id, sender_id, title, reminder_time, followup_intent,
+                                       followup_entities, followup_name)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING {FOLLOWUP_COLUMNS}
+                """,
+                (user_id, sender_id, (title or intent)[:100], convert_to_utc(trigger_at), intent,
+                 Json(entities or {}), name),
+            )
+            followup = cursor.fetchone()
+            logger.info(f"Scheduled follow-up {followup['id']} ({intent}) for {sender_id} at {followup['reminder_time']}")
+            return followup
+    except Exception as e:
+        logger.error(f"Failed to schedule follow-up for {sender_id}: {e}")
+        raise
+
+
+@instrument_query
+def cancel_followups(sender_id: str, name: Optional[str] = None, intent: Optional[str] = None) -> int:
+    """
+    Cancel pending follow-ups of a conversation (the equivalent of ReminderCancelled).
+
+    Args:
+        sender_id: Conversation ID
+        name: Only cancel follow-ups with this name
+        intent: Only cancel follow-ups triggering this intent
+
+    Returns:
+        Number of follow-ups cancelled
+    """
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                """
+                DELETE FROM reminders
+                WHERE sender_id = %s
+                AND followup_intent IS NOT NULL AND notification_sent = FALSE
+                AND (%s::varchar IS NULL OR followup_name = %s::varchar)
+                AND (%s::varchar IS NULL OR followup_intent = %s::varchar)
+                """,
+                (sender_id, name, name, intent, intent),
+            )
+            cancelled = cursor.rowcount
+            logger.info(f"Cancelled {cancelled} follow-ups for {sender_id}")
+            return cancelled
+    except Exception as e:
+        logger.error(f"Failed to cancel follow-ups for {sender_id}: {e}")
+        raise
+
+
+@instrument_query
+def get_due_followups(limit: int = 500, buckets: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Get follow-ups that are due but have not been triggered yet.
+
+    Args:
+        limit: Maximum number of follow-ups to return, oldest first
+        buckets: Only return follow-ups of users in these shard buckets; None returns all of them
+
+    Returns:
+        List of dictionaries containing follow-up information
+    """
+    try:
+        with get_db_cursor() as cursor:
+            if buckets is None:
+                shard_condition, params = "", (limit,)
+            else:
+                shard_condition, params = f"AND {shard_predicate()}", (list(buckets), limit)
+            cursor.execute(
+                f"""
+                SELECT {FOLLOWUP_COLUMNS}
+                FROM reminders
+                WHERE followup_intent IS NOT NULL
+                AND notification_sent = FALSE
+                AND is_completed = FALSE
+                AND reminder_time <= CURRENT_TIMESTAMP
+                {shard_condition}
+                ORDER BY reminder_time ASC
+                LIMIT %s
+                """,
+                params,
+            )
+            followups = cursor.fetchall()
+            if followups:
+                logger.info(f"Retrieved {len(followups)} due follow-ups")
+            return followups
+    except Exception as e:
+        logger.error(f"Failed to get due follow-ups: {e}")
+        raise
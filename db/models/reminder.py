@@ -3,15 +3,90 @@ Reminder model with CRUD operations for the reminders table.
 """
 import logging
 from typing import Dict, List, Optional, Any, Union
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from db.connection import get_db_cursor, convert_to_utc, convert_from_utc
+from db.connection import get_db_cursor, convert_to_utc, convert_from_utc, PreparedStatement, retry_reads_on_primary
+from db.models.shard import shard_predicate
+from monitoring.metrics import instrument_query
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+REMINDER_COLUMNS = "id, user_id, title, description, reminder_time, created_at, updated_at, is_completed, notification_sent"
 
+# Reminder plus owner columns needed to deliver a notification
+NOTIFICATION_COLUMNS = """r.id, r.user_id, r.title, r.description, r.reminder_time, r.created_at,
+            r.updated_at, r.is_completed, r.notification_sent, u.email, u.username, u.time_zone,
+            u.phone_number"""
+
+# Statements on the conversational hot path (list/delete/find/snooze/reschedule) are
+# prepared once per pooled connection instead of being rebuilt and re-planned per call.
+# Follow-up rows (followup_intent set, see db/models/followup.py) are not user reminders
+# and are excluded from listing, lookup, snooze/reschedule and notification delivery.
+LIST_ACTIVE_BY_USER = PreparedStatement("reminders_list_active_by_user", f"""
+    SELECT {REMINDER_COLUMNS}
+    FROM reminders
+    WHERE user_id = $1 AND is_completed = FALSE AND followup_intent IS NULL
+    ORDER BY reminder_time ASC
+    LIMIT $2 OFFSET $3
+""")
+
+LIST_ALL_BY_USER = PreparedStatement("reminders_list_all_by_user", f"""
+    SELECT {REMINDER_COLUMNS}
+    FROM reminders
+    WHERE user_id = $1 AND followup_intent IS NULL
+    ORDER BY reminder_time ASC
+    LIMIT $2 OFFSET $3
+""")
+
+FIND_BY_TITLE = PreparedStatement("reminders_find_by_title", f"""
+    SELECT {REMINDER_COLUMNS}, word_similarity($2, title) AS score
+    FROM reminders
+    WHERE user_id = $1
+    AND is_completed = FALSE
+    AND followup_intent IS NULL
+    AND $2 <% title
+    ORDER BY score DESC, reminder_time ASC
+    LIMIT $3
+""")
+
+DELETE_FOR_USER = PreparedStatement("reminders_delete_for_user", """
+    DELETE FROM reminders
+    WHERE id = $1 AND user_id = $2
+    RETURNING id
+""")
+
+# Without an explicit ID, snooze/reschedule target the user's most recently notified
+# reminder, which is what a "snooze 10 minutes" reply to a notification refers to.
+SNOOZE_FOR_USER = PreparedStatement("reminders_snooze_for_user", f"""
+    UPDATE reminders
+    SET reminder_time = reminder_time + $1::interval, notification_sent = FALSE, updated_at = CURRENT_TIMESTAMP
+    WHERE user_id = $2
+    AND id = COALESCE($3::int, (
+        SELECT id FROM reminders
+        WHERE user_id = $2 AND notification_sent = TRUE AND followup_intent IS NULL
+        ORDER BY reminder_time DESC
+        LIMIT 1
+    ))
+    RETURNING {REMINDER_COLUMNS}
+""")
+
+RESCHEDULE_FOR_USER = PreparedStatement("reminders_reschedule_for_user", f"""
+    UPDATE reminders
+    SET reminder_time = $1, notification_sent = FALSE, updated_at = CURRENT_TIMESTAMP
+    WHERE user_id = $2
+    AND id = COALESCE($3::int, (
+        SELECT id FROM reminders
+        WHERE user_id = $2 AND notification_sent = TRUE AND followup_intent IS NULL
+        ORDER BY reminder_time DESC
+        LIMIT 1
+    ))
+    RETURNING {REMINDER_COLUMNS}
+""")
+
+
+@instrument_query
 def create_reminder(user_id: int, title: str, reminder_time: datetime, description: str = None) -> Dict[str, Any]:
     """
     Create a new reminder for a user.
@@ -32,7 +107,7 @@ def create_reminder(user_id: int, title: str, reminder_time: datetime, descripti
         # Convert reminder time to UTC for storage
         reminder_time_utc = convert_to_utc(reminder_time)
         
-        with get_db_cursor() as cursor:
+        with get_db_cursor(user_id=user_id) as cursor:
             query = """
             INSERT INTO reminders (user_id, title, description, reminder_time)
             VALUES (%s, %s, %s, %s)
@@ -47,6 +122,8 @@ def create_reminder(user_id: int, title: str, reminder_time: datetime, descripti
         raise
 
 
+@instrument_query
+@retry_reads_on_primary
 def get_reminder_by_id(reminder_id: int, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
     """
     Get a reminder by its ID, optionally filtering by user_id for security.
@@ -59,7 +136,7 @@ def get_reminder_by_id(reminder_id: int, user_id: Optional[int] = None) -> Optio
         Dictionary containing reminder information or None if not found
     """
     try:
-        with get_db_cursor() as cursor:
+        with get_db_cursor(readonly=True, user_id=user_id) as cursor:
             query = """
             SELECT id, user_id, title, description, reminder_time, created_at, updated_at, is_completed, notification_sent
             FROM reminders
@@ -87,6 +164,8 @@ def get_reminder_by_id(reminder_id: int, user_id: Optional[int] = None) -> Optio
         raise
 
 
+@instrument_query
+@retry_reads_on_primary
 def get_reminders_by_user_id(user_id: int, include_completed: bool = False, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
     """
     Get all reminders for a user.
@@ -100,24 +179,11 @@ def get_reminders_by_user_id(user_id: int, include_completed: bool = False, limi
     Returns:
         List of dictionaries containing reminder information
     """
+    statement = LIST_ALL_BY_USER if include_completed else LIST_ACTIVE_BY_USER
+    
     try:
-        with get_db_cursor() as cursor:
-            query = """
-            SELECT id, user_id, title, description, reminder_time, created_at, updated_at, is_completed, notification_sent
-            FROM reminders
-            WHERE user_id = %s
-            """
-            params = [user_id]
-            
-            # Add filter for completed reminders if needed
-            if not include_completed:
-                query += " AND is_completed = FALSE"
-                
-            # Add order by, limit, and offset
-            query += " ORDER BY reminder_time ASC LIMIT %s OFFSET %s"
-            params.extend([limit, offset])
-            
-            cursor.execute(query, params)
+        with get_db_cursor(readonly=True, user_id=user_id) as cursor:
+            statement.execute(cursor, (user_id, limit, offset))
             reminders = cursor.fetchall()
             logger.info(f"Retrieved {len(reminders)} reminders for user: {user_id}")
             return reminders
@@ -126,6 +192,8 @@ def get_reminders_by_user_id(user_id: int, include_completed: bool = False, limi
         raise
 
 
+@instrument_query
+@retry_reads_on_primary
 def get_upcoming_reminders(user_id: int, days: int = 7, limit: int = 10) -> List[Dict[str, Any]]:
     """
     Get upcoming reminders for a user within a specified number of days.
@@ -139,12 +207,13 @@ def get_upcoming_reminders(user_id: int, days: int = 7, limit: int = 10) -> List
         List of dictionaries containing reminder information
     """
     try:
-        with get_db_cursor() as cursor:
+        with get_db_cursor(readonly=True, user_id=user_id) as cursor:
             query = """
             SELECT id, user_id, title, description, reminder_time, created_at, updated_at, is_completed, notification_sent
             FROM reminders
             WHERE user_id = %s
             AND is_completed = FALSE
+            AND followup_intent IS NULL
             AND reminder_time > CURRENT_TIMESTAMP
             AND reminder_time < (CURRENT_TIMESTAMP + interval '%s days')
             ORDER BY reminder_time ASC
@@ -159,27 +228,67 @@ def get_upcoming_reminders(user_id: int, days: int = 7, limit: int = 10) -> List
         raise
 
 
-def get_pending_notifications() -> List[Dict[str, Any]]:
+@instrument_query
+@retry_reads_on_primary
+def find_reminders_by_title(user_id: int, text: str, limit: int = 5) -> List[Dict[str, Any]]:
+    """
+    Find a user's reminders whose title best matches a free-text description.
+    Served by the pg_trgm GIN index on title (see migration 04).
+    
+    Args:
+        user_id: User ID
+        text: Description to match, e.g. "call mom"
+        limit: Maximum number of candidates to return (default: 5)
+        
+    Returns:
+        List of dictionaries containing reminder information plus a "score" (0-1), best match first
+    """
+    try:
+        with get_db_cursor(readonly=True, user_id=user_id) as cursor:
+            FIND_BY_TITLE.execute(cursor, (user_id, text, limit))
+            reminders = cursor.fetchall()
+            logger.info(f"Found {len(reminders)} reminders matching '{text}' for user: {user_id}")
+            return reminders
+    except Exception as e:
+        logger.error(f"Failed to find reminders by title: {e}")
+        raise
+
+
+@instrument_query
+def get_pending_notifications(buckets: Optional[List[int]] = None, horizon_seconds: float = 0) -> List[Dict[str, Any]]:
     """
     Get reminders that are due for notification but haven't been sent yet.
-    Used by a notification service to send alerts.
+    Used by a notification service to send alerts. Reminders of users without a
+    phone number are left out, since there is nowhere to send them; they are
+    picked up once the user adds one.
+    
+    Args:
+        buckets: Only return reminders of users in these shard buckets (user_id % SHARD_BUCKETS);
+                 None returns all of them
+        horizon_seconds: Also return reminders falling due within this many seconds, so the
+                         dispatcher can fire them from memory on time (default: only due ones)
     
     Returns:
         List of dictionaries containing reminder information
     """
     try:
         with get_db_cursor() as cursor:
-            query = """
-            SELECT r.id, r.user_id, r.title, r.description, r.reminder_time, r.created_at, 
-                   r.updated_at, r.is_completed, r.notification_sent, u.email, u.username, u.time_zone
+            query = f"""
+            SELECT {NOTIFICATION_COLUMNS}
             FROM reminders r
             JOIN users u ON r.user_id = u.id
             WHERE r.is_completed = FALSE
             AND r.notification_sent = FALSE
-            AND r.reminder_time <= CURRENT_TIMESTAMP
+            AND r.followup_intent IS NULL
+            AND u.phone_number <> ''
+            AND r.reminder_time <= CURRENT_TIMESTAMP + %s * interval '1 second'
+            {"AND " + shard_predicate("r.user_id") if buckets is not None else ""}
             ORDER BY r.reminder_time ASC
             """
-            cursor.execute(query)
+            params = [horizon_seconds]
+            if buckets is not None:
+                params.append(list(buckets))
+            cursor.execute(query, params)
             reminders = cursor.fetchall()
             logger.info(f"Retrieved {len(reminders)} pending notifications")
             return reminders
@@ -188,6 +297,40 @@ def get_pending_notifications() -> List[Dict[str, Any]]:
         raise
 
 
+@instrument_query
+def get_notifications_by_ids(reminder_ids: List[int]) -> List[Dict[str, Any]]:
+    """
+    Re-read reminders that are about to be delivered, with the same columns as get_pending_notifications().
+    Used by the dispatcher to catch reminders edited, completed or deleted since they were loaded.
+    
+    Args:
+        reminder_ids: Reminder IDs
+        
+    Returns:
+        Rows of the reminders that are still pending and deliverable (whatever their reminder_time)
+    """
+    if not reminder_ids:
+        return []
+    
+    try:
+        with get_db_cursor() as cursor:
+            query = f"""
+            SELECT {NOTIFICATION_COLUMNS}
+            FROM reminders r
+            JOIN users u ON r.user_id = u.id
+            WHERE r.id = ANY(%s)
+            AND r.is_completed = FALSE
+            AND r.notification_sent = FALSE
+            AND u.phone_number <> ''
+            """
+            cursor.execute(query, (list(reminder_ids),))
+            return cursor.fetchall()
+    except Exception as e:
+        logger.error(f"Failed to re-read notifications: {e}")
+        raise
+
+
+@instrument_query
 def update_reminder(reminder_id: int, update_data: Dict[str, Any], user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
     """
     Update a reminder's information.
@@ -242,7 +385,7 @@ def update_reminder(reminder_id: int, update_data: Dict[str, Any], user_id: Opti
         params.append(user_id)
     
     try:
-        with get_db_cursor() as cursor:
+        with get_db_cursor(user_id=user_id) as cursor:
             query = f"""
             UPDATE reminders
             SET {', '.join(query_parts)}
@@ -264,6 +407,65 @@ def update_reminder(reminder_id: int, update_data: Dict[str, Any], user_id: Opti
         raise
 
 
+@instrument_query
+def snooze_reminder(user_id: int, snooze_by: timedelta, reminder_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Push a reminder back by an interval in a single UPDATE ... RETURNING round trip.
+    
+    Args:
+        user_id: User ID owning the reminder
+        snooze_by: Interval to add to the current reminder_time
+        reminder_id: Reminder to snooze (default: the user's most recently notified reminder)
+        
+    Returns:
+        Updated reminder information or None if no matching reminder was found
+    """
+    try:
+        with get_db_cursor(user_id=user_id) as cursor:
+            SNOOZE_FOR_USER.execute(cursor, (snooze_by, user_id, reminder_id))
+            reminder = cursor.fetchone()
+            
+            if reminder:
+                logger.info(f"Snoozed reminder with ID: {reminder['id']} by {snooze_by}")
+            else:
+                logger.warning(f"No reminder to snooze for user: {user_id}" +
+                               (f" with ID: {reminder_id}" if reminder_id else ""))
+            return reminder
+    except Exception as e:
+        logger.error(f"Failed to snooze reminder: {e}")
+        raise
+
+
+@instrument_query
+def reschedule_reminder(user_id: int, reminder_time: datetime, reminder_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """
+    Move a reminder to a new time in a single UPDATE ... RETURNING round trip.
+    
+    Args:
+        user_id: User ID owning the reminder
+        reminder_time: New reminder time (will be converted to UTC)
+        reminder_id: Reminder to move (default: the user's most recently notified reminder)
+        
+    Returns:
+        Updated reminder information or None if no matching reminder was found
+    """
+    try:
+        with get_db_cursor(user_id=user_id) as cursor:
+            RESCHEDULE_FOR_USER.execute(cursor, (convert_to_utc(reminder_time), user_id, reminder_id))
+            reminder = cursor.fetchone()
+            
+            if reminder:
+                logger.info(f"Rescheduled reminder with ID: {reminder['id']} to {reminder['reminder_time']}")
+            else:
+                logger.warning(f"No reminder to reschedule for user: {user_id}" +
+                               (f" with ID: {reminder_id}" if reminder_id else ""))
+            return reminder
+    except Exception as e:
+        logger.error(f"Failed to reschedule reminder: {e}")
+        raise
+
+
+@instrument_query
 def mark_reminder_completed(reminder_id: int, is_completed: bool = True, user_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
     """
     Mark a reminder as completed or not completed.
@@ -279,6 +481,7 @@ def mark_reminder_completed(reminder_id: int, is_completed: bool = True, user_id
     return update_reminder(reminder_id, {'is_completed': is_completed}, user_id)
 
 
+@instrument_query
 def mark_notification_sent(reminder_id: int) -> bool:
     """
     Mark a reminder's notification as sent.
@@ -311,6 +514,40 @@ def mark_notification_sent(reminder_id: int) -> bool:
         raise
 
 
+@instrument_query
+def mark_notifications_sent(reminder_ids: List[int]) -> List[int]:
+    """
+    Mark several reminders' notifications as sent in a single statement.
+    Used by the dispatcher after delivering a digest that covers many reminders.
+    
+    Args:
+        reminder_ids: Reminder IDs covered by the delivered message
+        
+    Returns:
+        List of reminder IDs that were marked as sent
+    """
+    if not reminder_ids:
+        return []
+    
+    try:
+        with get_db_cursor() as cursor:
+            query = """
+            UPDATE reminders
+            SET notification_sent = TRUE, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ANY(%s)
+            AND notification_sent = FALSE
+            RETURNING id
+            """
+            cursor.execute(query, (list(reminder_ids),))
+            marked = [row['id'] for row in cursor.fetchall()]
+            logger.info(f"Marked {len(marked)} notifications as sent")
+            return marked
+    except Exception as e:
+        logger.error(f"Failed to mark notifications as sent: {e}")
+        raise
+
+
+@instrument_query
 def delete_reminder(reminder_id: int, user_id: Optional[int] = None) -> bool:
     """
     Delete a reminder by its ID.
@@ -326,35 +563,33 @@ def delete_reminder(reminder_id: int, user_id: Optional[int] = None) -> bool:
         Exception: If deletion fails
     """
     try:
-        with get_db_cursor() as cursor:
+        with get_db_cursor(user_id=user_id) as cursor:
+            if user_id is not None:
+                DELETE_FOR_USER.execute(cursor, (reminder_id, user_id))
+                return _log_deleted(cursor.fetchone(), reminder_id, user_id)
+            
             query = """
             DELETE FROM reminders
             WHERE id = %s
+            RETURNING id
             """
-            params = [reminder_id]
-            
-            # If user_id is provided, add it to the query to ensure the reminder belongs to the user
-            if user_id is not None:
-                query += " AND user_id = %s"
-                params.append(user_id)
-                
-            query += " RETURNING id"
-            
-            cursor.execute(query, params)
-            result = cursor.fetchone()
-            
-            if result:
-                logger.info(f"Deleted reminder with ID: {reminder_id}")
-                return True
-            else:
-                logger.warning(f"No reminder found with ID: {reminder_id}" + 
-                               (f" for user: {user_id}" if user_id else ""))
-                return False
+            cursor.execute(query, (reminder_id,))
+            return _log_deleted(cursor.fetchone(), reminder_id, user_id)
     except Exception as e:
         logger.error(f"Failed to delete reminder: {e}")
         raise
 
 
+def _log_deleted(result: Optional[Dict[str, Any]], reminder_id: int, user_id: Optional[int]) -> bool:
+    if result:
+        logger.info(f"Deleted reminder with ID: {reminder_id}")
+        return True
+    logger.warning(f"No reminder found with ID: {reminder_id}" + 
+                   (f" for user: {user_id}" if user_id else ""))
+    return False
+
+
+@instrument_query
 def delete_completed_reminders(user_id: int, days_old: int = 30) -> int:
     """
     Delete completed reminders that are older than a specified number of days.
@@ -370,7 +605,7 @@ def delete_completed_reminders(user_id: int, days_old: int = 30) -> int:
         Exception: If deletion fails
     """
     try:
-        with get_db_cursor() as cursor:
+        with get_db_cursor(user_id=user_id) as cursor:
             query = """
             DELETE FROM reminders
             WHERE user_id = %s
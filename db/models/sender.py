@@ -0,0 +1,100 @@
+"""
+Sender mapping model: resolves Rasa conversation sender IDs to users.
+"""
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from db.connection import get_db_cursor, PreparedStatement
+from monitoring.metrics import instrument_query, record_cache_lookup
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Sender IDs from the Twilio channel are phone numbers; use them as the notification address
+PHONE_SENDER_PATTERN = re.compile(r"^(whatsapp:)?\+\d+$")
+
+# Senders resolved recently; the mapping never changes once created
+SENDER_CACHE_SIZE = 10000
+
+# Returns the existing mapping, or provisions a user and mapping, in one round trip.
+# Concurrent first contacts converge on the same user through the ON CONFLICT clauses.
+RESOLVE_SENDER = PreparedStatement("sender_users_resolve", """
+    WITH existing AS (
+        SELECT user_id FROM sender_users WHERE sender_id = $1::varchar
+    ), new_user AS (
+        INSERT INTO users (username, phone_number)
+        SELECT 'sender_' || md5($1::varchar), $2::varchar
+        WHERE NOT EXISTS (SELECT 1 FROM existing)
+        ON CONFLICT (username) DO UPDATE SET updated_at = users.updated_at
+        RETURNING id
+    ), new_mapping AS (
+        INSERT INTO sender_users (sender_id, user_id)
+        SELECT $1::varchar, id FROM new_user
+        ON CONFLICT (sender_id) DO UPDATE SET sender_id = EXCLUDED.sender_id
+        RETURNING user_id
+    )
+    SELECT user_id FROM existing
+    UNION ALL
+    SELECT user_id FROM new_mapping
+    LIMIT 1
+""")
+
+_sender_cache: "OrderedDict[str, int]" = OrderedDict()
+_sender_cache_lock = threading.Lock()
+
+
+@instrument_query
+def get_or_create_user_for_sender(sender_id: str) -> int:
+    """
+    Get the user ID for a conversation sender, creating the user on first contact.
+
+    Args:
+        sender_id: Rasa tracker.sender_id
+
+    Returns:
+        ID of the user owning this conversation
+
+    Raises:
+        Exception: If the lookup or provisioning fails
+    """
+    with _sender_cache_lock:
+        user_id = _sender_cache.get(sender_id)
+        if user_id is not None:
+            _sender_cache.move_to_end(sender_id)
+    record_cache_lookup("sender", hit=user_id is not None)
+    if user_id is not None:
+        return user_id
+
+    phone_number = sender_id if PHONE_SENDER_PATTERN.match(sender_id) else None
+
+    try:
+        with get_db_cursor() as cursor:
+            RESOLVE_SENDER.execute(cursor, (sender_id, phone_number))
+            user_id = cursor.fetchone()['user_id']
+    except Exception as e:
+        logger.error(f"Failed to resolve sender {sender_id}: {e}")
+        raise
+
+    with _sender_cache_lock:
+        _sender_cache[sender_id] = user_id
+        if len(_sender_cache) > SENDER_CACHE_SIZE:
+            _sender_cache.popitem(last=False)
+    return user_id
+
+
+def forget_sender(sender_id: Optional[str] = None) -> None:
+    """
+    Drop cached sender mappings, e.g. after deleting a user.
+
+    Args:
+        sender_id: Sender to forget (default: forget all)
+    """
+    with _sender_cache_lock:
+        if sender_id is None:
+            _sender_cache.clear()
+        else:
+            _sender_cache.pop(sender_id, None)
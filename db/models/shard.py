@@ -0,0 +1,129 @@
+"""
+Dispatcher shard model: worker heartbeats and bucket leases (migration 07).
+"""
+import logging
+from typing import List
+
+from db.connection import get_db_cursor
+from monitoring.metrics import instrument_query
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pending reminders are bucketed by user_id % SHARD_BUCKETS; must match the index in migration 07
+SHARD_BUCKETS = 64
+
+
+def shard_predicate(column: str = "user_id") -> str:
+    """
+    SQL condition restricting rows to a list of buckets, written to match idx_reminders_pending_by_shard.
+
+    Args:
+        column: User ID column, qualified if the query joins (e.g. "r.user_id")
+
+    Returns:
+        Condition taking one parameter: the list of buckets
+    """
+    return f"({column} %% {SHARD_BUCKETS}) = ANY(%s::int[])"
+
+
+@instrument_query
+def heartbeat_worker(worker_id: str, host: str, stale_after_seconds: float) -> None:
+    """
+    Record that a dispatcher worker is alive and remove workers that stopped heartbeating.
+
+    Args:
+        worker_id: Unique worker ID
+        host: Host name, for operators
+        stale_after_seconds: Workers silent for longer than this are removed
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO dispatcher_workers (worker_id, host)
+            VALUES (%s, %s)
+            ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = CURRENT_TIMESTAMP
+            """,
+            (worker_id, host),
+        )
+        cursor.execute(
+            "DELETE FROM dispatcher_workers WHERE heartbeat_at < CURRENT_TIMESTAMP - %s * interval '1 second'",
+            (stale_after_seconds,),
+        )
+
+
+@instrument_query
+def get_live_workers(ttl_seconds: float) -> List[str]:
+    """
+    Get the workers that heartbeated recently.
+
+    Args:
+        ttl_seconds: Maximum age of a live worker's last heartbeat
+
+    Returns:
+        Sorted worker IDs
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT worker_id FROM dispatcher_workers
+            WHERE heartbeat_at >= CURRENT_TIMESTAMP - %s * interval '1 second'
+            ORDER BY worker_id
+            """,
+            (ttl_seconds,),
+        )
+        return [row['worker_id'] for row in cursor.fetchall()]
+
+
+@instrument_query
+def claim_shards(worker_id: str, buckets: List[int], lease_seconds: float) -> List[int]:
+    """
+    Release buckets the worker no longer wants, then lease or renew the ones it wants.
+
+    A bucket can only be taken once its previous owner released it or its lease expired,
+    so two workers never hold the same bucket.
+
+    Args:
+        worker_id: Worker ID
+        buckets: Buckets assigned to this worker
+        lease_seconds: Lease length
+
+    Returns:
+        Sorted buckets the worker now holds
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE dispatcher_shards
+            SET owner = NULL, lease_until = NULL
+            WHERE owner = %s AND NOT (bucket = ANY(%s::smallint[]))
+            """,
+            (worker_id, list(buckets)),
+        )
+        if cursor.rowcount:
+            logger.info(f"Worker {worker_id} released {cursor.rowcount} shards")
+        cursor.execute(
+            """
+            UPDATE dispatcher_shards
+            SET owner = %s, lease_until = CURRENT_TIMESTAMP + %s * interval '1 second'
+            WHERE bucket = ANY(%s::smallint[])
+            AND (owner = %s OR owner IS NULL OR lease_until < CURRENT_TIMESTAMP)
+            RETURNING bucket
+            """,
+            (worker_id, lease_seconds, list(buckets), worker_id),
+        )
+        return sorted(row['bucket'] for row in cursor.fetchall())
+
+
+@instrument_query
+def release_worker(worker_id: str) -> None:
+    """
+    Give up all of a worker's buckets and remove it, so others take over without waiting for leases.
+
+    Args:
+        worker_id: Worker ID
+    """
+    with get_db_cursor() as cursor:
+        cursor.execute("UPDATE dispatcher_shards SET owner = NULL, lease_until = NULL WHERE owner = %s", (worker_id,))
+        cursor.execute("DELETE FROM dispatcher_workers WHERE worker_id = %s", (worker_id,))
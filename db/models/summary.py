@@ -0,0 +1,67 @@
+"""
+Reminder summary model: per-user counts and next reminder (migration 08).
+
+Triggers on reminders keep user_reminder_summary current, so answering "what's
+next?" or heading a reminder listing is a single primary-key lookup.
+"""
+import logging
+from typing import Any, Dict
+
+from db.connection import get_db_cursor, PreparedStatement, retry_reads_on_primary
+from monitoring.metrics import instrument_query
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SUMMARY_BY_USER = PreparedStatement("reminder_summary_by_user", """
+    SELECT user_id, pending_count, due_today_count, next_reminder_id, next_reminder_title,
+           next_reminder_time, summary_date, time_zone,
+           summary_date <> (CURRENT_TIMESTAMP AT TIME ZONE time_zone)::date
+           OR next_reminder_time <= CURRENT_TIMESTAMP AS is_stale
+    FROM user_reminder_summary
+    WHERE user_id = $1
+""")
+
+REFRESH_SUMMARY = PreparedStatement("reminder_summary_refresh", """
+    SELECT refresh_reminder_summary(ARRAY[$1]::integer[])
+""")
+
+SUMMARY_FIELDS = ("user_id", "pending_count", "due_today_count", "next_reminder_id", "next_reminder_title",
+                  "next_reminder_time", "summary_date", "time_zone")
+
+
+@instrument_query
+@retry_reads_on_primary
+def get_reminder_summary(user_id: int) -> Dict[str, Any]:
+    """
+    Get a user's reminder summary.
+
+    Pending and next cover upcoming reminders only. The row is recomputed if the
+    user has none yet, its day has passed (due_today_count is relative to the
+    user's local date) or its next reminder is no longer in the future.
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        Dictionary with pending_count, due_today_count (in the summary's time_zone),
+        next_reminder_id, next_reminder_title and next_reminder_time (None without a
+        pending reminder), summary_date and time_zone
+    """
+    try:
+        with get_db_cursor(readonly=True, user_id=user_id) as cursor:
+            SUMMARY_BY_USER.execute(cursor, (user_id,))
+            summary = cursor.fetchone()
+
+        if summary is None or summary['is_stale']:
+            with get_db_cursor(user_id=user_id) as cursor:
+                REFRESH_SUMMARY.execute(cursor, (user_id,))
+                SUMMARY_BY_USER.execute(cursor, (user_id,))
+                summary = cursor.fetchone()
+            logger.info(f"Refreshed reminder summary for user: {user_id}")
+
+        return {field: summary[field] for field in SUMMARY_FIELDS}
+    except Exception as e:
+        logger.error(f"Failed to get reminder summary for user: {e}")
+        raise
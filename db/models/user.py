@@ -6,7 +6,8 @@ from typing import Dict, List, Optional, Any, Union
 import hashlib
 
 from psycopg2 import sql
-from db.connection import get_db_cursor
+from db.connection import get_db_cursor, retry_reads_on_primary
+from monitoring.metrics import instrument_query
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -28,6 +29,7 @@ def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 
+@instrument_query
 def create_user(username: str, email: str, password: str, time_zone: str = 'UTC') -> Dict[str, Any]:
     """
     Create a new user in the database.
@@ -62,6 +64,8 @@ def create_user(username: str, email: str, password: str, time_zone: str = 'UTC'
         raise
 
 
+@instrument_query
+@retry_reads_on_primary
 def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
     """
     Get a user by their ID.
@@ -73,7 +77,7 @@ def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
         Dictionary containing user information or None if not found
     """
     try:
-        with get_db_cursor() as cursor:
+        with get_db_cursor(readonly=True, user_id=user_id) as cursor:
             query = """
             SELECT id, username, email, created_at, updated_at, time_zone
             FROM users
@@ -87,6 +91,7 @@ def get_user_by_id(user_id: int) -> Optional[Dict[str, Any]]:
         raise
 
 
+@instrument_query
 def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
     """
     Get a user by their email address.
@@ -112,6 +117,7 @@ def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
         raise
 
 
+@instrument_query
 def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
     """
     Get a user by their username.
@@ -137,6 +143,7 @@ def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
         raise
 
 
+@instrument_query
 def update_user(user_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     Update a user's information.
@@ -176,7 +183,7 @@ def update_user(user_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str,
     params.append(user_id)
     
     try:
-        with get_db_cursor() as cursor:
+        with get_db_cursor(user_id=user_id) as cursor:
             query = f"""
             UPDATE users
             SET {', '.join(query_parts)}
@@ -197,6 +204,7 @@ def update_user(user_id: int, update_data: Dict[str, Any]) -> Optional[Dict[str,
         raise
 
 
+@instrument_query
 def update_password(user_id: int, new_password: str) -> bool:
     """
     Update a user's password.
@@ -214,7 +222,7 @@ def update_password(user_id: int, new_password: str) -> bool:
     password_hash = hash_password(new_password)
     
     try:
-        with get_db_cursor() as cursor:
+        with get_db_cursor(user_id=user_id) as cursor:
             query = """
             UPDATE users
             SET password_hash = %s, updated_at = CURRENT_TIMESTAMP
@@ -235,6 +243,7 @@ def update_password(user_id: int, new_password: str) -> bool:
         raise
 
 
+@instrument_query
 def delete_user(user_id: int) -> bool:
     """
     Delete a user by their ID.
@@ -269,6 +278,7 @@ def delete_user(user_id: int) -> bool:
         raise
 
 
+@instrument_query
 def authenticate_user(username_or_email: str, password: str) -> Optional[Dict[str, Any]]:
     """
     Authenticate a user by username/email and password.
@@ -300,4 +310,33 @@ def authenticate_user(username_or_email: str, password: str) -> Optional[Dict[st
                 return None
     except Exception as e:
         logger.error(f"Authentication error: {e}")
-        raise 
\ No newline at end of file
+        raise 
+
+
+@instrument_query
+@retry_reads_on_primary
+def get_common_time_zones(limit: int = 20) -> List[str]:
+    """
+    Get the time zones most users are in.
+    
+    Args:
+        limit: Maximum number of zones to return
+        
+    Returns:
+        Time zone names, most common first
+    """
+    try:
+        with get_db_cursor(readonly=True) as cursor:
+            query = """
+            SELECT time_zone
+            FROM users
+            WHERE time_zone IS NOT NULL
+            GROUP BY time_zone
+            ORDER BY COUNT(*) DESC
+            LIMIT %s
+            """
+            cursor.execute(query, (limit,))
+            return [row['time_zone'] for row in cursor.fetchall()]
+    except Exception as e:
+        logger.error(f"Failed to get common time zones: {e}")
+        raise
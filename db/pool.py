@@ -0,0 +1,363 @@
+"""
+Thread-safe PostgreSQL connection pool with blocking acquire, health checks,
+connection recycling, usage statistics and optional adaptive sizing.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ACQUIRE_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+# Connections idle longer than this are pinged with SELECT 1 before being handed out
+HEALTH_CHECK_IDLE_SECONDS = float(os.getenv("DB_POOL_HEALTH_CHECK_IDLE", "30"))
+
+ADAPTIVE_SIZING = os.getenv("DB_POOL_ADAPTIVE", "false").lower() in ("1", "true", "yes")
+ADAPTIVE_MAX_CONNECTIONS = int(os.getenv("DB_POOL_ADAPTIVE_MAX", "0"))  # 0 means max_connections
+ADAPT_INTERVAL_SECONDS = float(os.getenv("DB_POOL_ADAPT_INTERVAL", "10"))
+GROW_WAIT_SECONDS = float(os.getenv("DB_POOL_GROW_WAIT_MS", "20")) / 1000
+SHRINK_WAIT_SECONDS = float(os.getenv("DB_POOL_SHRINK_WAIT_MS", "1")) / 1000
+
+# Upper bounds (seconds) of the acquire wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, float("inf"))
+
+
+class PoolTimeout(PoolError):
+    """Raised when no connection became available within the acquire timeout."""
+
+
+class PoolStats:
+    """Counters and wait-time histogram describing how a pool is used."""
+
+    def __init__(self):
+        self.acquired = 0
+        self.acquire_failures = 0
+        self.acquire_timeouts = 0
+        self.created = 0
+        self.discarded_broken = 0
+        self.recycled = 0
+        self.wait_bucket_counts = [0] * len(WAIT_BUCKETS)
+        self.wait_seconds_sum = 0.0
+        self.recent_waits: Deque[float] = deque(maxlen=500)
+
+    def record_wait(self, seconds: float) -> None:
+        self.acquired += 1
+        self.wait_seconds_sum += seconds
+        self.recent_waits.append(seconds)
+        for index, upper in enumerate(WAIT_BUCKETS):
+            if seconds <= upper:
+                self.wait_bucket_counts[index] += 1
+                break
+
+    def recent_wait_percentile(self, percentile: float) -> float:
+        if not self.recent_waits:
+            return 0.0
+        ordered = sorted(self.recent_waits)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+class MonitoredConnectionPool:
+    """
+    Drop-in replacement for psycopg2's ThreadedConnectionPool (getconn/putconn/closeall).
+
+    Differences:
+        - getconn() waits up to a timeout for a connection instead of failing when exhausted
+        - broken connections are discarded on checkout and return, long-idle ones are pinged first
+        - connections older than a maximum lifetime are closed and replaced
+        - usage is exposed through stats() for metrics
+        - with adaptive sizing, the connection limit grows while callers wait and shrinks when idle
+    """
+
+    def __init__(self, minconn: int, maxconn: int, name: str = "primary",
+                 acquire_timeout: float = ACQUIRE_TIMEOUT_SECONDS,
+                 max_lifetime: float = MAX_LIFETIME_SECONDS,
+                 adaptive: bool = ADAPTIVE_SIZING,
+                 adaptive_max: int = ADAPTIVE_MAX_CONNECTIONS,
+                 **connect_kwargs: Any):
+        """
+        Initialize the pool and open minconn connections.
+
+        Args:
+            minconn: Connections opened up front and never shrunk below
+            maxconn: Initial connection limit
+            name: Label used in logs and metrics
+            acquire_timeout: Seconds getconn() waits before raising PoolTimeout
+            max_lifetime: Seconds after which a connection is recycled (0 disables)
+            adaptive: Whether to resize the limit from observed wait times
+            adaptive_max: Hard ceiling for adaptive growth (default: maxconn)
+            **connect_kwargs: Arguments for psycopg2.connect (dsn, host, connection_factory, ...)
+        """
+        self.name = name
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.size_limit = max(maxconn, adaptive_max or maxconn)
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.adaptive = adaptive
+        self.closed = False
+        self.stats_data = PoolStats()
+
+        self._connect_kwargs = connect_kwargs
+        self._condition = threading.Condition()
+        # Idle connections with the time they were returned, most recently used last
+        self._idle: List[Tuple[Any, float]] = []
+        self._in_use: Dict[int, Any] = {}
+        self._created_at: Dict[int, float] = {}
+        self._waiting = 0
+        # Connections being opened, checked or rolled back outside the lock; they count toward the limit
+        self._reserved = 0
+        self._peak_in_use = 0
+        self._last_adapt = time.monotonic()
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self) -> Any:
+        # Connect outside the lock (a network round trip); the bookkeeping is shared with other threads.
+        # The condition's lock is reentrant, so these helpers also work for callers already holding it.
+        connection = psycopg2.connect(**self._connect_kwargs)
+        with self._condition:
+            self._created_at[id(connection)] = time.monotonic()
+            self.stats_data.created += 1
+        return connection
+
+    def _discard(self, connection: Any) -> None:
+        with self._condition:
+            self._created_at.pop(id(connection), None)
+        try:
+            if not connection.closed:
+                connection.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, connection: Any) -> bool:
+        with self._condition:
+            created_at = self._created_at.get(id(connection), time.monotonic())
+        return bool(self.max_lifetime) and time.monotonic() - created_at > self.max_lifetime
+
+    def _is_healthy(self, connection: Any, idle_since: float) -> bool:
+        """Cheap checks first; ping only connections that sat idle long enough to have been dropped."""
+        if connection.closed:
+            return False
+        if time.monotonic() - idle_since < HEALTH_CHECK_IDLE_SECONDS:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    @property
+    def _total(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._reserved
+
+    def getconn(self, key: Any = None, timeout: Optional[float] = None) -> Any:
+        """
+        Borrow a connection, waiting for one if the pool is at its limit.
+
+        Args:
+            key: Unused; accepted for ThreadedConnectionPool compatibility
+            timeout: Seconds to wait (default: the pool's acquire timeout)
+
+        Returns:
+            An open connection
+
+        Raises:
+            PoolTimeout: If no connection became available in time
+            PoolError: If the pool is closed
+            psycopg2.Error: If opening a new connection fails
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            candidate = None
+            with self._condition:
+                while True:
+                    if self.closed:
+                        self.stats_data.acquire_failures += 1
+                        raise PoolError("connection pool is closed")
+
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        self._reserved += 1
+                        break
+
+                    if self._total < self.maxconn:
+                        self._reserved += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats_data.acquire_failures += 1
+                        self.stats_data.acquire_timeouts += 1
+                        logger.error(f"Timed out after {timeout}s waiting for a connection from pool {self.name}")
+                        raise PoolTimeout(f"no connection available in pool {self.name} after {timeout}s")
+
+                    self._waiting += 1
+                    try:
+                        self._condition.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if candidate is None:
+                break
+
+            # Check the idle connection outside the lock: a ping is a network round trip
+            connection, idle_since = candidate
+            expired = self._is_expired(connection)
+            if not expired and self._is_healthy(connection, idle_since):
+                with self._condition:
+                    self._reserved -= 1
+                    if not self.closed:
+                        return self._checkout(connection, started)
+                # closeall() ran during the check; the loop raises PoolError
+
+            self._discard(connection)
+            with self._condition:
+                self._reserved -= 1
+                if expired:
+                    self.stats_data.recycled += 1
+                else:
+                    self.stats_data.discarded_broken += 1
+                self._condition.notify()
+
+        # Open the new connection outside the lock so other threads are not blocked on the network
+        try:
+            connection = self._connect()
+        except Exception:
+            with self._condition:
+                self._reserved -= 1
+                self.stats_data.acquire_failures += 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._reserved -= 1
+            return self._checkout(connection, started)
+
+    def _checkout(self, connection: Any, started: float) -> Any:
+        self._in_use[id(connection)] = connection
+        self._peak_in_use = max(self._peak_in_use, len(self._in_use))
+        self.stats_data.record_wait(time.monotonic() - started)
+        self._maybe_adapt()
+        return connection
+
+    def putconn(self, connection: Any, key: Any = None, close: bool = False) -> None:
+        """
+        Return a borrowed connection.
+
+        Args:
+            connection: Connection obtained from getconn()
+            key: Unused; accepted for ThreadedConnectionPool compatibility
+            close: Close the connection instead of keeping it
+
+        Raises:
+            PoolError: If the connection does not belong to this pool
+        """
+        with self._condition:
+            if self._in_use.pop(id(connection), None) is None:
+                raise PoolError("trying to put unkeyed connection")
+            self._reserved += 1
+
+        # Roll back outside the lock; it is a network round trip
+        keep = not (close or self.closed or connection.closed)
+        if keep and connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except Exception:
+                keep = False
+
+        with self._condition:
+            self._reserved -= 1
+            keep = keep and not self.closed
+            if keep and self._is_expired(connection):
+                self.stats_data.recycled += 1
+                keep = False
+            elif connection.closed and not self.closed:
+                self.stats_data.discarded_broken += 1
+
+            # The limit may have shrunk while this connection was out
+            pooled = keep and self._total < self.maxconn
+            if pooled:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+        if not pooled:
+            self._discard(connection)
+
+    def closeall(self) -> None:
+        """Close every connection and refuse further checkouts."""
+        with self._condition:
+            self.closed = True
+            for connection, _ in self._idle:
+                self._discard(connection)
+            for connection in list(self._in_use.values()):
+                self._discard(connection)
+            self._idle.clear()
+            self._in_use.clear()
+            self._condition.notify_all()
+
+    def _maybe_adapt(self) -> None:
+        """
+        Grow the limit while callers wait for connections; shrink it while connections sit idle.
+        Called with the lock held.
+        """
+        now = time.monotonic()
+        if not self.adaptive or now - self._last_adapt < ADAPT_INTERVAL_SECONDS:
+            return
+        self._last_adapt = now
+
+        p95_wait = self.stats_data.recent_wait_percentile(0.95)
+        if p95_wait > GROW_WAIT_SECONDS and self.maxconn < self.size_limit:
+            self.maxconn += 1
+            # Waiters only wake on notify or timeout; let them take the new slot now
+            self._condition.notify_all()
+            logger.info(f"Pool {self.name}: p95 acquire wait {p95_wait * 1000:.1f}ms, growing limit to {self.maxconn}")
+        elif p95_wait < SHRINK_WAIT_SECONDS and self._peak_in_use < self.maxconn - 1 and self.maxconn > max(self.minconn, 1):
+            self.maxconn -= 1
+            while self._idle and self._total > self.maxconn:
+                connection, _ = self._idle.pop(0)
+                self._discard(connection)
+            logger.info(f"Pool {self.name}: peak usage {self._peak_in_use}, shrinking limit to {self.maxconn}")
+        self._peak_in_use = len(self._in_use)
+        self.stats_data.recent_waits.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Snapshot of the pool's state and counters.
+
+        Returns:
+            Dictionary with gauges (in_use, idle, waiting, max_size), counters and the wait histogram
+        """
+        with self._condition:
+            data = self.stats_data
+            return {
+                "name": self.name,
+                "in_use": len(self._in_use),
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.maxconn,
+                "acquired": data.acquired,
+                "acquire_failures": data.acquire_failures,
+                "acquire_timeouts": data.acquire_timeouts,
+                "created": data.created,
+                "discarded_broken": data.discarded_broken,
+                "recycled": data.recycled,
+                "wait_seconds_sum": data.wait_seconds_sum,
+                "wait_buckets": list(zip(WAIT_BUCKETS, data.wait_bucket_counts)),
+                "wait_p95_seconds": data.recent_wait_percentile(0.95),
+            }
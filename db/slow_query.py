@@ -0,0 +1,216 @@
+"""
+Slow-query log for the database layer.
+
+Cursors handed out by get_db_cursor() time every execute(). Statements slower
+than DB_SLOW_QUERY_MS are logged with normalized SQL, the shape of their
+parameters, duration and the calling model function. For a sampled fraction
+(DB_SLOW_QUERY_EXPLAIN_SAMPLE) of slow statements the plan is logged alongside.
+Statements on cursors flagged read-only (get_db_cursor(readonly=True)) are re-run
+under EXPLAIN (ANALYZE, BUFFERS); anything else only gets a plain EXPLAIN, which
+does not run it, since a SELECT can have side effects (refresh_reminder_summary(),
+pg_advisory_lock()). When tracing is enabled each statement is also recorded as a
+db.query span.
+"""
+import os
+import re
+import sys
+import time
+import random
+import logging
+from typing import Any, Dict, Optional, Tuple, Type
+
+from psycopg2 import extensions, sql
+
+from monitoring.metrics import REGISTRY
+from monitoring.tracing import start_span, tracing_enabled
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_MS", "200")) / 1000  # 0 disables the log
+EXPLAIN_SAMPLE_RATE = float(os.getenv("DB_SLOW_QUERY_EXPLAIN_SAMPLE", "0"))
+
+SLOW_QUERIES = REGISTRY.counter(
+    "db_slow_queries_total", "Statements slower than DB_SLOW_QUERY_MS", ["statement"])
+
+# Source SQL of named prepared statements, so EXECUTE calls are logged as the query they run
+_prepared_queries: Dict[str, str] = {}
+
+_EXECUTE_PATTERN = re.compile(r"^\s*EXECUTE\s+(\w+)", re.IGNORECASE)
+_WRITE_PATTERN = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE|LOCK|FOR\s+UPDATE)\b",
+                            re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![$\w])\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "VALUES", "INSERT", "UPDATE", "DELETE", "EXECUTE")
+# Frames from these files are plumbing; the caller is the first frame outside them
+_INTERNAL_FILES = (os.sep + os.path.join("db", "connection.py"), os.sep + os.path.join("db", "slow_query.py"),
+                   os.sep + os.path.join("monitoring", "metrics.py"), os.sep + "contextlib.py")
+
+
+def register_prepared_query(name: str, query: str) -> None:
+    """
+    Remember the SQL behind a prepared statement name.
+
+    Args:
+        name: Statement name used with EXECUTE
+        query: SQL the statement was prepared from
+    """
+    _prepared_queries[name] = query
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Collapse whitespace and replace literals with ? so equivalent statements group together.
+
+    Args:
+        query: SQL text
+
+    Returns:
+        Normalized SQL
+    """
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def params_shape(params: Any) -> str:
+    """
+    Describe parameters by type and size without logging their values.
+
+    Args:
+        params: Sequence or mapping passed to execute()
+
+    Returns:
+        Description such as "(int, str, list[3])"
+    """
+    def describe(value: Any) -> str:
+        if value is None:
+            return "None"
+        if isinstance(value, (list, tuple)):
+            return f"{type(value).__name__}[{len(value)}]"
+        return type(value).__name__
+
+    if params is None:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {describe(value)}" for key, value in params.items()) + "}"
+    return "(" + ", ".join(describe(value) for value in params) + ")"
+
+
+def _find_caller() -> str:
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.endswith(_INTERNAL_FILES) and "psycopg2" not in filename:
+            return f"{os.path.relpath(filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+class SlowQueryCursorMixin:
+    """Times execute(), reports statements slower than the threshold and traces each statement."""
+
+    # Set by get_db_cursor(readonly=True); only then may a slow statement be run again under EXPLAIN ANALYZE
+    read_only = False
+
+    def execute(self, query: Any, vars: Any = None) -> Any:
+        if tracing_enabled():
+            statement, source = self._describe(query)
+            with start_span("db.query", {"db.system": "postgresql", "db.statement": normalize_sql(source),
+                                         "db.prepared_statement": statement}):
+                return self._timed_execute(query, vars)
+        return self._timed_execute(query, vars)
+
+    def _timed_execute(self, query: Any, vars: Any) -> Any:
+        if not SLOW_QUERY_SECONDS:
+            return super().execute(query, vars)
+
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            elapsed = time.perf_counter() - started
+            if elapsed >= SLOW_QUERY_SECONDS:
+                self._report_slow_query(query, vars, elapsed, failed=True)
+            raise
+        elapsed = time.perf_counter() - started
+        if elapsed >= SLOW_QUERY_SECONDS:
+            self._report_slow_query(query, vars, elapsed)
+        return result
+
+    def _query_text(self, query: Any) -> str:
+        if isinstance(query, sql.Composable):
+            return query.as_string(self.connection)
+        if isinstance(query, bytes):
+            return query.decode("utf-8", "replace")
+        return query
+
+    def _describe(self, query: Any) -> Tuple[str, str]:
+        """Prepared statement name ("adhoc" for plain SQL) and the SQL it runs."""
+        query = self._query_text(query)
+        match = _EXECUTE_PATTERN.match(query)
+        if match and match.group(1) in _prepared_queries:
+            return match.group(1), _prepared_queries[match.group(1)]
+        return "adhoc", query
+
+    def _report_slow_query(self, query: Any, vars: Any, elapsed: float, failed: bool = False) -> None:
+        try:
+            query = self._query_text(query)
+            statement, source = self._describe(query)
+            SLOW_QUERIES.inc(statement)
+            logger.warning(f"Slow query{' (failed)' if failed else ''}: {elapsed * 1000:.1f}ms "
+                           f"at {_find_caller()} [{statement}] {normalize_sql(source)} params={params_shape(vars)}")
+
+            if not failed and EXPLAIN_SAMPLE_RATE and random.random() < EXPLAIN_SAMPLE_RATE:
+                self._log_explain(query, vars, source)
+        except Exception as e:
+            logger.error(f"Failed to report slow query: {e}")
+
+    def _log_explain(self, query: str, vars: Any, source: str) -> None:
+        """
+        Log the plan of a slow statement. EXPLAIN ANALYZE runs the statement again, so it is
+        only used on read-only cursors; other statements get a plain EXPLAIN.
+        """
+        if not source.lstrip().upper().startswith(_EXPLAINABLE):
+            return
+        analyze = self.read_only and not _WRITE_PATTERN.search(source)
+
+        connection = self.connection
+        if connection.info.transaction_status not in (extensions.TRANSACTION_STATUS_IDLE,
+                                                       extensions.TRANSACTION_STATUS_INTRANS):
+            return
+
+        # A savepoint keeps a failed EXPLAIN from aborting the caller's transaction
+        with connection.cursor() as explain_cursor:
+            explain_cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                explain_cursor.execute(f"EXPLAIN {'(ANALYZE, BUFFERS) ' if analyze else ''}{query}", vars)
+                plan = "\n".join(row[0] for row in explain_cursor.fetchall())
+                explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            except Exception as e:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                logger.error(f"EXPLAIN of slow query failed: {e}")
+                return
+        logger.warning(f"{'Plan' if analyze else 'Estimated plan'} for slow query {normalize_sql(source)}:\n{plan}")
+
+
+_cursor_classes: Dict[Type, Type] = {}
+
+
+def slow_query_cursor(cursor_factory: Optional[Type] = None) -> Type:
+    """
+    Get a cursor class that adds the slow-query log to a psycopg2 cursor class.
+
+    Args:
+        cursor_factory: Cursor class to extend (default: psycopg2's plain cursor)
+
+    Returns:
+        Cursor class usable as connection.cursor(cursor_factory=...)
+    """
+    base = cursor_factory or extensions.cursor
+    cursor_class = _cursor_classes.get(base)
+    if cursor_class is None:
+        cursor_class = _cursor_classes[base] = type(f"SlowQuery{base.__name__}", (SlowQueryCursorMixin, base), {})
+    return cursor_class
@@ -0,0 +1,18 @@
+-- Move aside the legacy reminders table created by older action servers
+-- Older versions of actions/actions.py created "reminders" with (user_id TEXT, task TEXT).
+-- If that table exists, rename it so 02_create_reminders_table.sql can create the
+-- canonical schema; its rows are migrated in 05_create_sender_users_table.sql.
+
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'reminders' AND column_name = 'task'
+    ) THEN
+        ALTER TABLE reminders RENAME TO reminders_legacy;
+        ALTER SEQUENCE IF EXISTS reminders_id_seq RENAME TO reminders_legacy_id_seq;
+        -- Renaming the table keeps its primary key index name, which 02 needs for the new table
+        ALTER INDEX IF EXISTS reminders_pkey RENAME TO reminders_legacy_pkey;
+        DROP INDEX IF EXISTS idx_reminders_task_trgm;
+    END IF;
+END $$;
@@ -0,0 +1,7 @@
+-- Add phone number to users
+-- Notifications are delivered over Twilio (SMS/WhatsApp), so each user needs a destination address
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS phone_number VARCHAR(32);
+
+-- Add comments for documentation
+COMMENT ON COLUMN users.phone_number IS 'Twilio destination for notifications (e.g. +15551234567 or whatsapp:+15551234567)';
@@ -0,0 +1,9 @@
+-- Add trigram index on reminder titles
+-- Supports fuzzy lookups such as "cancel the call mom reminder" without scanning every row
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_reminders_title_trgm ON reminders USING gin (title gin_trgm_ops);
+
+-- Add comments for documentation
+COMMENT ON INDEX idx_reminders_title_trgm IS 'Trigram index for fuzzy title matching (word_similarity / <% operator)';
@@ -0,0 +1,55 @@
+-- Map conversation sender IDs to users
+-- Rasa identifies users by tracker.sender_id (a socket session, a phone number, "whatsapp:+..."),
+-- while reminders belong to rows in the users table. Chat users are provisioned on first contact.
+
+-- Chat-provisioned users have no email or password
+ALTER TABLE users ALTER COLUMN email DROP NOT NULL;
+ALTER TABLE users ALTER COLUMN password_hash DROP NOT NULL;
+
+CREATE TABLE IF NOT EXISTS sender_users (
+    sender_id VARCHAR(255) PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    -- Foreign key constraint to users table
+    CONSTRAINT fk_sender_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_sender_users_user_id ON sender_users(user_id);
+
+-- Listing a user's reminders in time order is the most common query
+CREATE INDEX IF NOT EXISTS idx_reminders_user_id_reminder_time ON reminders(user_id, reminder_time);
+
+-- Migrate rows from the legacy action-server table, if 01b moved one aside
+DO $$
+BEGIN
+    IF to_regclass('reminders_legacy') IS NOT NULL THEN
+        INSERT INTO users (username, phone_number)
+        SELECT DISTINCT 'sender_' || md5(l.user_id),
+               CASE WHEN l.user_id ~ '^(whatsapp:)?\+[0-9]+$' THEN l.user_id END
+        FROM reminders_legacy l
+        ON CONFLICT (username) DO NOTHING;
+
+        INSERT INTO sender_users (sender_id, user_id)
+        SELECT DISTINCT l.user_id, u.id
+        FROM reminders_legacy l
+        JOIN users u ON u.username = 'sender_' || md5(l.user_id)
+        ON CONFLICT (sender_id) DO NOTHING;
+
+        -- Legacy rows never tracked notifications reliably; treat past reminders as already sent
+        INSERT INTO reminders (user_id, title, reminder_time, created_at, notification_sent)
+        SELECT s.user_id, left(l.task, 100), l.reminder_time, l.created_at, l.reminder_time <= CURRENT_TIMESTAMP
+        FROM reminders_legacy l
+        JOIN sender_users s ON s.sender_id = l.user_id;
+
+        DROP TABLE reminders_legacy;
+    END IF;
+END $$;
+
+-- Add comments for documentation
+COMMENT ON TABLE sender_users IS 'Maps conversation sender IDs (tracker.sender_id) to users';
+COMMENT ON COLUMN sender_users.sender_id IS 'Channel-specific conversation ID as seen by Rasa';
+COMMENT ON COLUMN sender_users.user_id IS 'Foreign key to users table';
@@ -0,0 +1,26 @@
+-- Conversational follow-ups stored as reminders
+-- Instead of Rasa's in-process ReminderScheduled jobs, a follow-up ("did you finish X?") is a
+-- reminders row that carries the conversation and the intent to trigger. The dispatcher fires
+-- due follow-ups through Rasa's trigger_intent API, so they survive restarts and are shared by
+-- every Rasa replica.
+
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS sender_id VARCHAR(255);
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS followup_intent VARCHAR(100);
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS followup_entities JSONB;
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS followup_name VARCHAR(100);
+
+-- Due follow-ups are fetched in time order; plain reminders never match this index
+CREATE INDEX IF NOT EXISTS idx_reminders_pending_followups
+    ON reminders(reminder_time)
+    WHERE followup_intent IS NOT NULL AND notification_sent = FALSE AND is_completed = FALSE;
+
+-- Scheduling a named follow-up replaces the conversation's pending one of the same name
+CREATE INDEX IF NOT EXISTS idx_reminders_followup_name
+    ON reminders(sender_id, followup_name)
+    WHERE followup_intent IS NOT NULL AND notification_sent = FALSE;
+
+-- Add comments for documentation
+COMMENT ON COLUMN reminders.sender_id IS 'Conversation a follow-up is triggered in (NULL for plain reminders)';
+COMMENT ON COLUMN reminders.followup_intent IS 'Intent triggered via the Rasa API when due; NULL for reminders delivered by message';
+COMMENT ON COLUMN reminders.followup_entities IS 'Entities passed with the triggered intent';
+COMMENT ON COLUMN reminders.followup_name IS 'Optional follow-up name; a new follow-up replaces a pending one of the same name';
@@ -0,0 +1,33 @@
+-- Sharding of the notification dispatcher
+-- Pending reminders are split into 64 buckets by user_id % 64. Each dispatcher worker
+-- leases the buckets that rendezvous hashing assigns to it (notifications/sharding.py)
+-- and only polls those, so adding workers adds throughput.
+-- The bucket count is fixed by the expression index below; changing it needs a new migration.
+
+CREATE TABLE IF NOT EXISTS dispatcher_workers (
+    worker_id VARCHAR(255) PRIMARY KEY,
+    host VARCHAR(255),
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    heartbeat_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS dispatcher_shards (
+    bucket SMALLINT PRIMARY KEY,
+    owner VARCHAR(255),
+    lease_until TIMESTAMP WITH TIME ZONE
+);
+
+INSERT INTO dispatcher_shards (bucket)
+SELECT generate_series(0, 63)
+ON CONFLICT (bucket) DO NOTHING;
+
+-- Serves "pending reminders of these buckets, oldest first" for reminders and follow-ups alike
+CREATE INDEX IF NOT EXISTS idx_reminders_pending_by_shard
+    ON reminders ((user_id % 64), reminder_time)
+    WHERE notification_sent = FALSE AND is_completed = FALSE;
+
+-- Add comments for documentation
+COMMENT ON TABLE dispatcher_workers IS 'Live notification dispatcher workers and their heartbeats';
+COMMENT ON TABLE dispatcher_shards IS 'Lease of each user_id % 64 bucket of pending reminders to one dispatcher worker';
+COMMENT ON COLUMN dispatcher_shards.owner IS 'Worker currently allowed to deliver the bucket (NULL when free)';
+COMMENT ON COLUMN dispatcher_shards.lease_until IS 'Lease expiry; another worker may take the bucket after this time';
@@ -0,0 +1,157 @@
+-- Per-user reminder summary maintained by triggers
+-- "What's next?" and the reminder listing header read one row by primary key instead of
+-- scanning the user's reminders. Statement-level triggers on reminders recompute the row
+-- of every user a statement touched (once per user, however many rows changed). Updates
+-- that change no summarised column, such as the dispatcher marking notification_sent,
+-- recompute nothing.
+-- Only upcoming reminders (reminder_time in the future) count as pending or next, whether or
+-- not a notification was sent: chat-only users have no phone and are never notified.
+-- due_today_count is relative to summary_date, the user's local date when it was computed.
+-- Readers call refresh_reminder_summary() when that date or next_reminder_time has passed
+-- (db/models/summary.py); until then no reminder can have moved from upcoming to past.
+
+CREATE TABLE IF NOT EXISTS user_reminder_summary (
+    user_id INTEGER PRIMARY KEY,
+    pending_count INTEGER NOT NULL DEFAULT 0,
+    due_today_count INTEGER NOT NULL DEFAULT 0,
+    next_reminder_id INTEGER,
+    next_reminder_title VARCHAR(100),
+    next_reminder_time TIMESTAMP WITH TIME ZONE,
+    summary_date DATE NOT NULL,
+    time_zone VARCHAR(50) NOT NULL DEFAULT 'UTC',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT fk_summary_user
+        FOREIGN KEY (user_id)
+        REFERENCES users(id)
+        ON DELETE CASCADE
+);
+
+-- Recompute the summary rows of the given users (in ID order, to avoid deadlocks).
+-- A transaction-level advisory lock per user serializes concurrent refreshes: the second one
+-- waits until the first commits, then reads the reminders again, so neither update is lost.
+CREATE OR REPLACE FUNCTION refresh_reminder_summary(p_user_ids INTEGER[]) RETURNS VOID AS $$
+DECLARE
+    v_user_id INTEGER;
+    v_time_zone TEXT;
+    v_today DATE;
+BEGIN
+    FOREACH v_user_id IN ARRAY ARRAY(SELECT DISTINCT unnest(p_user_ids) ORDER BY 1) LOOP
+        PERFORM pg_advisory_xact_lock(hashtext('user_reminder_summary'), v_user_id);
+
+        SELECT COALESCE(time_zone, 'UTC') INTO v_time_zone FROM users WHERE id = v_user_id;
+        IF NOT FOUND THEN
+            -- User deleted in this statement; its summary row goes with it
+            CONTINUE;
+        END IF;
+
+        BEGIN
+            v_today := (CURRENT_TIMESTAMP AT TIME ZONE v_time_zone)::date;
+        EXCEPTION WHEN invalid_parameter_value THEN
+            -- An unknown users.time_zone must not make reminder writes fail
+            v_time_zone := 'UTC';
+            v_today := (CURRENT_TIMESTAMP AT TIME ZONE v_time_zone)::date;
+        END;
+
+        INSERT INTO user_reminder_summary (user_id, pending_count, due_today_count, next_reminder_id,
+                                           next_reminder_title, next_reminder_time, summary_date,
+                                           time_zone, updated_at)
+        SELECT v_user_id, stats.pending_count, stats.due_today_count, upcoming.id, upcoming.title,
+               upcoming.reminder_time, v_today, v_time_zone, CURRENT_TIMESTAMP
+        FROM (
+            SELECT COUNT(*) AS pending_count,
+                   COUNT(*) FILTER (
+                       WHERE (reminder_time AT TIME ZONE v_time_zone)::date = v_today
+                   ) AS due_today_count
+            FROM reminders
+            WHERE user_id = v_user_id AND is_completed = FALSE AND followup_intent IS NULL
+            AND reminder_time > CURRENT_TIMESTAMP
+        ) stats
+        LEFT JOIN LATERAL (
+            SELECT id, title, reminder_time
+            FROM reminders
+            WHERE user_id = v_user_id AND is_completed = FALSE AND followup_intent IS NULL
+            AND reminder_time > CURRENT_TIMESTAMP
+            ORDER BY reminder_time ASC
+            LIMIT 1
+        ) upcoming ON TRUE
+        ON CONFLICT (user_id) DO UPDATE SET
+            pending_count = EXCLUDED.pending_count,
+            due_today_count = EXCLUDED.due_today_count,
+            next_reminder_id = EXCLUDED.next_reminder_id,
+            next_reminder_title = EXCLUDED.next_reminder_title,
+            next_reminder_time = EXCLUDED.next_reminder_time,
+            summary_date = EXCLUDED.summary_date,
+            time_zone = EXCLUDED.time_zone,
+            updated_at = EXCLUDED.updated_at;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION reminders_refresh_summary() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_reminder_summary(ARRAY(SELECT user_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_reminder_summary(ARRAY(SELECT user_id FROM old_rows));
+    ELSE
+        -- Only rows whose summarised columns changed. A statement trigger with transition tables
+        -- cannot take an UPDATE OF column list or a WHEN clause, so the filter lives here.
+        PERFORM refresh_reminder_summary(ARRAY(
+            SELECT unnest(ARRAY[new_rows.user_id, old_rows.user_id])
+            FROM new_rows
+            JOIN old_rows ON old_rows.id = new_rows.id
+            WHERE (new_rows.user_id, new_rows.title, new_rows.reminder_time, new_rows.is_completed,
+                   new_rows.followup_intent)
+                  IS DISTINCT FROM (old_rows.user_id, old_rows.title, old_rows.reminder_time,
+                                    old_rows.is_completed, old_rows.followup_intent)
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION users_refresh_summary() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_reminder_summary(ARRAY[NEW.id]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger
+DROP TRIGGER IF EXISTS trg_reminders_summary_insert ON reminders;
+CREATE TRIGGER trg_reminders_summary_insert
+    AFTER INSERT ON reminders
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reminders_refresh_summary();
+
+DROP TRIGGER IF EXISTS trg_reminders_summary_update ON reminders;
+CREATE TRIGGER trg_reminders_summary_update
+    AFTER UPDATE ON reminders
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reminders_refresh_summary();
+
+DROP TRIGGER IF EXISTS trg_reminders_summary_delete ON reminders;
+CREATE TRIGGER trg_reminders_summary_delete
+    AFTER DELETE ON reminders
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION reminders_refresh_summary();
+
+-- "Today" depends on the user's time zone
+DROP TRIGGER IF EXISTS trg_users_summary_time_zone ON users;
+CREATE TRIGGER trg_users_summary_time_zone
+    AFTER UPDATE OF time_zone ON users
+    FOR EACH ROW
+    WHEN (OLD.time_zone IS DISTINCT FROM NEW.time_zone)
+    EXECUTE FUNCTION users_refresh_summary();
+
+-- Backfill existing users
+SELECT refresh_reminder_summary(ARRAY(SELECT DISTINCT user_id FROM reminders));
+
+-- Add comments for documentation
+COMMENT ON TABLE user_reminder_summary IS 'Per-user reminder counts and next reminder, kept current by triggers on reminders';
+COMMENT ON COLUMN user_reminder_summary.pending_count IS 'Upcoming reminders not completed (follow-ups excluded)';
+COMMENT ON COLUMN user_reminder_summary.due_today_count IS 'Pending reminders whose local date is summary_date';
+COMMENT ON COLUMN user_reminder_summary.next_reminder_id IS 'Earliest upcoming reminder; the row is stale once its time has passed';
+COMMENT ON COLUMN user_reminder_summary.summary_date IS 'Local date (in time_zone) due_today_count refers to; stale once passed';
+COMMENT ON COLUMN user_reminder_summary.time_zone IS 'users.time_zone used for "today" (UTC if unrecognised)';
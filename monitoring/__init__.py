@@ -0,0 +1,12 @@
+"""
+Metrics instrumentation for the action server and database layer.
+"""
+from monitoring.metrics import (
+    REGISTRY,
+    MetricsRegistry,
+    Counter,
+    Histogram,
+    instrument_action,
+    instrument_query,
+    record_cache_lookup,
+)
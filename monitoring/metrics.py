@@ -0,0 +1,374 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Action latency, DB query time, error counts and cache hit rates are recorded
+here and served on the action server's /metrics endpoint (see server/app.py).
+The NLU server (nlu_server/app.py) serves its parse metrics the same way.
+Processes without a web app serve them with serve_metrics(), and
+merge_expositions() combines the metrics of several processes (server/launcher.py).
+"""
+import time
+import logging
+import functools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from monitoring.tracing import start_span
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                    for labels, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets, optionally split by labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> (per-bucket counts, sum, count)
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        with self._lock:
+            entry = self._values.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            for index, upper in enumerate(self.buckets):
+                if value <= upper:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return entry[2] if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(entry[0]), entry[1], entry[2])) for labels, entry in self._values.items())
+        lines = []
+        for labels, (bucket_counts, total, count) in items:
+            lines.extend(histogram_samples(self.name, self.labelnames, labels, self.buckets,
+                                           bucket_counts, total, count))
+        return lines
+
+
+def histogram_samples(name: str, labelnames: Sequence[str], labels: Sequence[str], buckets: Sequence[float],
+                      bucket_counts: Sequence[int], total: float, count: int) -> List[str]:
+    """
+    Render one histogram series from per-bucket (non-cumulative) counts.
+
+    Args:
+        name: Metric name
+        labelnames: Label names of the series
+        labels: Label values of the series
+        buckets: Bucket upper bounds, ending with +inf
+        bucket_counts: Observations per bucket
+        total: Sum of all observations
+        count: Number of observations
+
+    Returns:
+        Prometheus text lines for the _bucket, _sum and _count samples
+    """
+    lines = []
+    cumulative = 0
+    for upper, bucket_count in zip(buckets, bucket_counts):
+        cumulative += bucket_count
+        lines.append(f"{name}_bucket{_format_labels(tuple(labelnames) + ('le',), tuple(labels) + (_format_value(upper),))} "
+                     f"{cumulative}")
+    label_text = _format_labels(labelnames, labels)
+    lines.append(f"{name}_sum{label_text} {_format_value(float(total))}")
+    lines.append(f"{name}_count{label_text} {count}")
+    return lines
+
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them for scraping.
+
+    Collectors are callables returning already-formatted exposition lines; they
+    let state owned elsewhere (e.g. connection pool gauges) be read at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class: type, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def register_collector(self, collector: Callable[[], List[str]]) -> None:
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text, newline-terminated
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for collector in collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector {collector} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def serve_metrics(port: int, host: str = "0.0.0.0", render: Optional[Callable[[], str]] = None) -> Any:
+    """
+    Serve /metrics over HTTP from a daemon thread.
+
+    Args:
+        port: Port to listen on (0 picks a free one; see server.server_address)
+        host: Interface to bind
+        render: Callable returning the exposition text (default: REGISTRY.render)
+
+    Returns:
+        The running http.server.ThreadingHTTPServer; call shutdown() to stop it
+    """
+    # Imported here: most processes serve /metrics from their web app, and http.server is slow to import
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    render = render or REGISTRY.render
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            # Scrapes every few seconds would drown the process's own logs
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
+
+def label_exposition(text: str, label: str, value: str) -> List[Tuple[str, List[str]]]:
+    """
+    Add a label to every sample of a Prometheus exposition.
+
+    Args:
+        text: Exposition text
+        label: Label name, e.g. "worker"
+        value: Label value
+
+    Returns:
+        (metric name, lines) per metric family, in order; lines start with its HELP and TYPE
+    """
+    families: List[Tuple[str, List[str]]] = []
+    pair = f'{label}="{value}"'
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line.startswith("#"):
+            parts = line.split(" ", 3)
+            if len(parts) >= 3 and parts[1] == "HELP":
+                families.append((parts[2], [line]))
+            elif families:
+                families[-1][1].append(line)
+            continue
+        name, brace, rest = line.partition("{")
+        if brace:
+            line = f"{name}{{{pair},{rest}" if not rest.startswith("}") else f"{name}{{{pair}{rest}"
+        else:
+            name, _, sample = line.partition(" ")
+            line = f"{name}{{{pair}}} {sample}"
+        if not families:
+            families.append((name, []))
+        families[-1][1].append(line)
+    return families
+
+
+def merge_expositions(texts: Dict[str, str], label: str = "worker") -> str:
+    """
+    Merge the expositions of several processes, labelling each series with its source.
+
+    Args:
+        texts: Exposition text by label value (e.g. worker slot)
+        label: Label distinguishing the sources
+
+    Returns:
+        One exposition with each metric family's HELP and TYPE once, followed by all its samples
+    """
+    merged: Dict[str, List[str]] = {}
+    for value, text in texts.items():
+        for name, lines in label_exposition(text, label, value):
+            family = merged.get(name)
+            if family is None:
+                merged[name] = lines
+            else:
+                family.extend(line for line in lines if not line.startswith("#"))
+    return "".join(line + "\n" for lines in merged.values() for line in lines)
+
+
+ACTION_LATENCY = REGISTRY.histogram(
+    "rasa_action_duration_seconds", "Time spent in custom action run()", ["action"])
+ACTION_ERRORS = REGISTRY.counter(
+    "rasa_action_errors_total", "Custom action runs that raised", ["action"])
+DB_QUERY_LATENCY = REGISTRY.histogram(
+    "db_query_duration_seconds", "Time spent in db.models functions, including connection acquire", ["query"])
+DB_QUERY_ERRORS = REGISTRY.counter(
+    "db_query_errors_total", "db.models calls that raised", ["query"])
+DB_STATEMENT_LATENCY = REGISTRY.histogram(
+    "db_statement_duration_seconds", "Execution time of named prepared statements", ["statement"])
+CACHE_REQUESTS = REGISTRY.counter(
+    "cache_requests_total", "Cache lookups by outcome", ["cache", "result"])
+NLU_PARSE_LATENCY = REGISTRY.histogram(
+    "nlu_parse_duration_seconds", "Time to parse a message on the NLU server, by path taken", ["path"])
+NLU_FAST_PATH_MATCHES = REGISTRY.counter(
+    "nlu_fast_path_matches_total", "Messages answered by the deterministic fast path", ["intent"])
+
+
+def instrument_action(run: Callable) -> Callable:
+    """
+    Decorator for async Action.run methods recording latency and errors by action name,
+    and tracing each run as a span.
+
+    Example:
+        ```python
+        class ActionListReminders(Action):
+            @instrument_action
+            async def run(self, dispatcher, tracker, domain):
+                ...
+        ```
+    """
+    @functools.wraps(run)
+    async def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        action_name = self.name()
+        started = time.perf_counter()
+        try:
+            with start_span(f"action {action_name}", {"rasa.action": action_name}):
+                return await run(self, *args, **kwargs)
+        except Exception:
+            ACTION_ERRORS.inc(action_name)
+            raise
+        finally:
+            ACTION_LATENCY.observe(time.perf_counter() - started, action_name)
+    return wrapper
+
+
+def instrument_query(func: Optional[Callable] = None, *, name: Optional[str] = None) -> Callable:
+    """
+    Decorator for db.models functions recording latency and errors by function name,
+    and tracing each call as a span.
+
+    Args:
+        func: Function to wrap (when used without arguments)
+        name: Label to record under (default: the function's name)
+    """
+    def decorate(inner: Callable) -> Callable:
+        query_name = name or inner.__name__
+
+        @functools.wraps(inner)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                with start_span(f"db.models {query_name}", {"db.system": "postgresql", "code.function": query_name}):
+                    return inner(*args, **kwargs)
+            except Exception:
+                DB_QUERY_ERRORS.inc(query_name)
+                raise
+            finally:
+                DB_QUERY_LATENCY.observe(time.perf_counter() - started, query_name)
+        return wrapper
+
+    return decorate(func) if func is not None else decorate
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """
+    Count a cache lookup.
+
+    Args:
+        cache: Cache name, e.g. "sender"
+        hit: Whether the lookup was served from the cache
+    """
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
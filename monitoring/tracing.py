@@ -0,0 +1,272 @@
+"""
+Lightweight tracing compatible with OpenTelemetry and W3C Trace Context.
+
+Spans carry OpenTelemetry's identifiers (128-bit trace id, 64-bit span id) and
+field names, and context is propagated with the standard `traceparent` header,
+so traces started by an instrumented caller continue through the action server.
+Finished spans are written as JSON lines by the exporter selected with
+TRACING_EXPORTER:
+
+- none (default): spans are not recorded
+- console: one JSON object per span on the monitoring.tracing logger
+- file: appended to TRACING_FILE (default traces.jsonl) for offline inspection
+"""
+import os
+import json
+import time
+import random
+import logging
+import threading
+import contextlib
+import contextvars
+from typing import Any, Dict, Generator, Mapping, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "rasa-action-server")
+
+TRACEPARENT_HEADER = "traceparent"
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+
+class SpanContext:
+    """Identifies a span within a trace, as carried by the traceparent header."""
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool = True):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    def to_traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    """
+    Parse a W3C traceparent header.
+
+    Args:
+        value: Header value, e.g. "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+    Returns:
+        The remote span context, or None if the header is missing or malformed
+    """
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return SpanContext(parts[1], parts[2], sampled=bool(flags & 1))
+
+
+class Span:
+    """A timed operation; ended spans are handed to the exporter."""
+
+    def __init__(self, name: str, context: SpanContext, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = "UNSET"
+        self.events = []
+        self.start_time_ns = time.time_ns()
+        self.end_time_ns: Optional[int] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.status = "ERROR"
+        self.events.append({
+            "name": "exception",
+            "time_unix_nano": time.time_ns(),
+            "attributes": {"exception.type": type(exception).__name__, "exception.message": str(exception)},
+        })
+
+    def end(self) -> None:
+        if self.end_time_ns is None:
+            self.end_time_ns = time.time_ns()
+            if self.context.sampled:
+                _exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_id,
+            "start_time_unix_nano": self.start_time_ns,
+            "end_time_unix_nano": self.end_time_ns,
+            "duration_ms": round(((self.end_time_ns or time.time_ns()) - self.start_time_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+            "resource": {"service.name": SERVICE_NAME},
+        }
+
+
+class SpanExporter:
+    """Writes finished spans as JSON lines to the log or a file."""
+
+    def __init__(self, kind: str = TRACING_EXPORTER, path: str = TRACING_FILE):
+        self.kind = kind
+        self.path = path
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.kind in ("console", "file")
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str)
+        if self.kind == "console":
+            logger.info(line)
+        elif self.kind == "file":
+            with self._lock:
+                with open(self.path, "a") as trace_file:
+                    trace_file.write(line + "\n")
+
+
+_exporter = SpanExporter()
+
+
+def set_exporter(exporter: SpanExporter) -> None:
+    """
+    Replace the process-wide exporter (e.g. from a benchmark or script).
+
+    Args:
+        exporter: Exporter receiving finished spans
+    """
+    global _exporter
+    _exporter = exporter
+
+
+def tracing_enabled() -> bool:
+    return _exporter.enabled
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def begin_span(name: str, attributes: Optional[Dict[str, Any]] = None,
+               parent: Optional[SpanContext] = None) -> Tuple[Optional[Span], Any]:
+    """
+    Start a span and make it current, for callers that cannot use a with block
+    (e.g. request/response middleware). Pair with finish_span().
+
+    Args:
+        name: Operation name
+        attributes: Initial span attributes
+        parent: Remote parent extracted from a traceparent header
+
+    Returns:
+        Tuple of (span or None when tracing is disabled, token for finish_span)
+    """
+    if not _exporter.enabled:
+        return None, None
+
+    parent_span = _current_span.get()
+    if parent is None and parent_span is not None:
+        parent = parent_span.context
+
+    if parent is not None:
+        context = SpanContext(parent.trace_id, f"{random.getrandbits(64):016x}", parent.sampled)
+    else:
+        context = SpanContext(f"{random.getrandbits(128):032x}", f"{random.getrandbits(64):016x}",
+                              random.random() < TRACING_SAMPLE_RATE)
+
+    span = Span(name, context, parent.span_id if parent is not None else None, attributes)
+    return span, _current_span.set(span)
+
+
+def finish_span(span: Optional[Span], token: Any) -> None:
+    """
+    End a span started with begin_span() and restore the previous current span.
+
+    Args:
+        span: Span returned by begin_span()
+        token: Token returned by begin_span()
+    """
+    if span is None:
+        return
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # Token from another context (e.g. middleware running in a different task)
+        _current_span.set(None)
+    span.end()
+
+
+@contextlib.contextmanager
+def start_span(name: str, attributes: Optional[Dict[str, Any]] = None,
+               parent: Optional[SpanContext] = None) -> Generator[Optional[Span], None, None]:
+    """
+    Start a span as a child of the current span (or of an explicit remote parent) and make it current.
+
+    Args:
+        name: Operation name, e.g. "action action_list_reminders"
+        attributes: Initial span attributes
+        parent: Remote parent extracted from a traceparent header
+
+    Yields:
+        The span, or None when tracing is disabled
+
+    Example:
+        ```python
+        with start_span("db get_reminders_by_user_id", {"db.system": "postgresql"}):
+            ...
+        ```
+    """
+    span, token = begin_span(name, attributes, parent)
+    try:
+        yield span
+    except BaseException as e:
+        if span is not None:
+            span.record_exception(e)
+        raise
+    finally:
+        finish_span(span, token)
+
+
+def extract_context(headers: Mapping[str, str]) -> Optional[SpanContext]:
+    """
+    Get the remote parent span context from incoming request headers.
+
+    Args:
+        headers: Request headers (case-insensitive mapping)
+
+    Returns:
+        Parent span context, or None
+    """
+    return parse_traceparent(headers.get(TRACEPARENT_HEADER))
+
+
+def inject_context(headers: Dict[str, str]) -> Dict[str, str]:
+    """
+    Add the current span's traceparent to outgoing request headers.
+
+    Args:
+        headers: Headers to update in place
+
+    Returns:
+        The same headers dictionary
+    """
+    span = _current_span.get()
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.context.to_traceparent()
+    return headers
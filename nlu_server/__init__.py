@@ -0,0 +1,3 @@
+"""
+NLU server that Rasa calls through the `nlu` endpoint in endpoints.yml.
+"""
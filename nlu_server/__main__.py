@@ -0,0 +1,65 @@
+"""
+Run the NLU server:
+
+    python -m nlu_server --model models --port 5006
+
+Then point Rasa at it in endpoints.yml:
+
+    nlu:
+      url: "http://localhost:5006"
+
+Given a models directory, the server switches to newer archives copied into it
+without restarting. It also pulls from the model server in endpoints.yml
+`models:`, if one is configured, unless --no-pull is given.
+"""
+import os
+import argparse
+import logging
+
+from nlu_server.app import create_app
+from nlu_server.cache import ParseCache
+from nlu_server.fast_path import FastPathMatcher, DEFAULT_RULES_FILE
+from nlu_server.model_manager import (
+    ModelManager,
+    load_warmup_messages,
+    read_model_server,
+    DEFAULT_NLU_DATA,
+    NLU_MODEL_POLL_SECONDS,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_NLU_SERVER_PORT = 5006
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Start the reminder bot NLU server")
+    parser.add_argument("-m", "--model", default="models", help="Model archive or directory of models")
+    parser.add_argument("-p", "--port", type=int, default=int(os.getenv("NLU_SERVER_PORT", DEFAULT_NLU_SERVER_PORT)),
+                        help="Port to listen on")
+    parser.add_argument("--fast-path", default=DEFAULT_RULES_FILE, help="Fast path rules file")
+    parser.add_argument("--no-fast-path", action="store_true", help="Parse every message with the model")
+    parser.add_argument("--no-cache", action="store_true", help="Do not cache parse results")
+    parser.add_argument("--domain", default="domain.yml", help="Domain used to validate fast path rules")
+    parser.add_argument("--nlu-data", default=DEFAULT_NLU_DATA, help="Training data sampled to warm up new models")
+    parser.add_argument("--endpoints", default="endpoints.yml", help="Endpoints file with an optional models: server")
+    parser.add_argument("--no-pull", action="store_true",
+                        help="Only watch the models directory, e.g. when the model server serves that directory")
+    parser.add_argument("--poll-interval", type=float, default=NLU_MODEL_POLL_SECONDS,
+                        help="Seconds between checks for a new model (0 disables hot-swapping)")
+    args = parser.parse_args()
+
+    fast_path = None if args.no_fast_path else FastPathMatcher.from_file(args.fast_path, args.domain)
+    cache = None if args.no_cache else ParseCache()
+    model_manager = ModelManager(args.model, warmup_messages=load_warmup_messages(args.nlu_data), cache=cache,
+                                 poll_interval=args.poll_interval, model_server=None if args.no_pull else read_model_server(args.endpoints))
+    app = create_app(args.model, fast_path=fast_path, cache=cache, model_manager=model_manager)
+    host = os.getenv("SANIC_HOST", "0.0.0.0")
+    logger.info(f"NLU server listening on http://{host}:{args.port} (metrics at /metrics)")
+    app.run(host, args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+NLU server application.
+
+Serves Rasa's /model/parse API so the Rasa server can delegate parsing to it via
+the `nlu` endpoint in endpoints.yml. Each message is first checked against the
+deterministic fast path (nlu_server/fast_path.py), then against the parse cache
+(nlu_server/cache.py). Only messages that miss both are parsed by the trained
+model, which is loaded in-process. New models are loaded, warmed up and switched
+in without a restart (nlu_server/model_manager.py).
+"""
+import time
+import logging
+from typing import List, Optional, Text
+
+from sanic import Sanic, response
+
+from monitoring.metrics import REGISTRY, NLU_PARSE_LATENCY, NLU_FAST_PATH_MATCHES
+from nlu_server.cache import ParseCache
+from nlu_server.fast_path import FastPathMatcher
+from nlu_server.model_manager import ModelManager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def create_app(model_path: Text, fast_path: Optional[FastPathMatcher] = None,
+               cache: Optional[ParseCache] = None, model_manager: Optional[ModelManager] = None) -> Sanic:
+    """
+    Create the NLU server app.
+
+    Args:
+        model_path: Model archive or models directory
+        fast_path: Matcher tried before the model (None disables the fast path)
+        cache: Cache of model parses (None disables caching)
+        model_manager: Manager serving and hot-swapping the model (default: one watching model_path)
+
+    Returns:
+        Sanic application
+    """
+    app = Sanic("nlu_server")
+    models = model_manager or ModelManager(model_path, cache=cache)
+    app.ctx.models = models
+
+    def collect_cache_metrics() -> List[str]:
+        if cache is None:
+            return []
+        return [
+            "# HELP nlu_parse_cache_entries Parse results held in the cache",
+            "# TYPE nlu_parse_cache_entries gauge",
+            f"nlu_parse_cache_entries {cache.stats()['entries']}",
+        ]
+
+    REGISTRY.register_collector(collect_cache_metrics)
+
+    @app.listener("before_server_start")
+    async def load_model(app, loop):
+        # The first model is warmed up like any later one before the port opens
+        await models.refresh(settle_seconds=0)
+
+    @app.listener("after_server_start")
+    async def watch_models(app, loop):
+        models.start_watching()
+
+    @app.listener("before_server_stop")
+    async def stop_watching_models(app, loop):
+        models.stop_watching()
+
+    @app.post("/model/parse")
+    async def parse(request):
+        payload = request.json or {}
+        text = payload.get("text")
+        if not isinstance(text, str):
+            return response.json({"error": "'text' is required"}, status=400)
+
+        started = time.perf_counter()
+        path = "fast_path"
+        result = fast_path.match(text) if fast_path is not None else None
+        if result is None and cache is not None:
+            path = "cache"
+            result = cache.get(text)
+        if result is None:
+            # One reference for the whole request, so a model swap cannot split it
+            agent = models.agent
+            if agent is None:
+                return response.json({"error": "No model loaded"}, status=503)
+            path = "model"
+            result = await agent.parse_message(text)
+            if cache is not None:
+                cache.put(text, result, fingerprint=agent.model_id)
+        elif path == "fast_path":
+            NLU_FAST_PATH_MATCHES.inc(result["intent"]["name"])
+        NLU_PARSE_LATENCY.observe(time.perf_counter() - started, path)
+        return response.json(result)
+
+    @app.get("/status")
+    async def status(request):
+        return response.json({
+            **models.status(),
+            "fast_path_rules": len(fast_path) if fast_path is not None else 0,
+            "cache": cache.stats() if cache is not None else None,
+        })
+
+    @app.get("/metrics")
+    async def metrics(request):
+        return response.text(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    return app
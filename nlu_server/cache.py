@@ -0,0 +1,182 @@
+"""
+LRU cache of model parse results for repeated utterances.
+
+Short messages such as "hi", "yes" or "show my reminders" make up much of the
+traffic and always parse the same way with a given model. Results are keyed on
+the message text with case and whitespace normalized, together with the model's
+fingerprint, so a new model never serves stale results. Entity offsets are
+stored relative to the normalized text and mapped back onto each incoming
+message, so "Delete reminder 4" and "delete  reminder 4" share one entry and
+still get correct spans.
+"""
+import os
+import copy
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from monitoring.metrics import record_cache_lookup
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NLU_PARSE_CACHE_SIZE = int(os.getenv("NLU_PARSE_CACHE_SIZE", "10000"))
+# Longer messages are rarely repeated verbatim and are not cached
+NLU_PARSE_CACHE_MAX_TEXT = int(os.getenv("NLU_PARSE_CACHE_MAX_TEXT", "200"))
+
+
+def normalize(text: str) -> Optional[Tuple[str, List[int]]]:
+    """
+    Lower-case a message and collapse whitespace, keeping track of positions.
+
+    Args:
+        text: Message text
+
+    Returns:
+        Tuple of (normalized text, original index of each normalized character),
+        or None if lower-casing changes the text's length and offsets cannot be mapped
+    """
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        return None
+
+    characters: List[str] = []
+    positions: List[int] = []
+    pending_space = False
+    for index, character in enumerate(lowered):
+        if character.isspace():
+            pending_space = bool(characters)
+            continue
+        if pending_space:
+            characters.append(" ")
+            positions.append(index - 1)
+            pending_space = False
+        characters.append(character)
+        positions.append(index)
+    return "".join(characters), positions
+
+
+class ParseCache:
+    """Bounded LRU cache of parse results keyed on normalized text and model fingerprint."""
+
+    def __init__(self, max_size: int = NLU_PARSE_CACHE_SIZE, max_text_length: int = NLU_PARSE_CACHE_MAX_TEXT):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of cached results (0 disables caching)
+            max_text_length: Messages longer than this are not cached
+        """
+        self.max_size = max_size
+        self.max_text_length = max_text_length
+        self.fingerprint: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set_fingerprint(self, fingerprint: Optional[str]) -> None:
+        """
+        Switch to a newly loaded model, dropping results of the previous one.
+
+        Args:
+            fingerprint: Identifier of the loaded model (e.g. Agent.model_id)
+        """
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                if self._entries:
+                    logger.info(f"Model changed to {fingerprint}; dropping {len(self._entries)} cached parses")
+                self._entries.clear()
+                self.fingerprint = fingerprint
+
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached parse for a message.
+
+        Args:
+            text: Message text
+
+        Returns:
+            Parse result adapted to this message's text, or None on a miss
+        """
+        normalized = self._normalize(text)
+        if normalized is None:
+            return None
+        key, positions = normalized
+        with self._lock:
+            entry = self._entries.get((self.fingerprint, key))
+            if entry is not None:
+                self._entries.move_to_end((self.fingerprint, key))
+                self.hits += 1
+            else:
+                self.misses += 1
+        record_cache_lookup("nlu_parse", hit=entry is not None)
+        if entry is None:
+            return None
+
+        result = copy.deepcopy(entry["result"])
+        result["text"] = text
+        for entity, (start, end, literal) in zip(result.get("entities", []), entry["spans"]):
+            entity["start"] = positions[start]
+            entity["end"] = positions[end - 1] + 1
+            if literal:
+                entity["value"] = text[entity["start"]:entity["end"]]
+        return result
+
+    def put(self, text: str, result: Dict[str, Any], fingerprint: Optional[str] = None) -> None:
+        """
+        Cache the model's parse of a message.
+
+        Args:
+            text: Message text the result was computed for
+            result: Parse result
+            fingerprint: Model that produced the result; a result from a model that has
+                         since been replaced is not cached
+        """
+        normalized = self._normalize(text)
+        if normalized is None:
+            return
+        key, positions = normalized
+
+        # Map entity offsets into the normalized text; skip results whose spans do not map cleanly
+        original_to_normalized = {original: index for index, original in enumerate(positions)}
+        spans = []
+        for entity in result.get("entities", []):
+            start = original_to_normalized.get(entity.get("start"))
+            last = original_to_normalized.get((entity.get("end") or 0) - 1)
+            if start is None or last is None:
+                return
+            spans.append((start, last + 1, entity.get("value") == text[entity["start"]:entity["end"]]))
+
+        with self._lock:
+            if fingerprint is not None and fingerprint != self.fingerprint:
+                return
+            self._entries[(self.fingerprint, key)] = {"result": copy.deepcopy(result), "spans": spans}
+            self._entries.move_to_end((self.fingerprint, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "fingerprint": self.fingerprint,
+        }
+
+    def _normalize(self, text: str) -> Optional[Tuple[str, List[int]]]:
+        if self.max_size <= 0 or len(text) > self.max_text_length:
+            return None
+        normalized = normalize(text)
+        if normalized is None or not normalized[0]:
+            return None
+        return normalized
@@ -0,0 +1,126 @@
+"""
+Deterministic fast path for unambiguous commands.
+
+Messages such as "list reminders", "delete reminder 42" or "help" always mean the
+same intent. FastPathMatcher checks a message against the patterns in
+nlu_server/fast_path.yml before the NLU model runs. On a full match it returns a
+parse result in Rasa's format (intent at confidence 1.0, named groups as
+entities), so tokenization, featurization and DIET are skipped for these turns.
+"""
+import re
+import logging
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+import yaml
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_FILE = "nlu_server/fast_path.yml"
+EXTRACTOR_NAME = "FastPathMatcher"
+
+# Trailing punctuation that does not change a command's meaning
+_TRAILING_PUNCTUATION = ".!?, "
+
+
+def _compile(pattern: str) -> Pattern:
+    # A literal space in a rule matches any run of whitespace
+    return re.compile(pattern.strip().replace(" ", r"\s+"), re.IGNORECASE)
+
+
+class FastPathMatcher:
+    """Matches whole messages against deterministic intent patterns."""
+
+    def __init__(self, rules: List[Tuple[str, Pattern]]):
+        """
+        Initialize the matcher.
+
+        Args:
+            rules: (intent, compiled pattern) pairs, tried in order
+        """
+        self.rules = rules
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_RULES_FILE, domain_path: Optional[str] = None) -> "FastPathMatcher":
+        """
+        Load rules from a YAML file.
+
+        Args:
+            path: Rules file
+            domain_path: Domain file; when given, rules with unknown intents or entities are rejected
+
+        Returns:
+            Matcher with the file's rules
+
+        Raises:
+            ValueError: If a pattern is invalid or uses an intent or entity missing from the domain
+        """
+        with open(path) as rules_file:
+            data = yaml.safe_load(rules_file) or {}
+
+        intents = entities = None
+        if domain_path:
+            with open(domain_path) as domain_file:
+                domain = yaml.safe_load(domain_file) or {}
+            intents = {intent if isinstance(intent, str) else next(iter(intent)) for intent in domain.get("intents", [])}
+            entities = {entity if isinstance(entity, str) else next(iter(entity))
+                        for entity in domain.get("entities", [])}
+
+        rules = []
+        for rule in data.get("rules", []):
+            intent = rule["intent"]
+            if intents is not None and intent not in intents:
+                raise ValueError(f"Fast path rule uses unknown intent '{intent}'")
+            for pattern in rule.get("patterns", []):
+                try:
+                    compiled = _compile(pattern)
+                except re.error as e:
+                    raise ValueError(f"Invalid fast path pattern for '{intent}': {pattern} ({e})")
+                unknown = set(compiled.groupindex) - entities if entities is not None else set()
+                if unknown:
+                    raise ValueError(f"Fast path pattern for '{intent}' uses unknown entities: {', '.join(unknown)}")
+                rules.append((intent, compiled))
+
+        logger.info(f"Loaded {len(rules)} fast path patterns from {path}")
+        return cls(rules)
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Parse a message if it fully matches a rule.
+
+        Args:
+            text: User message
+
+        Returns:
+            Parse result in Rasa's /model/parse format, or None to fall through to the model
+        """
+        start = len(text) - len(text.lstrip())
+        end = len(text.rstrip(_TRAILING_PUNCTUATION + "\t\n"))
+        if end <= start:
+            return None
+
+        for intent, pattern in self.rules:
+            found = pattern.fullmatch(text, start, end)
+            if found is None:
+                continue
+            entities = [
+                {
+                    "entity": name,
+                    "start": found.start(name),
+                    "end": found.end(name),
+                    "value": value,
+                    "extractor": EXTRACTOR_NAME,
+                }
+                for name, value in found.groupdict().items() if value is not None
+            ]
+            return {
+                "text": text,
+                "intent": {"name": intent, "confidence": 1.0},
+                "entities": entities,
+                "intent_ranking": [{"name": intent, "confidence": 1.0}],
+            }
+        return None
+
+    def __len__(self) -> int:
+        return len(self.rules)
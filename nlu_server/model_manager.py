@@ -0,0 +1,332 @@
+"""
+Zero-downtime model updates for the NLU server.
+
+ModelManager owns the rasa Agent used for parsing. Every NLU_MODEL_POLL_SECONDS
+it checks the models directory for a newer archive. If endpoints.yml has a
+`models: url:` entry, it also pulls archives from that model server into the
+directory. The pull uses Rasa's ETag protocol, and If-Modified-Since is sent as
+well, so a plain static file server works as a local stand-in.
+
+A new archive is loaded on a background thread. It is then warmed with sample
+messages from data/nlu.yml, so graph building and first-call costs are paid
+before it serves users. Only then is the agent replaced, by a single assignment
+on the event loop. Requests already in flight finish on the old model, and later
+ones use the new one. A model that fails to load or warm up is never switched
+in, and the previous model keeps serving.
+"""
+import os
+import re
+import glob
+import time
+import asyncio
+import logging
+from email.utils import formatdate
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+import yaml
+
+from monitoring.metrics import REGISTRY
+from nlu_server.cache import ParseCache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NLU_MODEL_POLL_SECONDS = float(os.getenv("NLU_MODEL_POLL_SECONDS", "10"))  # 0 disables watching
+# Archives modified more recently than this may still be being copied in
+NLU_MODEL_SETTLE_SECONDS = float(os.getenv("NLU_MODEL_SETTLE_SECONDS", "2"))
+NLU_MODEL_WARMUP_MESSAGES = int(os.getenv("NLU_MODEL_WARMUP_MESSAGES", "50"))
+DEFAULT_NLU_DATA = "data/nlu.yml"
+# Rasa's default wait_time_between_pulls
+DEFAULT_PULL_INTERVAL_SECONDS = 100
+
+MODEL_RELOADS = REGISTRY.counter(
+    "nlu_model_reloads_total", "Background model loads by outcome", ["result"])
+
+_ENTITY_ANNOTATION = re.compile(r"\[([^\]]+)\](?:\([^)]*\)|\{[^}]*\})")
+
+
+def load_warmup_messages(path: Text = DEFAULT_NLU_DATA, limit: int = NLU_MODEL_WARMUP_MESSAGES) -> List[str]:
+    """
+    Pick plain messages from the NLU training data, taking intents in turn so each is covered.
+
+    Args:
+        path: Path to nlu.yml
+        limit: Maximum number of messages
+
+    Returns:
+        Messages with entity markup removed; empty if the file is missing
+    """
+    try:
+        with open(path) as nlu_file:
+            data = yaml.safe_load(nlu_file) or {}
+    except OSError as e:
+        logger.warning(f"No warm-up messages, cannot read {path}: {e}")
+        return []
+
+    per_intent = []
+    for item in data.get("nlu", []):
+        if not item.get("intent"):
+            continue
+        lines = [line.strip()[2:] for line in (item.get("examples") or "").splitlines()
+                 if line.strip().startswith("- ")]
+        per_intent.append([_ENTITY_ANNOTATION.sub(r"\1", line).strip() for line in lines])
+
+    messages: List[str] = []
+    for index in range(max((len(examples) for examples in per_intent), default=0)):
+        for examples in per_intent:
+            if index < len(examples) and len(messages) < limit:
+                messages.append(examples[index])
+    return messages
+
+
+def read_model_server(endpoints_path: Text) -> Optional[Dict[str, Any]]:
+    """
+    Read the `models:` section of an endpoints file.
+
+    Args:
+        endpoints_path: Path to endpoints.yml
+
+    Returns:
+        Dictionary with url and wait_time_between_pulls, or None if no model server is configured
+    """
+    try:
+        with open(endpoints_path) as endpoints_file:
+            models = (yaml.safe_load(endpoints_file) or {}).get("models") or {}
+    except OSError:
+        return None
+    if not models.get("url"):
+        return None
+    return {"url": os.path.expandvars(models["url"]),
+            "wait_time_between_pulls": float(models.get("wait_time_between_pulls") or DEFAULT_PULL_INTERVAL_SECONDS)}
+
+
+def resolve_model(model_path: Text) -> Optional[str]:
+    """
+    Find the archive to serve.
+
+    Args:
+        model_path: Model archive, or a directory whose newest archive is used
+
+    Returns:
+        Path of the archive, or None if there is none
+    """
+    from rasa.model import get_local_model
+    from rasa.exceptions import ModelNotFound
+
+    try:
+        return get_local_model(model_path)
+    except ModelNotFound:
+        return None
+
+
+def load_agent(model_file: Text):
+    """
+    Load a trained model for parsing.
+
+    Args:
+        model_file: Model archive
+
+    Returns:
+        rasa Agent
+    """
+    from rasa.core.agent import Agent
+
+    logger.info(f"Loading NLU model {model_file}")
+    return Agent.load(model_file)
+
+
+class ModelManager:
+    """
+    Holds the current Agent and replaces it when a newer model appears.
+
+    Read `agent` once per request and use that reference throughout. A swap
+    between two reads would otherwise mix two models in one request.
+    """
+
+    def __init__(self, model_path: Text, warmup_messages: Optional[List[str]] = None,
+                 cache: Optional[ParseCache] = None, poll_interval: float = NLU_MODEL_POLL_SECONDS,
+                 settle_seconds: float = NLU_MODEL_SETTLE_SECONDS, model_server: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            model_path: Model archive, or a directory to watch for new archives
+            warmup_messages: Messages parsed by a new model before it is switched in
+            cache: Parse cache whose fingerprint follows the serving model
+            poll_interval: Seconds between checks for a new model (0 disables watching)
+            settle_seconds: Minimum age of an archive before it is loaded
+            model_server: Result of read_model_server(); archives are pulled into model_path
+        """
+        self.model_path = model_path
+        self.warmup_messages = warmup_messages or []
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.model_server = model_server if os.path.isdir(model_path) else None
+        if model_server and self.model_server is None:
+            logger.warning(f"Ignoring the model server: {model_path} is not a directory to pull into")
+
+        self.agent = None
+        self.model_file: Optional[str] = None
+        self.loaded_at: Optional[float] = None
+        self.swaps = 0
+        self.last_error: Optional[str] = None
+        self._signature: Optional[Tuple[str, float, int]] = None
+        self._failed_signature: Optional[Tuple[str, float, int]] = None
+        self._etag: Optional[str] = None
+        self._last_modified: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        if self.model_server:
+            # After a restart, only download again if the server's archive changed since the last pull
+            pulled = glob.glob(os.path.join(model_path, "pulled-*.tar.gz"))
+            if pulled:
+                self._last_modified = formatdate(max(os.path.getmtime(path) for path in pulled), usegmt=True)
+
+    @staticmethod
+    def _signature_of(model_file: str) -> Tuple[str, float, int]:
+        stat = os.stat(model_file)
+        return model_file, stat.st_mtime, stat.st_size
+
+    def _load_and_warm(self, model_file: str) -> Tuple[Any, float, float]:
+        """Load and warm a model on the calling (background) thread."""
+        started = time.perf_counter()
+        agent = load_agent(model_file)
+        loaded = time.perf_counter()
+
+        async def warm() -> None:
+            for message in self.warmup_messages:
+                await agent.parse_message(message)
+
+        asyncio.run(warm())
+        return agent, loaded - started, time.perf_counter() - loaded
+
+    async def refresh(self, settle_seconds: Optional[float] = None) -> bool:
+        """
+        Load the newest model if it differs from the serving one, and switch to it once warm.
+
+        Args:
+            settle_seconds: Minimum archive age (default: the manager's setting)
+
+        Returns:
+            True if a new model was switched in
+        """
+        model_file = resolve_model(self.model_path)
+        if model_file is None:
+            if self.agent is None:
+                logger.warning(f"No model found at {self.model_path}")
+            return False
+
+        signature = self._signature_of(model_file)
+        if signature in (self._signature, self._failed_signature):
+            return False
+        settle_seconds = self.settle_seconds if settle_seconds is None else settle_seconds
+        if time.time() - signature[1] < settle_seconds:
+            return False
+
+        try:
+            agent, load_seconds, warm_seconds = await asyncio.get_running_loop().run_in_executor(
+                None, self._load_and_warm, model_file)
+        except Exception as e:
+            MODEL_RELOADS.inc("failed")
+            self._failed_signature = signature
+            self.last_error = f"{model_file}: {e}"
+            logger.error(f"Failed to load model {model_file}; keeping {self.model_file}: {e}")
+            return False
+
+        previous = self.model_file
+        # The switch: a single assignment on the event loop
+        self.agent = agent
+        self.model_file = model_file
+        self._signature = signature
+        self.loaded_at = time.time()
+        self.last_error = None
+        if self.cache is not None:
+            self.cache.set_fingerprint(agent.model_id)
+        if previous is not None:
+            self.swaps += 1
+            MODEL_RELOADS.inc("swapped")
+        logger.info(f"Serving model {model_file} ({agent.model_id}), loaded in {load_seconds:.1f}s and warmed "
+                    f"with {len(self.warmup_messages)} messages in {warm_seconds:.1f}s"
+                    + (f"; replaced {previous}" if previous else ""))
+        return True
+
+    async def pull(self, session: Any) -> bool:
+        """
+        Download a new archive from the model server into the models directory if it changed.
+
+        Args:
+            session: aiohttp ClientSession
+
+        Returns:
+            True if a new archive was written
+        """
+        headers = {}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+
+        async with session.get(self.model_server["url"], headers=headers) as response:
+            if response.status == 304:
+                return False
+            if response.status != 200:
+                raise RuntimeError(f"Model server answered {response.status}")
+
+            target = os.path.join(self.model_path, f"pulled-{time.strftime('%Y%m%d-%H%M%S')}.tar.gz")
+            partial = target + ".part"
+            with open(partial, "wb") as model_file:
+                async for chunk in response.content.iter_chunked(1 << 16):
+                    model_file.write(chunk)
+            # get_local_model only sees *.tar.gz, so the archive appears once it is complete
+            os.replace(partial, target)
+            self._etag = response.headers.get("ETag")
+            self._last_modified = response.headers.get("Last-Modified")
+        logger.info(f"Pulled model from {self.model_server['url']} to {target}")
+        return True
+
+    async def watch(self) -> None:
+        """Poll for new models (and pull from the model server) until cancelled."""
+        session = None
+        if self.model_server:
+            import aiohttp
+            session = aiohttp.ClientSession()
+
+        next_pull = 0.0
+        try:
+            while True:
+                pulled = False
+                if session is not None and time.monotonic() >= next_pull:
+                    next_pull = time.monotonic() + self.model_server["wait_time_between_pulls"]
+                    try:
+                        pulled = await self.pull(session)
+                    except Exception as e:
+                        logger.warning(f"Could not pull model from {self.model_server['url']}: {e}")
+                try:
+                    # A pulled archive is complete once renamed, so it need not settle
+                    await self.refresh(settle_seconds=0 if pulled else None)
+                except Exception as e:
+                    logger.error(f"Model refresh failed: {e}")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            if session is not None:
+                await session.close()
+
+    def start_watching(self) -> None:
+        """Start watch() on the running event loop, unless watching is disabled."""
+        if self.poll_interval > 0 and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.watch())
+
+    def stop_watching(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "model_loaded": self.agent is not None,
+            "model_id": self.agent.model_id if self.agent is not None else None,
+            "model_file": self.model_file,
+            "loaded_at": self.loaded_at,
+            "swaps": self.swaps,
+            "watching": self._task is not None,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,119 @@
+"""
+Model server for hot-swapping the full model in the Rasa server.
+
+Serves the newest archive of a models directory at /models/latest using the
+protocol Rasa pulls models with (endpoints.yml `models:`). The ETag names the
+archive, and a pull whose If-None-Match still matches gets 304 Not Modified.
+Rasa loads each new archive in the background and replaces its whole agent (NLU,
+domain and policies together), so the NLU and core parts are always from the same
+training run.
+
+    python -m nlu_server.model_server --models models --port 8080
+
+The NLU server watches the same directory and also switches to its newest archive
+once it is older than NLU_MODEL_SETTLE_SECONDS, so both servers converge on one
+archive. Between the two switches, which are about one poll interval apart, they
+may briefly run different versions.
+"""
+import os
+import glob
+import time
+import argparse
+import logging
+from email.utils import formatdate
+from typing import Optional, Text
+
+from sanic import Sanic, response
+
+from nlu_server.model_manager import NLU_MODEL_SETTLE_SECONDS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_SERVER_PORT = 8080
+
+
+def newest_archive(models_dir: Text, settle_seconds: float = NLU_MODEL_SETTLE_SECONDS,
+                   now: Optional[float] = None) -> Optional[str]:
+    """
+    Find the newest complete archive in a models directory.
+
+    Archives pulled by the NLU server (pulled-*.tar.gz) are copies of served
+    archives and are skipped, as are archives that may still be being copied in.
+
+    Args:
+        models_dir: Directory of *.tar.gz model archives
+        settle_seconds: Minimum archive age
+        now: Current time (default: now)
+
+    Returns:
+        Path of the archive, or None if there is none
+    """
+    now = time.time() if now is None else now
+    archives = [path for path in glob.glob(os.path.join(models_dir, "*.tar.gz"))
+                if not os.path.basename(path).startswith("pulled-")
+                and now - os.path.getmtime(path) >= settle_seconds]
+    return max(archives, key=os.path.getmtime, default=None)
+
+
+def archive_etag(path: Text) -> str:
+    """ETag of an archive: its name, size and modification time."""
+    stat = os.stat(path)
+    return f'"{os.path.basename(path)}-{stat.st_size}-{int(stat.st_mtime)}"'
+
+
+def create_model_server_app(models_dir: Text, settle_seconds: float = NLU_MODEL_SETTLE_SECONDS) -> Sanic:
+    """
+    Create the model server app.
+
+    Args:
+        models_dir: Directory whose newest archive is served
+        settle_seconds: Minimum archive age before it is served
+
+    Returns:
+        Sanic application
+    """
+    app = Sanic("model_server")
+
+    @app.get("/health")
+    async def health(request):
+        return response.json({"status": "ok", "model": newest_archive(models_dir, settle_seconds)})
+
+    @app.get("/models/latest")
+    async def latest(request):
+        path = newest_archive(models_dir, settle_seconds)
+        if path is None:
+            return response.empty(status=204)
+
+        etag = archive_etag(path)
+        if request.headers.get("If-None-Match") == etag:
+            return response.empty(status=304)
+
+        logger.info(f"Serving model {path} ({etag})")
+        return await response.file_stream(path, headers={
+            "ETag": etag,
+            "Last-Modified": formatdate(os.path.getmtime(path), usegmt=True),
+            # Rasa names the pulled file after this header
+            "filename": os.path.basename(path),
+        })
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the newest model archive for Rasa to pull")
+    parser.add_argument("--models", default="models", help="Directory of model archives")
+    parser.add_argument("-p", "--port", type=int,
+                        default=int(os.getenv("MODEL_SERVER_PORT", DEFAULT_MODEL_SERVER_PORT)), help="Port to listen on")
+    parser.add_argument("--settle-seconds", type=float, default=NLU_MODEL_SETTLE_SECONDS,
+                        help="Minimum age of an archive before it is served")
+    args = parser.parse_args()
+
+    host = os.getenv("SANIC_HOST", "0.0.0.0")
+    logger.info(f"Model server listening on http://{host}:{args.port}/models/latest, serving {args.models}")
+    create_model_server_app(args.models, args.settle_seconds).run(host, args.port, workers=1)
+
+
+if __name__ == "__main__":
+    main()
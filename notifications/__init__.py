@@ -0,0 +1,3 @@
+"""
+Notification dispatcher that delivers due reminders to users.
+"""
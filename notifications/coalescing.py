@@ -0,0 +1,207 @@
+"""
+Per-user coalescing of due reminders into digest messages.
+
+When many reminders for the same user fall due within a short burst, sending one
+message per reminder multiplies Twilio cost and rate-limit pressure. The coalescer
+holds a user's due reminders for a configurable window and releases them as a
+single digest. Delivered reminders, sent messages and send failures are counted
+in monitoring.metrics.REGISTRY, which the dispatcher serves on DISPATCHER_METRICS_PORT.
+"""
+import os
+import time
+import logging
+from typing import Collection, Dict, List, Any, Optional, Tuple
+
+from monitoring.metrics import REGISTRY
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SECONDS = float(os.getenv("NOTIFICATION_COALESCE_WINDOW_SECONDS", "60"))
+DEFAULT_MAX_ITEMS = int(os.getenv("NOTIFICATION_DIGEST_MAX_ITEMS", "10"))
+# A user whose digest could not be sent is retried after this long, doubling per failure up to the maximum
+DEFAULT_RETRY_SECONDS = float(os.getenv("NOTIFICATION_RETRY_SECONDS", "30"))
+DEFAULT_RETRY_MAX_SECONDS = float(os.getenv("NOTIFICATION_RETRY_MAX_SECONDS", "900"))
+
+REMINDERS_DELIVERED = REGISTRY.counter(
+    "notification_reminders_delivered_total", "Due reminders delivered by SMS")
+REMINDERS_COALESCED = REGISTRY.counter(
+    "notification_reminders_coalesced_total", "Delivered reminders that shared a digest message with an earlier one")
+MESSAGES_SENT = REGISTRY.counter(
+    "notification_messages_sent_total", "Notification messages sent, one per digest")
+SEND_FAILURES = REGISTRY.counter(
+    "notification_send_failures_total", "Digests whose message could not be sent")
+
+
+class Digest:
+    """A group of due reminders for one user, delivered as one message."""
+
+    def __init__(self, user_id: int, reminders: List[Dict[str, Any]]):
+        self.user_id = user_id
+        self.reminders = reminders
+
+    @property
+    def reminder_ids(self) -> List[int]:
+        return [r['id'] for r in self.reminders]
+
+    @property
+    def recipient(self) -> Dict[str, Any]:
+        """User columns joined onto every pending row (email, username, time_zone, ...)."""
+        return self.reminders[0]
+
+    def __len__(self) -> int:
+        return len(self.reminders)
+
+
+class CoalescingStats:
+    """Counters describing how many messages coalescing has saved."""
+
+    def __init__(self):
+        self.reminders_delivered = 0
+        self.messages_sent = 0
+        self.send_failures = 0
+
+    @property
+    def messages_saved(self) -> int:
+        return self.reminders_delivered - self.messages_sent
+
+    def record_sent(self, digest: Digest) -> None:
+        self.reminders_delivered += len(digest)
+        self.messages_sent += 1
+        REMINDERS_DELIVERED.inc(amount=len(digest))
+        REMINDERS_COALESCED.inc(amount=len(digest) - 1)
+        MESSAGES_SENT.inc()
+
+    def record_failure(self) -> None:
+        self.send_failures += 1
+        SEND_FAILURES.inc()
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "reminders_delivered": self.reminders_delivered,
+            "messages_sent": self.messages_sent,
+            "messages_saved": self.messages_saved,
+            "send_failures": self.send_failures,
+        }
+
+
+class NotificationCoalescer:
+    """
+    Groups due reminders by user_id and decides when each user's digest is ready.
+
+    The database stays the source of truth: every poll hands the coalescer the full
+    set of pending rows, and the coalescer only remembers when each user's burst
+    started. Reminders completed or deleted while held back therefore drop out on
+    the next poll instead of being sent from a stale copy.
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS, max_items: int = DEFAULT_MAX_ITEMS,
+                 retry_seconds: float = DEFAULT_RETRY_SECONDS, retry_max_seconds: float = DEFAULT_RETRY_MAX_SECONDS):
+        """
+        Initialize the coalescer.
+
+        Args:
+            window_seconds: How long to hold a user's first due reminder waiting for more (0 disables holding)
+            max_items: Maximum reminders per digest; a full bucket is released immediately
+            retry_seconds: Delay before retrying a user whose digest failed, doubled per consecutive failure
+            retry_max_seconds: Longest retry delay
+        """
+        self.window_seconds = window_seconds
+        self.max_items = max(1, max_items)
+        self.retry_seconds = retry_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.stats = CoalescingStats()
+        self._pending: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        self._first_seen: Dict[int, float] = {}
+        # user_id -> (consecutive failures, monotonic time of the next attempt)
+        self._retry: Dict[int, Tuple[int, float]] = {}
+
+    def update(self, pending_reminders: List[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """
+        Replace the held reminders with the latest pending rows from the database.
+
+        Args:
+            pending_reminders: Rows as returned by get_pending_notifications()
+            now: Current monotonic time (default: time.monotonic())
+        """
+        now = time.monotonic() if now is None else now
+        buckets: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        for reminder in pending_reminders:
+            buckets.setdefault(reminder['user_id'], {})[reminder['id']] = reminder
+
+        self._first_seen = {user_id: self._first_seen.get(user_id, now) for user_id in buckets}
+        self._pending = buckets
+        # A user whose reminders were all completed or deleted needs no retry
+        self._retry = {user_id: retry for user_id, retry in self._retry.items() if user_id in buckets}
+
+    def pop_ready(self, now: Optional[float] = None, flush: bool = False,
+                  expecting_more: Optional[Collection[int]] = None) -> List[Digest]:
+        """
+        Remove and return the digests whose window has elapsed or whose bucket is full.
+        Users waiting to retry a failed digest are held until their retry time.
+
+        Args:
+            now: Current monotonic time (default: time.monotonic())
+            flush: Release every held digest regardless of its window (e.g. on shutdown)
+            expecting_more: Users known to have another reminder due within the window. When
+                            given, every other user is released at once, since waiting could
+                            not add anything to their digest (None: hold everyone for the window)
+
+        Returns:
+            List of digests ready to send, ordered by earliest reminder_time
+        """
+        now = time.monotonic() if now is None else now
+        digests = []
+
+        for user_id in list(self._pending):
+            bucket = self._pending[user_id]
+            retry = self._retry.get(user_id)
+            if retry is not None and now < retry[1] and not flush:
+                continue
+            waited = now - self._first_seen[user_id]
+            nothing_coming = expecting_more is not None and user_id not in expecting_more
+            if not (flush or retry is not None or nothing_coming or waited >= self.window_seconds
+                    or len(bucket) >= self.max_items):
+                continue
+
+            reminders = sorted(bucket.values(), key=lambda r: r['reminder_time'])
+            for start in range(0, len(reminders), self.max_items):
+                digests.append(Digest(user_id, reminders[start:start + self.max_items]))
+
+            del self._pending[user_id]
+            del self._first_seen[user_id]
+
+        digests.sort(key=lambda d: d.reminders[0]['reminder_time'])
+        return digests
+
+    def failed(self, digest: Digest, now: Optional[float] = None) -> float:
+        """
+        Hold a user back after their digest could not be sent.
+
+        Their reminders come back with the next update(), but pop_ready() only
+        releases them again once the backoff has passed.
+
+        Args:
+            digest: Digest that failed
+            now: Current monotonic time (default: time.monotonic())
+
+        Returns:
+            Seconds until the user is retried
+        """
+        now = time.monotonic() if now is None else now
+        failures = self._retry.get(digest.user_id, (0, now))[0] + 1
+        delay = min(self.retry_max_seconds, self.retry_seconds * 2 ** (failures - 1))
+        self._retry[digest.user_id] = (failures, now + delay)
+        self.stats.record_failure()
+        return delay
+
+    def sent(self, digest: Digest) -> None:
+        """Record a delivered digest and clear the user's backoff."""
+        self._retry.pop(digest.user_id, None)
+        self.stats.record_sent(digest)
+
+    @property
+    def held_count(self) -> int:
+        """Number of reminders currently held back waiting for their window."""
+        return sum(len(bucket) for bucket in self._pending.values())
@@ -0,0 +1,280 @@
+"""
+Reminder notification dispatcher.
+
+Polls get_pending_notifications(), coalesces due reminders per user into digests
+and delivers them through Twilio. Due conversational follow-ups are triggered in
+their conversations through the Rasa API (notifications/followups.py). Run it as
+a standalone process:
+
+    python -m notifications.dispatcher
+
+Reminders due within DISPATCHER_WHEEL_HORIZON_SECONDS are loaded ahead of time
+and fired from an in-memory timing wheel (notifications/timing_wheel.py), so they
+go out within a tick of their reminder_time instead of on the next poll. Since the
+wheel knows what is coming, a fired reminder is only held for coalescing while
+another reminder of the same user is due within the window, and never longer
+than the window.
+
+With DISPATCHER_SHARDING=true several dispatchers can run at once; each one only
+polls and delivers the users of the shards it leases (notifications/sharding.py).
+
+Prometheus metrics (sent messages, coalesced reminders, send failures) are served
+on http://<host>:DISPATCHER_METRICS_PORT/metrics (default 9105; 0 disables it).
+"""
+import os
+import time
+import signal
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import pytz
+
+from db.models.reminder import get_pending_notifications, get_notifications_by_ids, mark_notifications_sent
+from monitoring.metrics import serve_metrics
+from notifications.coalescing import NotificationCoalescer, Digest
+from notifications.followups import FollowupTrigger
+from notifications.sharding import ShardCoordinator
+from notifications.timing_wheel import NearTermSchedule
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_POLL_INTERVAL_SECONDS", "15"))
+FOLLOWUPS_ENABLED = os.getenv("FOLLOWUPS_ENABLED", "true").lower() == "true"
+DISPATCHER_SHARDING = os.getenv("DISPATCHER_SHARDING", "false").lower() == "true"
+TIMING_WHEEL_ENABLED = os.getenv("DISPATCHER_TIMING_WHEEL", "true").lower() == "true"
+METRICS_PORT = int(os.getenv("DISPATCHER_METRICS_PORT", "9105"))  # 0 disables /metrics
+SNOOZE_HINT = "Reply 'snooze 10 minutes' to be reminded again later."
+
+
+def _format_local_time(reminder: Dict[str, Any]) -> str:
+    """Format a reminder's UTC time in the owner's timezone, falling back to UTC."""
+    reminder_time = reminder['reminder_time']
+    try:
+        tz = pytz.timezone(reminder.get('time_zone') or 'UTC')
+    except pytz.exceptions.UnknownTimeZoneError:
+        tz = pytz.utc
+    if reminder_time.tzinfo is None:
+        reminder_time = pytz.utc.localize(reminder_time)
+    return reminder_time.astimezone(tz).strftime('%H:%M %Z')
+
+
+def format_digest(digest: Digest) -> str:
+    """
+    Render a digest as a single message body.
+
+    Args:
+        digest: Reminders due for one user
+
+    Returns:
+        Message text; a lone reminder is rendered without the digest header
+    """
+    if len(digest) == 1:
+        reminder = digest.reminders[0]
+        return (f"Reminder: {reminder['title']} ({_format_local_time(reminder)})\n"
+                f"{SNOOZE_HINT}")
+
+    lines = [f"You have {len(digest)} reminders due:"]
+    for reminder in digest.reminders:
+        lines.append(f"- #{reminder['id']} {reminder['title']} ({_format_local_time(reminder)})")
+    lines.append(f"{SNOOZE_HINT} Add the number to snooze a specific one.")
+    return "\n".join(lines)
+
+
+class ReminderDispatcher:
+    """Delivers due reminders, one digest message per user per burst."""
+
+    def __init__(self, send_message: Optional[Callable[[str, str], Optional[str]]] = None,
+                 coalescer: Optional[NotificationCoalescer] = None,
+                 poll_interval: float = POLL_INTERVAL_SECONDS,
+                 followups: Optional[FollowupTrigger] = None,
+                 shards: Optional[ShardCoordinator] = None,
+                 schedule: Optional[NearTermSchedule] = None):
+        """
+        Initialize the dispatcher.
+
+        Args:
+            send_message: Callable taking (to, body) and returning a message id or None on failure
+                          (default: TwilioService().send_message)
+            coalescer: Coalescer deciding when digests are released (default: configured from env)
+            poll_interval: Seconds between polls of the reminders table
+            followups: Trigger for due follow-ups (default: a FollowupTrigger unless FOLLOWUPS_ENABLED=false)
+            shards: Coordinator limiting this dispatcher to its leased shards
+                    (default: a ShardCoordinator if DISPATCHER_SHARDING=true, else all users)
+            schedule: Timing wheel firing reminders between polls
+                      (default: a NearTermSchedule unless DISPATCHER_TIMING_WHEEL=false)
+        """
+        if send_message is None:
+            from actions.twilio_service import TwilioService
+            send_message = TwilioService().send_message
+        self.send_message = send_message
+        self.coalescer = coalescer or NotificationCoalescer()
+        self.poll_interval = poll_interval
+        if followups is None and FOLLOWUPS_ENABLED:
+            followups = FollowupTrigger()
+        self.followups = followups
+        if shards is None and DISPATCHER_SHARDING:
+            shards = ShardCoordinator()
+        self.shards = shards
+        if schedule is None and TIMING_WHEEL_ENABLED:
+            schedule = NearTermSchedule()
+        self.schedule = schedule
+        self._last_poll: Optional[float] = None
+        self._running = False
+        # Delivered reminders whose notification_sent update failed; kept out of delivery until marked
+        self._unmarked: Set[int] = set()
+
+    def deliver(self, digest: Digest) -> bool:
+        """
+        Send one digest and mark its reminders as notified.
+
+        Args:
+            digest: Digest to deliver
+
+        Returns:
+            True if the message was sent, False otherwise
+        """
+        to = digest.recipient.get('phone_number')
+        if not to:
+            # The phone number was removed after the reminders were loaded; the next poll drops them
+            logger.warning(f"User {digest.user_id} has no phone number; skipping {len(digest)} reminders")
+            if self.schedule is not None:
+                self.schedule.delivered(digest.reminder_ids)
+            return False
+
+        if not self.send_message(to, format_digest(digest)):
+            delay = self.coalescer.failed(digest)
+            logger.warning(f"Sending {len(digest)} reminders to user {digest.user_id} failed; retrying in {delay:.0f}s")
+            return False
+
+        self.coalescer.sent(digest)
+        if self.schedule is not None:
+            self.schedule.delivered(digest.reminder_ids)
+        self._mark_sent(digest.reminder_ids)
+        return True
+
+    def _mark_sent(self, reminder_ids: List[int]) -> None:
+        """
+        Mark delivered reminders as notified, together with any whose earlier marking failed.
+
+        A failed update is retried on the next poll. Until then the reminders are left
+        out of the loaded rows, so a message that went out is not sent again.
+
+        Args:
+            reminder_ids: IDs of the reminders just delivered
+        """
+        self._unmarked.update(reminder_ids)
+        if not self._unmarked:
+            return
+        try:
+            mark_notifications_sent(sorted(self._unmarked))
+        except Exception as e:
+            logger.error(f"Could not mark {len(self._unmarked)} delivered reminders as sent; retrying: {e}")
+            return
+        self._unmarked.clear()
+
+    def _poll(self) -> Optional[List[int]]:
+        """
+        Reload pending reminders, renewing shard leases first when sharded.
+
+        Returns:
+            Shard buckets polled, or None when this dispatcher serves all users
+        """
+        buckets = None
+        if self.shards is not None:
+            buckets = self.shards.refresh()
+
+        self._mark_sent([])
+        # Reminders of shards this worker released drop out here, so they are
+        # delivered by their new owner only
+        if self.schedule is None:
+            pending = get_pending_notifications(buckets)
+        else:
+            pending = get_pending_notifications(buckets, horizon_seconds=self.schedule.horizon_seconds)
+        pending = [reminder for reminder in pending if reminder['id'] not in self._unmarked]
+        if self.schedule is None:
+            self.coalescer.update(pending)
+        else:
+            self.schedule.sync(pending)
+        self._last_poll = time.monotonic()
+        return buckets
+
+    def _fire_due(self) -> None:
+        """Fire reminders from the timing wheel, re-reading them to catch edits since the last poll."""
+        fired = self.schedule.advance()
+        if fired:
+            self.schedule.confirm(fired, get_notifications_by_ids(fired))
+        self.coalescer.update(self.schedule.due_reminders())
+
+    def run_once(self, flush: bool = False) -> List[Digest]:
+        """
+        Run a single poll/coalesce/deliver cycle.
+
+        With the timing wheel, the database is only polled every poll_interval;
+        cycles in between just fire reminders that came due.
+
+        Args:
+            flush: Deliver every held digest regardless of its coalescing window
+
+        Returns:
+            List of digests that were delivered
+        """
+        polled = (self.schedule is None or flush or self._last_poll is None
+                  or time.monotonic() - self._last_poll >= self.poll_interval)
+        buckets = self._poll() if polled else None
+        if self.schedule is not None:
+            self._fire_due()
+
+        expecting_more = None
+        if self.schedule is not None:
+            expecting_more = self.schedule.users_due_within(self.coalescer.window_seconds)
+        delivered = [digest for digest in self.coalescer.pop_ready(flush=flush, expecting_more=expecting_more)
+                     if self.deliver(digest)]
+
+        if delivered:
+            logger.info(f"Delivered {len(delivered)} digests; totals: {self.coalescer.stats.as_dict()}")
+
+        if polled and self.followups is not None:
+            try:
+                self.followups.run_once(buckets)
+            except Exception as e:
+                logger.error(f"Follow-up cycle failed: {e}")
+        return delivered
+
+    def stop(self, *args) -> None:
+        """Stop the loop after the current cycle."""
+        self._running = False
+
+    def run_forever(self) -> None:
+        """Poll until stopped by SIGINT/SIGTERM."""
+        self._running = True
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        logger.info(f"Dispatcher started (poll every {self.poll_interval}s, "
+                    f"coalesce window {self.coalescer.window_seconds}s"
+                    f"{f', timing wheel {self.schedule.horizon_seconds}s ahead' if self.schedule else ''}"
+                    f"{f', metrics on port {METRICS_PORT}' if METRICS_PORT else ''})")
+        sleep_seconds = self.schedule.tick_seconds if self.schedule is not None else self.poll_interval
+        metrics_server = serve_metrics(METRICS_PORT) if METRICS_PORT else None
+
+        while self._running:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Dispatcher cycle failed: {e}")
+                # Back off to the poll interval instead of retrying every tick
+                self._last_poll = time.monotonic()
+                time.sleep(self.poll_interval)
+            time.sleep(sleep_seconds)
+
+        if self.shards is not None:
+            self.shards.shutdown()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        logger.info(f"Dispatcher stopped; totals: {self.coalescer.stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    ReminderDispatcher().run_forever()
@@ -0,0 +1,135 @@
+"""
+Fires due conversational follow-ups through Rasa's trigger_intent API.
+
+Follow-ups are scheduled with db.models.followup.schedule_followup() instead of
+Rasa's ReminderScheduled event. The dispatcher calls FollowupTrigger.run_once()
+every cycle, and each due follow-up becomes
+
+    POST {RASA_URL}/conversations/{sender_id}/trigger_intent?output_channel=latest
+    {"name": <intent>, "entities": {...}}
+
+so the bot's reply reaches the user on the channel they last wrote from. A
+follow-up whose entities carry a reminder_id delivers that reminder in the chat,
+so the reminder is marked as sent along with it; a later "snooze 10 minutes"
+then finds it like one notified by SMS.
+"""
+import os
+import logging
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import requests
+
+from db.models.followup import get_due_followups
+from db.models.reminder import mark_notifications_sent
+from monitoring.tracing import start_span, inject_context
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RASA_URL = os.getenv("RASA_URL", "http://localhost:5005")
+RASA_API_TOKEN = os.getenv("RASA_API_TOKEN")
+FOLLOWUP_OUTPUT_CHANNEL = os.getenv("FOLLOWUP_OUTPUT_CHANNEL", "latest")
+FOLLOWUP_BATCH_SIZE = int(os.getenv("FOLLOWUP_BATCH_SIZE", "500"))
+FOLLOWUP_TIMEOUT_SECONDS = float(os.getenv("FOLLOWUP_TIMEOUT_SECONDS", "10"))
+
+
+class FollowupTrigger:
+    """Triggers due follow-up intents in their conversations."""
+
+    def __init__(self, rasa_url: str = RASA_URL, token: Optional[str] = RASA_API_TOKEN,
+                 output_channel: str = FOLLOWUP_OUTPUT_CHANNEL, batch_size: int = FOLLOWUP_BATCH_SIZE,
+                 timeout: float = FOLLOWUP_TIMEOUT_SECONDS, session: Optional[requests.Session] = None):
+        """
+        Initialize the trigger.
+
+        Args:
+            rasa_url: Base URL of the Rasa server (started with --enable-api)
+            token: Rasa API token, if the server was started with --auth-token
+            output_channel: Channel the bot's response is sent to ("latest" = the user's last channel)
+            batch_size: Maximum follow-ups fired per cycle
+            timeout: HTTP timeout per trigger in seconds
+            session: HTTP session (default: a new requests.Session)
+        """
+        self.rasa_url = rasa_url.rstrip("/")
+        self.token = token
+        self.output_channel = output_channel
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.fired = 0
+        self.failed = 0
+
+    def trigger(self, followup: Dict[str, Any]) -> Optional[bool]:
+        """
+        Trigger one follow-up's intent.
+
+        Args:
+            followup: Row from get_due_followups()
+
+        Returns:
+            True if triggered, False if Rasa rejected it for good (e.g. unknown intent),
+            None if it failed and should be retried next cycle
+        """
+        sender_id = followup["sender_id"]
+        url = f"{self.rasa_url}/conversations/{quote(sender_id, safe='')}/trigger_intent"
+        params = {"output_channel": self.output_channel}
+        if self.token:
+            params["token"] = self.token
+        payload = {"name": followup["followup_intent"], "entities": followup.get("followup_entities") or {}}
+
+        with start_span("dispatcher.trigger_intent", {"rasa.sender_id": sender_id,
+                                                      "rasa.intent": payload["name"]}):
+            try:
+                response = self.session.post(url, params=params, json=payload, timeout=self.timeout,
+                                             headers=inject_context({}))
+            except requests.RequestException as e:
+                logger.warning(f"Triggering follow-up {followup['id']} for {sender_id} failed: {e}")
+                return None
+
+        if response.status_code == 200:
+            return True
+        if response.status_code in (400, 404, 422):
+            logger.error(f"Rasa rejected follow-up {followup['id']} ({payload['name']}) for {sender_id}: "
+                         f"HTTP {response.status_code} {response.text[:200]}")
+            return False
+        logger.warning(f"Triggering follow-up {followup['id']} for {sender_id} returned HTTP {response.status_code}")
+        return None
+
+    @staticmethod
+    def _covered_ids(followup: Dict[str, Any]) -> List[int]:
+        """The follow-up's ID, plus the reminder it delivered in the chat if it carries one."""
+        source_id = (followup.get("followup_entities") or {}).get("reminder_id")
+        return [followup["id"]] + ([int(source_id)] if source_id is not None else [])
+
+    def run_once(self, buckets: Optional[List[int]] = None) -> List[int]:
+        """
+        Fire every due follow-up and mark it as done.
+
+        Args:
+            buckets: Only fire follow-ups of these shard buckets (None: all)
+
+        Returns:
+            IDs of follow-ups triggered successfully
+        """
+        triggered: List[int] = []
+        handled = 0
+        for followup in get_due_followups(self.batch_size, buckets):
+            outcome = self.trigger(followup)
+            if outcome is None:
+                self.failed += 1
+                continue
+            # Marked one by one, so a crash mid-batch does not trigger the earlier ones again.
+            # Rejected follow-ups are marked too, so a bad intent name is not retried forever
+            mark_notifications_sent(self._covered_ids(followup) if outcome else [followup["id"]])
+            handled += 1
+            if outcome:
+                triggered.append(followup["id"])
+            else:
+                self.failed += 1
+
+        self.fired += len(triggered)
+        if handled:
+            logger.info(f"Triggered {len(triggered)} follow-ups ({self.fired} fired, {self.failed} failed in total)")
+        return triggered
@@ -0,0 +1,109 @@
+"""
+Shard coordination for running several notification dispatchers side by side.
+
+Pending reminders are split into SHARD_BUCKETS buckets by user_id. Every cycle each
+worker heartbeats into dispatcher_workers, reads the live workers and computes its
+buckets with capacity-bounded rendezvous hashing, so shares stay even and a joining
+or leaving worker moves few buckets. Ownership is enforced by leases in
+dispatcher_shards: a bucket is taken over only after its previous owner released
+it or stopped renewing it, so no user is served by two workers at once.
+"""
+import os
+import socket
+import hashlib
+import logging
+import uuid
+from typing import List, Optional
+
+from db.models.shard import SHARD_BUCKETS, heartbeat_worker, get_live_workers, claim_shards, release_worker
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DISPATCHER_WORKER_ID = os.getenv("DISPATCHER_WORKER_ID")
+DISPATCHER_LEASE_SECONDS = float(os.getenv("DISPATCHER_LEASE_SECONDS", "60"))
+
+
+def _weight(worker_id: str, bucket: int) -> int:
+    """Stable pseudo-random weight of a worker for a bucket (the same in every process)."""
+    digest = hashlib.md5(f"{worker_id}:{bucket}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def assign_buckets(worker_id: str, workers: List[str], num_buckets: int = SHARD_BUCKETS) -> List[int]:
+    """
+    Compute the buckets a worker owns given the live workers.
+
+    Each bucket goes to the worker with the highest weight for it that is not full yet;
+    capping every worker at ceil(num_buckets / workers) keeps the shares even, which plain
+    rendezvous hashing does not with this few buckets. Every worker computes the same
+    assignment from the same worker list.
+
+    Args:
+        worker_id: Worker to compute the buckets of
+        workers: All live worker IDs (worker_id is treated as live even if missing)
+        num_buckets: Number of buckets
+
+    Returns:
+        Sorted bucket numbers
+    """
+    candidates = sorted(set(workers) | {worker_id})
+    capacity = -(-num_buckets // len(candidates))
+    load = {worker: 0 for worker in candidates}
+    owned: List[int] = []
+    for bucket in range(num_buckets):
+        ranked = sorted(candidates, key=lambda worker: (_weight(worker, bucket), worker), reverse=True)
+        owner = next(worker for worker in ranked if load[worker] < capacity)
+        load[owner] += 1
+        if owner == worker_id:
+            owned.append(bucket)
+    return owned
+
+
+class ShardCoordinator:
+    """Keeps one dispatcher worker's share of the buckets leased."""
+
+    def __init__(self, worker_id: Optional[str] = DISPATCHER_WORKER_ID,
+                 lease_seconds: float = DISPATCHER_LEASE_SECONDS):
+        """
+        Initialize the coordinator.
+
+        Args:
+            worker_id: Unique worker ID (default: host name plus a random suffix)
+            lease_seconds: Lease length; must exceed the dispatcher's poll interval, since
+                           leases and heartbeats are renewed once per cycle
+        """
+        self.host = socket.gethostname()
+        self.worker_id = worker_id or f"{self.host}-{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.buckets: List[int] = []
+
+    def refresh(self) -> List[int]:
+        """
+        Heartbeat, rebalance against the live workers and renew leases.
+
+        Returns:
+            Buckets this worker may deliver until the next refresh
+        """
+        heartbeat_worker(self.worker_id, self.host, stale_after_seconds=self.lease_seconds * 10)
+        workers = get_live_workers(self.lease_seconds)
+        wanted = assign_buckets(self.worker_id, workers)
+        held = claim_shards(self.worker_id, wanted, self.lease_seconds)
+
+        if held != self.buckets:
+            waiting = len(wanted) - len(held)
+            logger.info(f"Worker {self.worker_id} now owns {len(held)}/{SHARD_BUCKETS} shards "
+                        f"({len(workers)} live workers"
+                        f"{f', waiting for {waiting} leases' if waiting else ''})")
+        self.buckets = held
+        return held
+
+    def shutdown(self) -> None:
+        """Release every bucket so the remaining workers take over on their next cycle."""
+        try:
+            release_worker(self.worker_id)
+            logger.info(f"Worker {self.worker_id} released its shards")
+        except Exception as e:
+            logger.error(f"Worker {self.worker_id} failed to release its shards: {e}")
+        self.buckets = []
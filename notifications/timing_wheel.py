@@ -0,0 +1,308 @@
+"""
+In-memory hierarchical timing wheel for firing near-term reminders on time.
+
+Polling the reminders table only notices a due reminder on the next poll, up to
+NOTIFICATION_POLL_INTERVAL_SECONDS late. Instead the dispatcher loads every
+reminder due within a horizon (one range query on reminder_time) into a timing
+wheel and fires each one within a tick of its reminder_time. Each reload syncs
+the wheel with the database, and fired reminders are re-read before delivery,
+so edits, snoozes, completions and deletes are honoured.
+"""
+import os
+import math
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+import pytz
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WHEEL_TICK_SECONDS = float(os.getenv("DISPATCHER_WHEEL_TICK_SECONDS", "0.25"))
+WHEEL_HORIZON_SECONDS = float(os.getenv("DISPATCHER_WHEEL_HORIZON_SECONDS", "300"))
+WHEEL_SLOTS = 64
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel with O(1) schedule, cancel and per-tick expiry.
+
+    Level 0 has one slot per tick, and each higher level's slot covers a whole
+    rotation of the level below it. An entry sits in the lowest level whose
+    current rotation contains its deadline. It moves down a level when the wheel
+    reaches its slot, and fires from level 0. Deadlines beyond the horizon are
+    refused, so memory is bounded by the number of entries due within the horizon.
+    """
+
+    def __init__(self, tick_seconds: float = WHEEL_TICK_SECONDS, horizon_seconds: float = WHEEL_HORIZON_SECONDS,
+                 slots: int = WHEEL_SLOTS, now: Optional[float] = None):
+        """
+        Initialize the wheel.
+
+        Args:
+            tick_seconds: Firing resolution in seconds
+            horizon_seconds: Furthest deadline accepted, relative to the wheel's current time
+            slots: Slots per level
+            now: Start time as a Unix timestamp (default: time.time())
+        """
+        self.tick_seconds = tick_seconds
+        self.horizon_seconds = horizon_seconds
+        self.slots = slots
+        self.horizon_ticks = int(math.ceil(horizon_seconds / tick_seconds))
+        self.levels = 1
+        while slots ** self.levels <= self.horizon_ticks:
+            self.levels += 1
+        self._current = self._tick_of(time.time() if now is None else now)
+        # One slot list per level plus an overflow slot for deadlines in the next top-level rotation
+        self._wheel: List[List[Dict[Hashable, int]]] = [[{} for _ in range(slots)] for _ in range(self.levels)]
+        self._overflow: Dict[Hashable, int] = {}
+        self._location: Dict[Hashable, Dict[Hashable, int]] = {}
+        # Expired entries not yet returned by advance(); still cancellable until then
+        self._expired: Dict[Hashable, int] = {}
+
+    def _tick_of(self, timestamp: float) -> int:
+        return int(math.floor(timestamp / self.tick_seconds))
+
+    def _place(self, key: Hashable, tick: int) -> None:
+        """Put a key into the slot its deadline tick belongs to, relative to the current tick."""
+        if tick <= self._current:
+            slot = self._expired
+            slot[key] = tick
+            self._location[key] = slot
+            return
+        span = 1
+        for level in range(self.levels):
+            if tick // (span * self.slots) == self._current // (span * self.slots):
+                slot = self._wheel[level][(tick // span) % self.slots]
+                break
+            span *= self.slots
+        else:
+            slot = self._overflow
+        slot[key] = tick
+        self._location[key] = slot
+
+    def schedule(self, key: Hashable, deadline: float) -> bool:
+        """
+        Schedule a key to expire at a deadline, replacing any earlier schedule of the key.
+
+        Args:
+            key: Entry key, e.g. a reminder ID
+            deadline: Unix timestamp; past deadlines expire on the next advance()
+
+        Returns:
+            False if the deadline is beyond the horizon and the key was not scheduled
+        """
+        self.cancel(key)
+        tick = int(math.ceil(deadline / self.tick_seconds))
+        if tick - self._current > self.horizon_ticks:
+            return False
+        self._place(key, tick)
+        return True
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        Remove a scheduled key.
+
+        Args:
+            key: Entry key
+
+        Returns:
+            True if the key was scheduled
+        """
+        slot = self._location.pop(key, None)
+        if slot is None:
+            return False
+        del slot[key]
+        return True
+
+    def advance(self, now: Optional[float] = None) -> List[Hashable]:
+        """
+        Move the wheel to the given time and return the keys that expired on the way.
+
+        Args:
+            now: Unix timestamp (default: time.time())
+
+        Returns:
+            Expired keys, in deadline order
+        """
+        target = self._tick_of(time.time() if now is None else now)
+        if not self._location:
+            self._current = max(self._current, target)
+
+        while self._current < target:
+            self._current += 1
+            if self._current % (self.slots ** self.levels) == 0:
+                self._cascade(self._overflow)
+            for level in range(self.levels - 1, 0, -1):
+                span = self.slots ** level
+                if self._current % span == 0:
+                    self._cascade(self._wheel[level][(self._current // span) % self.slots])
+            self._cascade(self._wheel[0][self._current % self.slots])
+
+        expired = sorted(self._expired, key=self._expired.get)
+        for key in expired:
+            del self._location[key]
+        self._expired.clear()
+        return expired
+
+    def _cascade(self, slot: Dict[Hashable, int]) -> None:
+        """Re-place a slot's entries relative to the current tick (expiring those now due)."""
+        if not slot:
+            return
+        entries = list(slot.items())
+        slot.clear()
+        for key, tick in entries:
+            self._place(key, tick)
+
+    def __len__(self) -> int:
+        return len(self._location)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._location
+
+
+def _timestamp(reminder: Dict[str, Any]) -> float:
+    """Unix timestamp of a reminder row's reminder_time (naive values are UTC)."""
+    reminder_time: datetime = reminder['reminder_time']
+    if reminder_time.tzinfo is None:
+        reminder_time = pytz.utc.localize(reminder_time)
+    return reminder_time.timestamp()
+
+
+class NearTermSchedule:
+    """
+    The dispatcher's in-memory copy of reminders due within the horizon.
+
+    Reminders wait in a TimingWheel until due, then stay in the due set until
+    delivered. The database remains the source of truth: sync() replaces the
+    copy with a fresh load, and confirm() re-checks reminders as they fire.
+    """
+
+    def __init__(self, horizon_seconds: float = WHEEL_HORIZON_SECONDS, tick_seconds: float = WHEEL_TICK_SECONDS,
+                 now: Optional[float] = None):
+        """
+        Initialize the schedule.
+
+        Args:
+            horizon_seconds: How far ahead reminders are held in memory
+            tick_seconds: Firing resolution in seconds
+            now: Start time as a Unix timestamp (default: time.time())
+        """
+        self.horizon_seconds = horizon_seconds
+        self.tick_seconds = tick_seconds
+        self.wheel = TimingWheel(tick_seconds=tick_seconds, horizon_seconds=horizon_seconds, now=now)
+        self._scheduled: Dict[int, Dict[str, Any]] = {}
+        self._due: Dict[int, Dict[str, Any]] = {}
+        self._fired: Dict[int, None] = {}
+
+    def _put(self, reminder: Dict[str, Any], now: float) -> None:
+        """(Re)schedule a reminder according to its current reminder_time."""
+        reminder_id = reminder['id']
+        self._discard(reminder_id)
+        deadline = _timestamp(reminder)
+        if deadline <= now:
+            self._due[reminder_id] = reminder
+        elif self.wheel.schedule(reminder_id, deadline):
+            self._scheduled[reminder_id] = reminder
+
+    def _discard(self, reminder_id: int) -> None:
+        self.wheel.cancel(reminder_id)
+        self._fired.pop(reminder_id, None)
+        self._scheduled.pop(reminder_id, None)
+        self._due.pop(reminder_id, None)
+
+    def sync(self, reminders: List[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """
+        Replace the held reminders with a fresh load from the database.
+
+        New and moved reminders are (re)scheduled. Reminders missing from the load
+        were completed, deleted, delivered or moved past the horizon, so they are dropped.
+
+        Args:
+            reminders: Rows from get_pending_notifications(horizon_seconds=self.horizon_seconds)
+            now: Current Unix timestamp (default: time.time())
+        """
+        now = time.time() if now is None else now
+        # Bring the wheel up to date first so the horizon is measured from now
+        self._fire(now)
+        loaded = {reminder['id']: reminder for reminder in reminders}
+
+        for reminder_id in [rid for rid in list(self._scheduled) + list(self._due) if rid not in loaded]:
+            self._discard(reminder_id)
+
+        for reminder_id, reminder in loaded.items():
+            held = self._scheduled.get(reminder_id) or self._due.get(reminder_id)
+            if held is not None and held['reminder_time'] == reminder['reminder_time']:
+                # Same schedule; keep its place but pick up edited columns (title, phone number, ...)
+                (self._scheduled if reminder_id in self._scheduled else self._due)[reminder_id] = reminder
+            else:
+                self._put(reminder, now)
+
+    def advance(self, now: Optional[float] = None) -> List[int]:
+        """
+        Fire the reminders whose time has come.
+
+        Args:
+            now: Current Unix timestamp (default: time.time())
+
+        Returns:
+            IDs of the fired reminders; pass them with their re-read rows to confirm()
+        """
+        self._fire(time.time() if now is None else now)
+        fired, self._fired = list(self._fired), {}
+        return fired
+
+    def _fire(self, now: float) -> None:
+        for reminder_id in self.wheel.advance(now):
+            self._scheduled.pop(reminder_id, None)
+            self._fired[reminder_id] = None
+
+    def confirm(self, fired_ids: List[int], current: List[Dict[str, Any]], now: Optional[float] = None) -> None:
+        """
+        Move fired reminders to the due set, according to their current rows.
+
+        Args:
+            fired_ids: IDs returned by advance()
+            current: Their rows as re-read from the database; a missing row was completed,
+                     deleted or already delivered, and a later reminder_time means it was snoozed
+            now: Current Unix timestamp (default: time.time())
+        """
+        now = time.time() if now is None else now
+        rows = {reminder['id']: reminder for reminder in current}
+        for reminder_id in fired_ids:
+            reminder = rows.get(reminder_id)
+            if reminder is None:
+                self._discard(reminder_id)
+            else:
+                self._put(reminder, now)
+
+    def users_due_within(self, seconds: float, now: Optional[float] = None) -> Set[int]:
+        """
+        Users with a scheduled (not yet fired) reminder due within the given time.
+
+        Args:
+            seconds: How far ahead to look
+            now: Current Unix timestamp (default: time.time())
+
+        Returns:
+            Set of user IDs
+        """
+        until = (time.time() if now is None else now) + seconds
+        return {reminder['user_id'] for reminder in self._scheduled.values() if _timestamp(reminder) <= until}
+
+    def due_reminders(self) -> List[Dict[str, Any]]:
+        """Fired reminders awaiting delivery, for NotificationCoalescer.update()."""
+        return list(self._due.values())
+
+    def delivered(self, reminder_ids: List[int]) -> None:
+        """Forget reminders once their notification was sent."""
+        for reminder_id in reminder_ids:
+            self._discard(reminder_id)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Number of (scheduled, due) reminders held in memory."""
+        return len(self._scheduled), len(self._due)
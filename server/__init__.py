@@ -0,0 +1,3 @@
+"""
+Action server entry point: the rasa_sdk endpoint plus operational routes.
+"""
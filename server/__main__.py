@@ -0,0 +1,76 @@
+"""
+Run the action server with /metrics:
+
+    python -m server --actions actions --port 5055
+
+To use several cores, run workers through the launcher instead (server/launcher.py):
+
+    python -m server.launcher --workers 4 --actions actions --port 5055
+
+The worker warms up (server/warmup.py) before it starts listening, unless
+ACTION_SERVER_WARMUP=false or --no-warmup is given. Under the launcher, a worker
+also serves its metrics on a loopback port and reports it with its readiness, so
+the launcher can aggregate the metrics of all workers.
+"""
+import os
+import socket
+import argparse
+import logging
+
+from rasa_sdk.constants import DEFAULT_SERVER_PORT
+
+from server.app import create_app
+from monitoring.metrics import serve_metrics
+from server.launcher import READY_FD_ENV, WORKER_METRICS_ENV, listen_socket
+from server.warmup import WARMUP_ENABLED, warm_up
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Start the reminder bot action server")
+    parser.add_argument("--actions", default="actions", help="Package containing the custom actions")
+    parser.add_argument("-p", "--port", type=int, default=int(os.getenv("ACTION_SERVER_PORT", DEFAULT_SERVER_PORT)),
+                        help="Port to listen on")
+    parser.add_argument("--cors", nargs="*", default="*", help="CORS origins")
+    parser.add_argument("--auto-reload", action="store_true", help="Reload actions when their source changes")
+    parser.add_argument("--reuse-port", action="store_true", help="Bind with SO_REUSEPORT (used by the launcher)")
+    parser.add_argument("--fd", type=int, default=None, help="Serve on an inherited listening socket (used by the launcher)")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip the warm-up before listening")
+    args = parser.parse_args()
+
+    app = create_app(args.actions, cors_origins=args.cors, auto_reload=args.auto_reload)
+    if WARMUP_ENABLED and not args.no_warmup:
+        warm_up()
+    host = os.getenv("SANIC_HOST", "0.0.0.0")
+
+    ready_fd = os.getenv(READY_FD_ENV)
+    if ready_fd:
+        @app.listener("after_server_start")
+        async def notify_ready(app, loop):
+            message = "1"
+            if os.getenv(WORKER_METRICS_ENV) == "1":
+                # Started here so it reads the registry of the process that serves requests
+                metrics_server = serve_metrics(0, "127.0.0.1")
+                message += f" {metrics_server.server_address[1]}"
+            os.write(int(ready_fd), message.encode())
+            os.close(int(ready_fd))
+
+    if args.fd is not None:
+        sock = socket.socket(fileno=args.fd)
+    elif args.reuse_port:
+        sock = listen_socket(host, args.port, reuse_port=True)
+    else:
+        sock = None
+
+    logger.info(f"Action server listening on http://{host}:{args.port} (metrics at /metrics)")
+    if sock is None:
+        app.run(host, args.port, workers=1)
+    else:
+        app.run(sock=sock, workers=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Action server application.
+
+Wraps rasa_sdk's endpoint app (/webhook, /health, /actions), adds /metrics
+for Prometheus scraping and traces each webhook call, continuing the caller's
+trace when the request carries a traceparent header.
+"""
+import logging
+from typing import Any, Dict, List, Text
+
+from rasa_sdk.endpoint import create_app as create_action_app
+from sanic import Sanic, response
+
+from db.connection import DatabaseConnectionPool
+from monitoring.metrics import REGISTRY, histogram_samples
+from monitoring.tracing import begin_span, finish_span, extract_context, TRACEPARENT_HEADER
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def collect_pool_metrics() -> List[str]:
+    """
+    Render connection pool gauges, counters and the acquire wait histogram.
+
+    Returns:
+        Exposition lines; empty until the pool has been created by the first query
+    """
+    pool_manager = DatabaseConnectionPool._instance
+    if pool_manager is None or not pool_manager._initialized:
+        return []
+
+    all_stats: List[Dict[str, Any]] = pool_manager.stats()
+    lines = [
+        "# HELP db_pool_connections Connections held by the pool by state",
+        "# TYPE db_pool_connections gauge",
+    ]
+    for stats in all_stats:
+        for state in ("in_use", "idle"):
+            lines.append(f'db_pool_connections{{pool="{stats["name"]}",state="{state}"}} {stats[state]}')
+    for name, key, kind, documentation in (
+        ("db_pool_waiting", "waiting", "gauge", "Callers waiting for a connection"),
+        ("db_pool_max_size", "max_size", "gauge", "Current connection limit"),
+        ("db_pool_acquire_failures_total", "acquire_failures", "counter", "Failed connection acquires"),
+        ("db_pool_acquire_timeouts_total", "acquire_timeouts", "counter", "Acquires that timed out"),
+        ("db_pool_discarded_total", "discarded_broken", "counter", "Broken connections discarded"),
+        ("db_pool_recycled_total", "recycled", "counter", "Connections closed after reaching max lifetime"),
+    ):
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for stats in all_stats:
+            lines.append(f'{name}{{pool="{stats["name"]}"}} {stats[key]}')
+
+    lines.append("# HELP db_pool_acquire_wait_seconds Time callers waited for a connection")
+    lines.append("# TYPE db_pool_acquire_wait_seconds histogram")
+    for stats in all_stats:
+        buckets = [upper for upper, _ in stats["wait_buckets"]]
+        counts = [count for _, count in stats["wait_buckets"]]
+        lines.extend(histogram_samples("db_pool_acquire_wait_seconds", ["pool"], [stats["name"]], buckets,
+                                       counts, stats["wait_seconds_sum"], stats["acquired"]))
+    return lines
+
+
+def create_app(action_package_name: Text = "actions", cors_origins: Any = "*", auto_reload: bool = False) -> Sanic:
+    """
+    Create the action server app with the /metrics route.
+
+    Args:
+        action_package_name: Package containing the custom actions
+        cors_origins: CORS origins passed to rasa_sdk
+        auto_reload: Reload actions when their source changes
+
+    Returns:
+        Sanic application
+    """
+    app = create_action_app(action_package_name, cors_origins=cors_origins, auto_reload=auto_reload)
+    REGISTRY.register_collector(collect_pool_metrics)
+
+    @app.get("/metrics")
+    async def metrics(request):
+        return response.text(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.middleware("request")
+    async def start_dispatch_span(request):
+        if request.path != "/webhook":
+            return
+        payload = request.json if request.method == "POST" else None
+        attributes = {"http.method": request.method, "http.route": request.path}
+        if isinstance(payload, dict):
+            attributes["rasa.action"] = payload.get("next_action")
+            attributes["rasa.sender_id"] = payload.get("sender_id")
+        request.ctx.trace_span, request.ctx.trace_token = begin_span(
+            "action_server.dispatch", attributes, parent=extract_context(request.headers))
+
+    @app.middleware("response")
+    async def finish_dispatch_span(request, response):
+        span = getattr(request.ctx, "trace_span", None)
+        if span is None:
+            return
+        span.set_attribute("http.status_code", response.status)
+        if response.status >= 500:
+            span.status = "ERROR"
+        response.headers[TRACEPARENT_HEADER] = span.context.to_traceparent()
+        finish_span(span, request.ctx.trace_token)
+
+    return app
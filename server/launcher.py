@@ -0,0 +1,389 @@
+"""
+Pre-fork launcher running several action server workers on one port.
+
+A single action server process runs every custom action on one core. The
+launcher starts N independent worker processes (`python -m server`) that share
+nothing but the port. With SO_REUSEPORT (Linux) each worker binds its own socket
+and the kernel spreads connections across them. Elsewhere the launcher binds
+once and the workers inherit the listening socket.
+
+    python -m server.launcher --workers 4 --actions actions --port 5055
+
+Each worker has its own connection pool. DB_POOL_BUDGET connections (default
+DB_POOL_MAX_CONNECTIONS) are split evenly between the workers, so adding workers
+does not multiply the load on PostgreSQL.
+
+Signals:
+    SIGHUP            rolling restart: each worker is replaced once its successor
+                      is accepting requests (e.g. after deploying new actions)
+    SIGTERM / SIGINT  graceful shutdown; workers finish in-flight requests
+Workers that exit unexpectedly are restarted with exponential backoff. Each
+restart waits for its own deadline, so one crashing slot does not hold up the others.
+
+Each worker keeps its own metrics, and a scrape of the shared port would reach
+whichever worker accepts it. The launcher therefore serves /metrics on
+ACTION_SERVER_METRICS_PORT (default 9055): it collects every worker's metrics
+from a private loopback port and labels each series with worker="<slot>".
+"""
+import os
+import sys
+import time
+import select
+import signal
+import socket
+import argparse
+import logging
+import subprocess
+import urllib.request
+from typing import Dict, List, Optional
+
+from rasa_sdk.constants import DEFAULT_SERVER_PORT
+
+from monitoring.metrics import merge_expositions, serve_metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pipe a worker writes to once it accepts requests
+READY_FD_ENV = "ACTION_SERVER_READY_FD"
+# Set for workers that should serve their metrics on a loopback port for the launcher
+WORKER_METRICS_ENV = "ACTION_SERVER_WORKER_METRICS"
+
+DEFAULT_WORKERS = int(os.getenv("ACTION_SERVER_WORKERS", "0")) or os.cpu_count() or 1
+DB_POOL_BUDGET = int(os.getenv("DB_POOL_BUDGET", os.getenv("DB_POOL_MAX_CONNECTIONS", "10")))
+READY_TIMEOUT_SECONDS = float(os.getenv("ACTION_SERVER_READY_TIMEOUT", "60"))
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("ACTION_SERVER_SHUTDOWN_TIMEOUT", "20"))
+MAX_RESTART_BACKOFF_SECONDS = 30.0
+METRICS_PORT = int(os.getenv("ACTION_SERVER_METRICS_PORT", "9055"))  # 0 disables the aggregated /metrics
+METRICS_SCRAPE_TIMEOUT_SECONDS = 2.0
+
+
+def listen_socket(host: str, port: int, reuse_port: bool = False, backlog: int = 100) -> socket.socket:
+    """
+    Create a listening TCP socket.
+
+    Args:
+        host: Interface to bind
+        port: Port to bind
+        reuse_port: Set SO_REUSEPORT so several workers can bind the same port and the
+                    kernel spreads connections across them (Linux)
+        backlog: Listen backlog
+
+    Returns:
+        Bound, listening socket
+    """
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def worker_pool_env(workers: int, budget: int = DB_POOL_BUDGET) -> Dict[str, str]:
+    """
+    Compute the pool settings giving each worker an equal share of the connection budget.
+
+    Args:
+        workers: Number of workers
+        budget: Total connections all workers may hold on the primary (and on each replica)
+
+    Returns:
+        Environment variables for the workers
+    """
+    per_worker = max(1, budget // workers)
+    if budget < workers:
+        logger.warning(f"DB_POOL_BUDGET={budget} is below the {workers} workers; each still gets 1 connection")
+    env = {
+        "DB_POOL_MAX_CONNECTIONS": str(per_worker),
+        "DB_POOL_MIN_CONNECTIONS": str(min(per_worker, int(os.getenv("DB_POOL_MIN_CONNECTIONS", "1")))),
+    }
+    if int(os.getenv("DB_POOL_ADAPTIVE_MAX", "0")):
+        env["DB_POOL_ADAPTIVE_MAX"] = str(max(per_worker, int(os.environ["DB_POOL_ADAPTIVE_MAX"]) // workers))
+    return env
+
+
+class Worker:
+    """One action server process and the pipe it reports readiness on."""
+
+    def __init__(self, slot: int, process: subprocess.Popen, ready_fd: int):
+        self.slot = slot
+        self.process = process
+        self.ready_fd = ready_fd
+        self.started_at = time.monotonic()
+        self.ready = ready_fd < 0
+        # Loopback port the worker serves its own /metrics on, reported with its readiness
+        self.metrics_port: Optional[int] = None
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        Wait until the worker accepts requests.
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            True if the worker reported ready, False if it exited or timed out
+        """
+        if self.ready_fd < 0:
+            return self.ready
+        try:
+            readable, _, _ = select.select([self.ready_fd], [], [], timeout)
+            if readable:
+                self._read_ready()
+            return self.ready
+        finally:
+            self._close_ready_fd()
+
+    def check_ready(self) -> Optional[bool]:
+        """
+        Check for the readiness report without blocking.
+
+        Returns:
+            True once ready, False if the worker exited before it was ready, None if it is still starting
+        """
+        if self.ready_fd < 0:
+            return self.ready
+        readable, _, _ = select.select([self.ready_fd], [], [], 0)
+        if not readable:
+            return None
+        self._read_ready()
+        self._close_ready_fd()
+        return self.ready
+
+    def _read_ready(self) -> None:
+        # "1" or "1 <metrics port>"; EOF without data means the worker exited before it was ready
+        message = os.read(self.ready_fd, 64).decode().split()
+        self.ready = bool(message) and message[0] == "1"
+        if self.ready and len(message) > 1:
+            self.metrics_port = int(message[1])
+
+    def _close_ready_fd(self) -> None:
+        os.close(self.ready_fd)
+        self.ready_fd = -1
+
+    def terminate(self, timeout: float = SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """Stop the worker gracefully, killing it if it does not exit in time."""
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+        self.wait(timeout)
+
+    def wait(self, timeout: float) -> None:
+        """Wait for the worker to exit, killing it after the timeout."""
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Worker {self.slot} (pid {self.pid}) did not stop within {timeout}s; killing it")
+            self.process.kill()
+            self.process.wait()
+
+
+class WorkerSupervisor:
+    """Starts, watches and restarts the action server workers."""
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, actions: str = "actions", port: int = DEFAULT_SERVER_PORT,
+                 host: Optional[str] = None, reuse_port: Optional[bool] = None, pool_budget: int = DB_POOL_BUDGET,
+                 ready_timeout: float = READY_TIMEOUT_SECONDS, extra_args: Optional[List[str]] = None,
+                 metrics_port: int = METRICS_PORT):
+        """
+        Initialize the supervisor.
+
+        Args:
+            workers: Number of worker processes
+            actions: Package containing the custom actions
+            port: Port all workers serve
+            host: Interface to bind (default: SANIC_HOST or 0.0.0.0)
+            reuse_port: Let each worker bind with SO_REUSEPORT (default: if the platform supports it);
+                        otherwise the workers inherit one socket bound by the launcher
+            pool_budget: Total database connections split across the workers
+            ready_timeout: Seconds a new worker has to start accepting requests
+            extra_args: Further arguments passed to every worker (e.g. ["--cors", "*"])
+            metrics_port: Port of the launcher's /metrics aggregating all workers (0 disables it)
+        """
+        self.num_workers = max(1, workers)
+        self.actions = actions
+        self.port = port
+        self.host = host or os.getenv("SANIC_HOST", "0.0.0.0")
+        self.reuse_port = hasattr(socket, "SO_REUSEPORT") if reuse_port is None else reuse_port
+        self.pool_env = worker_pool_env(self.num_workers, pool_budget)
+        self.ready_timeout = ready_timeout
+        self.extra_args = extra_args or []
+        self.workers: Dict[int, Worker] = {}
+        self._socket: Optional[socket.socket] = None
+        self.metrics_port = metrics_port
+        self._metrics_server = None
+        self._failures: Dict[int, int] = {}
+        # slot -> monotonic time its crashed worker is restarted at
+        self._restart_at: Dict[int, float] = {}
+        self._running = False
+        self._restart_requested = False
+
+    def _spawn(self, slot: int) -> Worker:
+        """Start the worker process for a slot."""
+        read_fd, write_fd = os.pipe()
+        command = [sys.executable, "-m", "server", "--actions", self.actions, "--port", str(self.port)]
+        pass_fds = [write_fd]
+        if self._socket is not None:
+            command += ["--fd", str(self._socket.fileno())]
+            pass_fds.append(self._socket.fileno())
+        else:
+            command.append("--reuse-port")
+        command += self.extra_args
+
+        env = dict(os.environ, **self.pool_env)
+        env[READY_FD_ENV] = str(write_fd)
+        env["ACTION_SERVER_WORKER_ID"] = str(slot)
+        env[WORKER_METRICS_ENV] = "1" if self.metrics_port else "0"
+        try:
+            # Own session: a terminal's Ctrl-C reaches the launcher, which then stops workers in order
+            process = subprocess.Popen(command, env=env, pass_fds=pass_fds, start_new_session=True)
+        finally:
+            os.close(write_fd)
+        logger.info(f"Started worker {slot} (pid {process.pid})")
+        return Worker(slot, process, read_fd)
+
+    def start(self) -> None:
+        """Bind the port (unless workers use SO_REUSEPORT) and start every worker."""
+        if not self.reuse_port:
+            self._socket = listen_socket(self.host, self.port)
+            self._socket.set_inheritable(True)
+        for slot in range(self.num_workers):
+            self.workers[slot] = self._spawn(slot)
+        for worker in list(self.workers.values()):
+            if not worker.wait_ready(self.ready_timeout):
+                logger.error(f"Worker {worker.slot} (pid {worker.pid}) did not become ready")
+        if self.metrics_port:
+            self._metrics_server = serve_metrics(self.metrics_port, self.host, render=self.collect_metrics)
+        logger.info(f"{self.num_workers} action server workers on http://{self.host}:{self.port} "
+                    f"({'SO_REUSEPORT' if self.reuse_port else 'shared socket'}, "
+                    f"{self.pool_env['DB_POOL_MAX_CONNECTIONS']} DB connections each)"
+                    + (f", metrics at http://{self.host}:{self.metrics_port}/metrics" if self.metrics_port else ""))
+
+    def collect_metrics(self) -> str:
+        """Scrape every ready worker's metrics and merge them, labelled by worker slot."""
+        texts = {}
+        for slot, worker in sorted(self.workers.items()):
+            if worker.metrics_port is None or worker.process.poll() is not None:
+                continue
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{worker.metrics_port}/metrics",
+                                            timeout=METRICS_SCRAPE_TIMEOUT_SECONDS) as metrics_response:
+                    texts[str(slot)] = metrics_response.read().decode()
+            except OSError as e:
+                logger.warning(f"Could not collect metrics of worker {slot} (pid {worker.pid}): {e}")
+        return merge_expositions(texts)
+
+    def rolling_restart(self) -> None:
+        """Replace the workers one at a time, keeping the others serving."""
+        logger.info("Rolling restart of the action server workers")
+        for slot in sorted(self.workers):
+            old = self.workers[slot]
+            new = self._spawn(slot)
+            if not new.wait_ready(self.ready_timeout):
+                logger.error(f"Replacement for worker {slot} did not become ready; keeping pid {old.pid}")
+                new.terminate()
+                continue
+            self.workers[slot] = new
+            self._restart_at.pop(slot, None)
+            old.terminate()
+            logger.info(f"Worker {slot} replaced (pid {old.pid} -> {new.pid})")
+
+    def _reap(self, now: Optional[float] = None) -> None:
+        """
+        Schedule restarts of workers that exited, backing off if a slot keeps crashing,
+        and start the replacements whose time has come. Never blocks.
+        """
+        now = time.monotonic() if now is None else now
+        for slot, worker in list(self.workers.items()):
+            if worker.ready_fd >= 0 and worker.check_ready() is False:
+                logger.error(f"Worker {slot} (pid {worker.pid}) exited before it was ready")
+            if slot in self._restart_at:
+                continue
+            code = worker.process.poll()
+            if code is None:
+                continue
+            lived = now - worker.started_at
+            self._failures[slot] = 0 if lived > MAX_RESTART_BACKOFF_SECONDS else self._failures.get(slot, 0) + 1
+            backoff = min(MAX_RESTART_BACKOFF_SECONDS, 2 ** self._failures[slot] - 1)
+            logger.error(f"Worker {slot} (pid {worker.pid}) exited with code {code}; restarting in {backoff}s")
+            self._restart_at[slot] = now + backoff
+
+        for slot, restart_at in list(self._restart_at.items()):
+            if now >= restart_at and self._running:
+                del self._restart_at[slot]
+                # Readiness is picked up by check_ready() on later passes
+                self.workers[slot] = self._spawn(slot)
+
+    def stop(self, *args) -> None:
+        """Shut down after the current supervision step."""
+        self._running = False
+
+    def request_restart(self, *args) -> None:
+        """Schedule a rolling restart."""
+        self._restart_requested = True
+
+    def shutdown(self) -> None:
+        """Stop every worker gracefully."""
+        logger.info("Stopping action server workers")
+        for worker in self.workers.values():
+            if worker.process.poll() is None:
+                worker.process.send_signal(signal.SIGTERM)
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT_SECONDS
+        for worker in self.workers.values():
+            worker.wait(max(0.1, deadline - time.monotonic()))
+        if self._socket is not None:
+            self._socket.close()
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
+
+    def run(self) -> None:
+        """Run until SIGTERM/SIGINT, restarting workers on SIGHUP or when they die."""
+        self._running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGHUP, self.request_restart)
+        self.start()
+        try:
+            while self._running:
+                if self._restart_requested:
+                    self._restart_requested = False
+                    self.rolling_restart()
+                self._reap()
+                time.sleep(0.5)
+        finally:
+            self.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run several action server workers on one port")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Worker processes (default: ACTION_SERVER_WORKERS or the number of CPUs)")
+    parser.add_argument("--actions", default="actions", help="Package containing the custom actions")
+    parser.add_argument("-p", "--port", type=int, default=int(os.getenv("ACTION_SERVER_PORT", DEFAULT_SERVER_PORT)),
+                        help="Port to listen on")
+    parser.add_argument("--pool-budget", type=int, default=DB_POOL_BUDGET,
+                        help="Database connections shared by all workers (default: DB_POOL_BUDGET)")
+    parser.add_argument("--no-reuse-port", action="store_true",
+                        help="Share one socket bound by the launcher instead of SO_REUSEPORT")
+    parser.add_argument("--cors", nargs="*", default=None, help="CORS origins passed to the workers")
+    parser.add_argument("--metrics-port", type=int, default=METRICS_PORT,
+                        help="Port of the /metrics aggregating all workers (0 disables it)")
+    args = parser.parse_args()
+
+    extra_args = ["--cors", *args.cors] if args.cors is not None else []
+    supervisor = WorkerSupervisor(workers=args.workers, actions=args.actions, port=args.port,
+                                  reuse_port=False if args.no_reuse_port else None,
+                                  pool_budget=args.pool_budget, extra_args=extra_args,
+                                  metrics_port=args.metrics_port)
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    main()
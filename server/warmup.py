@@ -0,0 +1,109 @@
+"""
+Action server warm-up.
+
+Does the work that would otherwise land on a worker's first requests:
+
+    - creating the database pool and preparing every PreparedStatement on its connections
+    - loading the pytz zones in ACTION_SERVER_WARMUP_TIME_ZONES and the ones most common among users
+
+`python -m server` runs it before binding its port (or accepting on the launcher's
+shared socket). /health does not answer and the launcher's ready signal is not
+sent until the worker is warm, so neither an autoscaler nor a rolling restart
+routes traffic to a cold worker. If the database is unreachable, the server still
+starts and connects on first use, as it did before.
+"""
+import os
+import time
+import logging
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, Iterable
+
+import pytz
+
+from db.aio import get_db_executor
+from db.connection import DatabaseConnectionPool
+# Importing the models package registers every PreparedStatement
+from db.models import get_common_time_zones
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("ACTION_SERVER_WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("ACTION_SERVER_WARMUP_TIMEOUT", "30"))
+WARMUP_CONNECTIONS = int(os.getenv("ACTION_SERVER_WARMUP_CONNECTIONS", "0"))  # 0 means the pool minimum
+WARMUP_TIME_ZONES = [zone.strip() for zone in os.getenv("ACTION_SERVER_WARMUP_TIME_ZONES", "UTC").split(",")
+                     if zone.strip()]
+# How many of the users' most common zones to load as well
+COMMON_TIME_ZONES = int(os.getenv("ACTION_SERVER_WARMUP_COMMON_ZONES", "20"))
+
+
+def load_time_zones(zones: Iterable[str]) -> int:
+    """
+    Load pytz zones so their tz database files are read now rather than on a request.
+
+    Args:
+        zones: Zone names; unknown names are skipped
+
+    Returns:
+        Number of zones loaded
+    """
+    loaded = 0
+    for zone in zones:
+        try:
+            pytz.timezone(zone)
+            loaded += 1
+        except pytz.exceptions.UnknownTimeZoneError:
+            logger.warning(f"Skipping unknown time zone during warm-up: {zone}")
+    return loaded
+
+
+def warm_up_database(connections: int = WARMUP_CONNECTIONS, common_zones: int = COMMON_TIME_ZONES) -> Dict[str, Any]:
+    """
+    Create the pool, prepare statements on its connections and read the users' common zones.
+
+    Args:
+        connections: Connections to warm per pool (0 means the pool minimum)
+        common_zones: How many of the most common user zones to return
+
+    Returns:
+        Dictionary with statements_prepared and time_zones (most common first)
+    """
+    statements_prepared = DatabaseConnectionPool().warm_up(connections or None)
+    time_zones = get_common_time_zones(common_zones) if common_zones else []
+    return {"statements_prepared": statements_prepared, "time_zones": time_zones}
+
+
+def warm_up(timeout: float = WARMUP_TIMEOUT_SECONDS) -> Dict[str, Any]:
+    """
+    Warm up the worker. Failures are logged, never raised.
+
+    The database part runs on the database executor (which starts its first
+    thread) and is abandoned after timeout seconds.
+
+    Args:
+        timeout: Seconds to wait for the database part
+
+    Returns:
+        Dictionary with seconds, statements_prepared, time_zones_loaded and database_ready
+    """
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"statements_prepared": 0, "time_zones_loaded": 0, "database_ready": False}
+    zones = list(WARMUP_TIME_ZONES)
+
+    future = get_db_executor().submit(warm_up_database)
+    try:
+        database = future.result(timeout=timeout)
+        result["statements_prepared"] = database["statements_prepared"]
+        result["database_ready"] = True
+        zones.extend(zone for zone in database["time_zones"] if zone not in zones)
+    except FutureTimeout:
+        logger.warning(f"Database warm-up did not finish within {timeout}s; continuing without it")
+    except Exception as e:
+        logger.warning(f"Database warm-up failed; connections will be opened on first use: {e}")
+
+    result["time_zones_loaded"] = load_time_zones(zones)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Warm-up finished in {result['seconds']}s: {result['statements_prepared']} statements prepared, "
+                f"{result['time_zones_loaded']} time zones loaded")
+    return result
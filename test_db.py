@@ -2,11 +2,19 @@
 """
 Test script for database connection and operations.
 This script tests the database connection, migration application, and basic CRUD operations.
+
+With --benchmark it instead seeds datasets of increasing size with the bulk loader
+in benchmarks/seed.py and times every function in db/models/ against each size:
+
+    python test_db.py --benchmark --sizes 10000 100000 1000000 --output db_bench.json
 """
+import json
+import time
 import logging
 import random
 import string
-from datetime import datetime, timedelta
+import argparse
+from datetime import datetime, timedelta, timezone
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -141,6 +149,45 @@ def test_reminder_operations():
         delete_user(user_id)
         logger.info(f"Cleaned up test user with ID: {user_id}")
 
+def test_reminder_summary_triggers():
+    """Test that only updates of summarised columns recompute the reminder summary."""
+    from db.connection import get_db_cursor
+    from db.models.user import create_user, delete_user
+    from db.models.reminder import create_reminder, update_reminder, mark_notifications_sent
+
+    logger.info("Testing reminder summary triggers...")
+
+    username = f"summaryuser_{generate_random_string(5)}"
+    user = create_user(username, f"{username}@example.com", generate_random_string(12))
+    user_id = user['id']
+
+    def summary_row():
+        with get_db_cursor() as cursor:
+            cursor.execute("SELECT next_reminder_title, updated_at FROM user_reminder_summary WHERE user_id = %s",
+                           (user_id,))
+            return cursor.fetchone()
+
+    try:
+        reminder = create_reminder(user_id, "Summary test", datetime.now(timezone.utc) + timedelta(days=1))
+        before = summary_row()
+        assert before['next_reminder_title'] == "Summary test", "Insert did not refresh the summary"
+
+        # The dispatcher's update touches only notification_sent and updated_at
+        mark_notifications_sent([reminder['id']])
+        assert summary_row()['updated_at'] == before['updated_at'], "Marking notification_sent refreshed the summary"
+        logger.info("Marking a notification as sent left the summary alone")
+
+        update_reminder(reminder['id'], {'title': "Summary test renamed"})
+        after = summary_row()
+        assert after['next_reminder_title'] == "Summary test renamed", "Title update did not refresh the summary"
+        assert after['updated_at'] > before['updated_at'], "Title update did not refresh the summary"
+        logger.info("Updating a summarised column refreshed the summary")
+
+        return True
+    finally:
+        delete_user(user_id)
+        logger.info(f"Cleaned up test user with ID: {user_id}")
+
 def test_connection_pool():
     """Test connection pooling by making multiple connections."""
     from db.connection import DatabaseConnectionPool
@@ -191,6 +238,7 @@ def main():
         test_connection_pool,
         test_user_operations,
         test_reminder_operations,
+        test_reminder_summary_triggers,
     ]
     
     results = []
@@ -211,6 +259,176 @@ def main():
     
     return passed == total
 
+def _sample_bench_reminders(sender_prefix, limit, seed):
+    """Get (reminder_id, user_id) pairs of seeded reminders in random order."""
+    from db.connection import get_db_cursor
+    
+    with get_db_cursor(cursor_factory=None) as cursor:
+        cursor.execute(
+            """
+            SELECT r.id, r.user_id FROM reminders r
+            JOIN sender_users s ON s.user_id = r.user_id
+            WHERE s.sender_id LIKE %s
+            ORDER BY r.id DESC
+            LIMIT %s
+            """,
+            (f"{sender_prefix}-%", limit),
+        )
+        rows = cursor.fetchall()
+    random.Random(seed).shuffle(rows)
+    return rows
+
+def benchmark_models(num_reminders, repeat=200, seed=42, sender_prefix="bench"):
+    """
+    Seed a dataset and time each db.models function on it.
+    
+    Args:
+        num_reminders: Size of the seeded dataset
+        repeat: Calls timed per function
+        seed: Random seed for the dataset and the sampled arguments
+        sender_prefix: Sender ID prefix of the benchmark users
+        
+    Returns:
+        Dictionary with dataset size, seeding time and a latency summary per function
+    """
+    from benchmarks.seed import seed_dataset, sender_id_for
+    from benchmarks.stats import summarize
+    from db.models import (
+        get_user_by_id, update_user, get_or_create_user_for_sender, forget_sender,
+        create_reminder, get_reminder_by_id, get_reminders_by_user_id, get_upcoming_reminders,
+        find_reminders_by_title, get_pending_notifications, update_reminder, snooze_reminder,
+        reschedule_reminder, mark_reminder_completed, mark_notification_sent, mark_notifications_sent,
+        delete_reminder, delete_completed_reminders,
+    )
+    
+    logger.info(f"Benchmarking db.models with {num_reminders} reminders...")
+    num_users = max(1, num_reminders // 50)
+    started = time.perf_counter()
+    seed_dataset(num_reminders, num_users, sender_prefix=sender_prefix, seed=seed)
+    seed_seconds = time.perf_counter() - started
+    
+    rng = random.Random(seed)
+    senders = [sender_id_for(rng.randrange(num_users), sender_prefix) for _ in range(repeat)]
+    user_ids = [get_or_create_user_for_sender(sender_id) for sender_id in senders]
+    # Every write below gets its own reminders, so no call operates on an already deleted row
+    samples = _sample_bench_reminders(sender_prefix, repeat * 7, seed)
+    if len(samples) < 7:
+        raise ValueError(f"Dataset too small to benchmark: {len(samples)} reminders sampled")
+    batches = [samples[i * len(samples) // 7:(i + 1) * len(samples) // 7] for i in range(7)]
+    # Only users with a phone number are notified; timing the query on an empty result measures nothing
+    if not get_pending_notifications():
+        raise ValueError("Dataset has no pending notifications to benchmark get_pending_notifications on")
+    future = datetime.now(timezone.utc) + timedelta(days=3)
+    
+    def _batch_of_ten(batch, i):
+        # Cycle through the batch's groups of ten; a batch shorter than ten is used whole
+        start = i % max(1, len(batch) // 10) * 10
+        return batch[start:start + 10]
+    
+    # (name, callable taking the iteration index); read-only functions run before writes
+    cases = [
+        ("get_or_create_user_for_sender (cached)", lambda i: get_or_create_user_for_sender(senders[i])),
+        ("get_or_create_user_for_sender (uncached)",
+         lambda i: (forget_sender(senders[i]), get_or_create_user_for_sender(senders[i]))),
+        ("get_user_by_id", lambda i: get_user_by_id(user_ids[i])),
+        ("get_reminder_by_id", lambda i: get_reminder_by_id(batches[0][i % len(batches[0])][0])),
+        ("get_reminders_by_user_id", lambda i: get_reminders_by_user_id(user_ids[i])),
+        ("get_reminders_by_user_id (include completed)",
+         lambda i: get_reminders_by_user_id(user_ids[i], include_completed=True)),
+        ("get_upcoming_reminders", lambda i: get_upcoming_reminders(user_ids[i])),
+        ("find_reminders_by_title", lambda i: find_reminders_by_title(user_ids[i], "pay the bill")),
+        ("get_pending_notifications", lambda i: get_pending_notifications()),
+        ("create_reminder", lambda i: create_reminder(user_ids[i], "benchmark reminder", future)),
+        ("update_user", lambda i: update_user(user_ids[i], {"time_zone": "UTC"})),
+        ("update_reminder", lambda i: update_reminder(batches[0][i % len(batches[0])][0], {"title": "renamed"})),
+        ("snooze_reminder", lambda i: snooze_reminder(batches[1][i % len(batches[1])][1], timedelta(minutes=10),
+                                                      batches[1][i % len(batches[1])][0])),
+        ("reschedule_reminder", lambda i: reschedule_reminder(batches[2][i % len(batches[2])][1], future,
+                                                              batches[2][i % len(batches[2])][0])),
+        ("mark_reminder_completed", lambda i: mark_reminder_completed(batches[3][i % len(batches[3])][0])),
+        ("mark_notification_sent", lambda i: mark_notification_sent(batches[4][i % len(batches[4])][0])),
+        ("mark_notifications_sent (batch of 10)",
+         lambda i: mark_notifications_sent([reminder_id for reminder_id, _ in _batch_of_ten(batches[5], i)])),
+        ("delete_reminder", lambda i: delete_reminder(batches[6][i % len(batches[6])][0],
+                                                      batches[6][i % len(batches[6])][1])),
+        ("delete_completed_reminders", lambda i: delete_completed_reminders(user_ids[i], days_old=1)),
+    ]
+    
+    functions = {}
+    for name, call in cases:
+        latencies = []
+        for i in range(repeat):
+            call_started = time.perf_counter()
+            call(i)
+            latencies.append(time.perf_counter() - call_started)
+        functions[name] = summarize(latencies)
+        logger.info(f"{name}: p50 {functions[name]['p50_ms']}ms, p95 {functions[name]['p95_ms']}ms")
+    
+    return {
+        "reminders": num_reminders,
+        "users": num_users,
+        "seed_seconds": round(seed_seconds, 3),
+        "seed_rows_per_second": round(num_reminders / seed_seconds) if seed_seconds else None,
+        "functions": functions,
+    }
+
+def run_benchmarks(sizes, repeat, seed, output=None, keep_data=False):
+    """
+    Run benchmark_models() for each dataset size and write the results as JSON.
+    
+    Args:
+        sizes: Dataset sizes (number of reminders), e.g. [10000, 100000, 1000000]
+        repeat: Calls timed per function
+        seed: Random seed
+        output: JSON file to write (default: print to stdout)
+        keep_data: Leave the last seeded dataset in the database
+        
+    Returns:
+        The report dictionary
+    """
+    import subprocess
+    from benchmarks.seed import clear_dataset
+    from db.migrations import apply_migrations
+    
+    apply_migrations()
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"]).decode().strip()
+    except Exception:
+        commit = None
+    
+    report = {
+        "commit": commit,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "repeat": repeat,
+        "seed": seed,
+        "runs": [benchmark_models(size, repeat=repeat, seed=seed) for size in sorted(sizes)],
+    }
+    if not keep_data:
+        clear_dataset()
+    
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
+        logger.info(f"Benchmark results written to {output}")
+    else:
+        print(text)
+    return report
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Database smoke tests and benchmarks")
+    parser.add_argument("--benchmark", action="store_true", help="Run the db.models benchmark suite instead of the tests")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="Dataset sizes (reminders) to benchmark, e.g. 10000 100000 10000000")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls timed per function and size")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for datasets and arguments")
+    parser.add_argument("--output", default=None, help="JSON file for benchmark results (default: stdout)")
+    parser.add_argument("--keep-data", action="store_true", help="Keep the last seeded dataset")
+    args = parser.parse_args()
+    
+    if args.benchmark:
+        run_benchmarks(args.sizes, args.repeat, args.seed, args.output, args.keep_data)
+        exit(0)
+    
     success = main()
     exit(0 if success else 1) 
\ No newline at end of file
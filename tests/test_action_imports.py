@@ -0,0 +1,33 @@
+"""Importing the action package, as rasa_sdk does at startup, must not load the database stack."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ("pytz", "psycopg2", "db.connection", "db.aio", "db.models")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _loaded_after_import(module: str):
+    code = (f"import sys, {module}; "
+            f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))")
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=REPO_ROOT)
+    return [name for name in output.decode().strip().split(",") if name]
+
+
+def test_admission_defers_the_pool():
+    assert _loaded_after_import("actions.admission") == []
+
+
+def test_actions_defer_the_database_stack():
+    pytest.importorskip("rasa_sdk")
+    assert _loaded_after_import("actions.actions") == []
+
+
+def test_concurrency_cap_defaults_to_twice_the_pool_limit():
+    from actions.admission import ConcurrencyLimiter
+    from db.connection import POOL_SIZE_LIMIT
+
+    assert ConcurrencyLimiter(limit=None).limit == 2 * POOL_SIZE_LIMIT
+    assert not ConcurrencyLimiter(limit=0).enabled
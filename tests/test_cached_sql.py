@@ -0,0 +1,187 @@
+"""
+Tests for tracker_stores.cached_sql.CachedSQLTrackerStore caching and history compaction.
+
+The store runs against a SQLite file, so no database server is needed.
+"""
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("rasa")
+
+from rasa.core.tracker_store import SQLTrackerStore  # noqa: E402
+from rasa.shared.core.domain import Domain  # noqa: E402
+from rasa.shared.core.events import ActionExecuted, UserUttered  # noqa: E402
+from rasa.shared.core.trackers import DialogueStateTracker  # noqa: E402
+
+from tracker_stores.cached_sql import CachedSQLTrackerStore, _current_session  # noqa: E402
+
+
+def _session(start, texts):
+    """Events of one session starting at the given timestamp, one user turn per text."""
+    events = [ActionExecuted("action_session_start", timestamp=start), SessionStarted(timestamp=start + 0.1),
+              ActionExecuted("action_listen", timestamp=start + 0.2)]
+    for offset, text in enumerate(texts, start=1):
+        events.append(UserUttered(text, timestamp=start + offset))
+        events.append(ActionExecuted("action_listen", timestamp=start + offset + 0.5))
+    return events
+
+
+def _tracker(sender_id, events):
+    return DialogueStateTracker.from_events(sender_id, list(events), [])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CachedSQLTrackerStore(domain=Domain.empty(), db=str(tmp_path / "trackers.db"),
+                                 compact_on_session_start=False)
+
+
+async def _continue(sender_id, store, events):
+    """Run a turn the way Rasa does: retrieve the tracker, add the turn's events and save it."""
+    tracker = await store.retrieve(sender_id)
+    for event in events:
+        tracker.update(event)
+    await store.save(tracker)
+
+
+def _stored_events(store, sender_id):
+    with store.session_scope() as session:
+        return session.query(store.SQLEvent).filter(store.SQLEvent.sender_id == sender_id).count()
+
+
+def _texts(tracker):
+    return [event.text for event in tracker.events if isinstance(event, UserUttered)]
+
+
+def test_current_session_starts_at_the_latest_session_start():
+    first = _session(0, ["hi"])
+    events = first + _session(100, ["list reminders"])
+
+    # The session's action_session_start comes before its SessionStarted and stays with the earlier one
+    assert _current_session(events) == events[len(first) + 1:]
+    assert _current_session(events[:1]) == events[:1]
+    assert _current_session([]) == []
+
+
+def test_compact_moves_earlier_sessions_into_the_snapshot(store):
+    first, second, third = _session(0, ["hi"]), _session(100, ["list reminders"]), _session(200, ["bye"])
+    asyncio.run(store.save(_tracker("alice", first + second)))
+
+    # Everything before the SessionStarted of the latest session, including its action_session_start
+    assert store.compact("alice") == len(first) + 1
+    assert store.compact("alice") == 0
+    asyncio.run(_continue("alice", store, third))
+    assert store.compact("alice") == len(second)
+
+    full = asyncio.run(store.retrieve_full_tracker("alice"))
+    assert _texts(full) == ["hi", "list reminders", "bye"]
+    assert [event.timestamp for event in full.events] == sorted(event.timestamp for event in full.events)
+    assert _texts(asyncio.run(store.retrieve("alice"))) == ["bye"]
+    assert _stored_events(store, "alice") == len(third) - 1
+
+
+def test_compact_without_a_session_start_moves_nothing(store):
+    asyncio.run(store.save(_tracker("bob", [UserUttered("hi", timestamp=1)])))
+
+    assert store.compact("bob") == 0
+    assert store.compact("nobody") == 0
+    assert _texts(asyncio.run(store.retrieve_full_tracker("bob"))) == ["hi"]
+
+
+def test_compact_all_visits_every_sender_with_earlier_sessions(store):
+    for sender_id in ("a", "b", "c"):
+        asyncio.run(store.save(_tracker(sender_id, _session(0, ["hi"]) + _session(100, ["again"]))))
+    asyncio.run(store.save(_tracker("d", _session(0, ["only one session"]))))
+
+    assert store.compact_all(batch_size=2) == 3 * (len(_session(0, ["hi"])) + 1)
+    assert store.compact_all() == 0
+    assert _stored_events(store, "d") == len(_session(0, ["only one session"]))
+
+
+def test_failed_background_compaction_is_logged(store, monkeypatch, caplog):
+    def fail(sender_id):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(store, "compact", fail)
+    with caplog.at_level(logging.ERROR):
+        store._compact_logged("alice")
+
+    assert "Compacting tracker history of alice failed: database is locked" in caplog.text
+
+
+def test_new_session_in_a_save_schedules_compaction(tmp_path, monkeypatch):
+    store = CachedSQLTrackerStore(domain=Domain.empty(), db=str(tmp_path / "trackers.db"))
+    scheduled = []
+    monkeypatch.setattr(store, "_compact_logged", scheduled.append)
+
+    async def turns():
+        await store.save(_tracker("alice", _session(0, ["hi"])))
+        await _continue("alice", store, [UserUttered("same session", timestamp=50)])
+        await _continue("alice", store, _session(100, ["again"]))
+        await asyncio.get_running_loop().shutdown_default_executor()
+
+    asyncio.run(turns())
+    assert scheduled == ["alice"]
+
+
+def test_cached_sender_is_retrieved_and_saved_without_reading_events(store, monkeypatch):
+    events = _session(0, ["hi"])
+    asyncio.run(store.save(_tracker("alice", events)))
+
+    def no_reads(*args, **kwargs):
+        raise AssertionError("stored events were read for a cached sender")
+
+    monkeypatch.setattr(SQLTrackerStore, "_retrieve", no_reads, raising=False)
+    monkeypatch.setattr(SQLTrackerStore, "_additional_events", no_reads)
+    asyncio.run(_continue("alice", store, [UserUttered("list reminders", timestamp=50)]))
+
+    assert store.cache_hits == 1 and store.cache_misses == 0
+    assert _stored_events(store, "alice") == len(events) + 1
+
+
+def test_uncached_sender_is_loaded_once_then_cached(store):
+    asyncio.run(store.save(_tracker("alice", _session(0, ["hi"]))))
+    store.forget()
+
+    asyncio.run(store.retrieve("alice"))
+    asyncio.run(store.retrieve("alice"))
+    assert (store.cache_misses, store.cache_hits) == (1, 1)
+    assert asyncio.run(store.retrieve("nobody")) is None
+
+
+def test_failed_save_drops_the_cached_session(store, monkeypatch):
+    asyncio.run(store.save(_tracker("alice", _session(0, ["hi"]))))
+
+    async def fail(self, tracker):
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(SQLTrackerStore, "save", fail)
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.save(_tracker("alice", _session(0, ["hi", "again"]))))
+    assert store._cached("alice") is None
+
+
+def test_cache_evicts_the_least_recently_used_sender(tmp_path):
+    store = CachedSQLTrackerStore(domain=Domain.empty(), db=str(tmp_path / "trackers.db"), cache_size=2,
+                                  compact_on_session_start=False)
+    for sender_id in ("a", "b"):
+        asyncio.run(store.save(_tracker(sender_id, _session(0, ["hi"]))))
+    asyncio.run(store.retrieve("a"))
+    asyncio.run(store.save(_tracker("c", _session(0, ["hi"]))))
+
+    assert list(store._cache) == ["a", "c"]
+
+
+def test_expired_or_disabled_cache_reloads_from_the_database(tmp_path):
+    store = CachedSQLTrackerStore(domain=Domain.empty(), db=str(tmp_path / "trackers.db"), cache_ttl=0,
+                                  compact_on_session_start=False)
+    asyncio.run(store.save(_tracker("alice", _session(0, ["hi"]))))
+    assert store._cached("alice") is None
+
+    store.cache_ttl = 60
+    store._remember("alice", _session(0, ["hi"]))
+    store._cache["alice"].stored_at -= 61
+    assert store._cached("alice") is None
+    assert "alice" not in store._cache
@@ -0,0 +1,125 @@
+"""Tests for notifications.coalescing.NotificationCoalescer windows, digests and retry backoff."""
+from datetime import datetime, timedelta, timezone
+
+from notifications.coalescing import CoalescingStats, Digest, NotificationCoalescer
+
+BASE_TIME = datetime(2026, 1, 5, 9, 0, tzinfo=timezone.utc)
+
+
+def _reminder(reminder_id, user_id=1, minutes=0):
+    return {"id": reminder_id, "user_id": user_id, "title": f"task {reminder_id}",
+            "reminder_time": BASE_TIME + timedelta(minutes=minutes)}
+
+
+def test_holds_a_burst_for_the_window_then_releases_one_digest():
+    coalescer = NotificationCoalescer(window_seconds=60, max_items=10)
+    coalescer.update([_reminder(1)], now=0)
+    assert coalescer.pop_ready(now=30) == []
+
+    coalescer.update([_reminder(1), _reminder(2, minutes=-1)], now=30)
+    assert coalescer.held_count == 2
+    digests = coalescer.pop_ready(now=60)
+
+    assert [d.reminder_ids for d in digests] == [[2, 1]]
+    assert coalescer.held_count == 0
+
+
+def test_window_starts_at_the_first_reminder_of_the_burst():
+    coalescer = NotificationCoalescer(window_seconds=60)
+    coalescer.update([_reminder(1)], now=0)
+    coalescer.update([_reminder(1), _reminder(2)], now=50)
+
+    assert len(coalescer.pop_ready(now=60)) == 1
+
+
+def test_full_bucket_is_released_at_once_and_split_at_max_items():
+    coalescer = NotificationCoalescer(window_seconds=60, max_items=2)
+    coalescer.update([_reminder(i, minutes=i) for i in range(1, 6)], now=0)
+
+    digests = coalescer.pop_ready(now=0)
+    assert [d.reminder_ids for d in digests] == [[1, 2], [3, 4], [5]]
+
+
+def test_users_are_coalesced_separately_and_ordered_by_earliest_reminder():
+    coalescer = NotificationCoalescer(window_seconds=0)
+    coalescer.update([_reminder(1, user_id=1, minutes=5), _reminder(2, user_id=2, minutes=1),
+                      _reminder(3, user_id=1, minutes=2)], now=0)
+
+    digests = coalescer.pop_ready(now=0)
+    assert [(d.user_id, d.reminder_ids) for d in digests] == [(2, [2]), (1, [3, 1])]
+
+
+def test_reminders_gone_from_the_database_are_dropped():
+    coalescer = NotificationCoalescer(window_seconds=60)
+    coalescer.update([_reminder(1), _reminder(2)], now=0)
+    coalescer.update([_reminder(2)], now=10)
+
+    assert [d.reminder_ids for d in coalescer.pop_ready(now=60)] == [[2]]
+
+
+def test_expecting_more_releases_everyone_else_at_once():
+    coalescer = NotificationCoalescer(window_seconds=60)
+    coalescer.update([_reminder(1, user_id=1), _reminder(2, user_id=2)], now=0)
+
+    digests = coalescer.pop_ready(now=1, expecting_more={2})
+    assert [d.user_id for d in digests] == [1]
+    assert coalescer.held_count == 1
+
+
+def test_flush_releases_everything():
+    coalescer = NotificationCoalescer(window_seconds=60)
+    coalescer.update([_reminder(1, user_id=1), _reminder(2, user_id=2)], now=0)
+
+    assert len(coalescer.pop_ready(now=0, flush=True)) == 2
+
+
+def test_failed_digest_backs_off_exponentially_up_to_the_maximum():
+    coalescer = NotificationCoalescer(window_seconds=0, retry_seconds=30, retry_max_seconds=100)
+    delays = []
+    now = 0.0
+    for _ in range(4):
+        coalescer.update([_reminder(1)], now=now)
+        digest, = coalescer.pop_ready(now=now)
+        delays.append(coalescer.failed(digest, now=now))
+        coalescer.update([_reminder(1)], now=now)
+        assert coalescer.pop_ready(now=now + delays[-1] - 1) == []
+        now += delays[-1]
+
+    assert delays == [30, 60, 100, 100]
+    assert coalescer.stats.send_failures == 4
+
+
+def test_success_clears_the_backoff():
+    coalescer = NotificationCoalescer(window_seconds=60, retry_seconds=30)
+    coalescer.update([_reminder(1)], now=0)
+    digest, = coalescer.pop_ready(now=60)
+    coalescer.failed(digest, now=60)
+
+    coalescer.update([_reminder(1)], now=60)
+    # A retry is sent as soon as its backoff passes, without waiting out a new window
+    digest, = coalescer.pop_ready(now=90)
+    coalescer.sent(digest)
+
+    coalescer.update([_reminder(3)], now=100)
+    assert coalescer.pop_ready(now=100) == []
+    assert coalescer.stats.messages_sent == 1
+
+
+def test_backoff_is_forgotten_when_the_user_has_nothing_pending():
+    coalescer = NotificationCoalescer(window_seconds=0, retry_seconds=30)
+    coalescer.update([_reminder(1)], now=0)
+    digest, = coalescer.pop_ready(now=0)
+    coalescer.failed(digest, now=0)
+
+    coalescer.update([], now=1)
+    coalescer.update([_reminder(2)], now=2)
+    assert [d.reminder_ids for d in coalescer.pop_ready(now=2)] == [[2]]
+
+
+def test_stats_count_messages_saved():
+    stats = CoalescingStats()
+    stats.record_sent(Digest(1, [_reminder(1), _reminder(2), _reminder(3)]))
+    stats.record_sent(Digest(2, [_reminder(4, user_id=2)]))
+
+    assert stats.as_dict() == {"reminders_delivered": 4, "messages_sent": 2, "messages_saved": 2,
+                               "send_failures": 0}
@@ -0,0 +1,167 @@
+"""
+Tests for notifications.dispatcher.ReminderDispatcher delivery failures.
+
+The database calls are replaced with an in-memory table, and send_message with a stub.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import notifications.dispatcher as dispatcher_module
+from notifications.coalescing import NotificationCoalescer
+from notifications.dispatcher import ReminderDispatcher
+from notifications.timing_wheel import NearTermSchedule
+
+
+class FakeReminders:
+    """Pending reminders as the dispatcher's queries would return them."""
+
+    def __init__(self, reminders):
+        self.rows = {reminder['id']: reminder for reminder in reminders}
+        self.fail_marking = False
+
+    def get_pending_notifications(self, buckets=None, horizon_seconds=0):
+        return list(self.rows.values())
+
+    def get_notifications_by_ids(self, reminder_ids):
+        return [self.rows[reminder_id] for reminder_id in reminder_ids if reminder_id in self.rows]
+
+    def mark_notifications_sent(self, reminder_ids):
+        if self.fail_marking:
+            raise RuntimeError("database unavailable")
+        for reminder_id in reminder_ids:
+            self.rows.pop(reminder_id, None)
+        return list(reminder_ids)
+
+
+class FailingSender:
+    """send_message stub that fails until told otherwise."""
+
+    def __init__(self, fail=True):
+        self.fail = fail
+        self.calls = []
+
+    def __call__(self, to, body):
+        self.calls.append((to, body))
+        return None if self.fail else f"SM{len(self.calls)}"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _reminder(reminder_id, user_id=1):
+    return {"id": reminder_id, "user_id": user_id, "title": f"task {reminder_id}", "phone_number": "+15550001",
+            "time_zone": "UTC", "reminder_time": datetime.now(timezone.utc) - timedelta(seconds=1)}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def _dispatcher(monkeypatch, table, sender, use_wheel):
+    for name in ("get_pending_notifications", "get_notifications_by_ids", "mark_notifications_sent"):
+        monkeypatch.setattr(dispatcher_module, name, getattr(table, name))
+    monkeypatch.setattr(dispatcher_module, "FOLLOWUPS_ENABLED", False)
+    coalescer = NotificationCoalescer(window_seconds=0, retry_seconds=30, retry_max_seconds=120)
+    schedule = NearTermSchedule(horizon_seconds=300, tick_seconds=0.25) if use_wheel else None
+    monkeypatch.setattr(dispatcher_module, "TIMING_WHEEL_ENABLED", use_wheel)
+    return ReminderDispatcher(send_message=sender, coalescer=coalescer, poll_interval=15, schedule=schedule)
+
+
+@pytest.mark.parametrize("use_wheel", [True, False])
+def test_failed_send_backs_off_instead_of_retrying_every_tick(monkeypatch, clock, use_wheel):
+    table = FakeReminders([_reminder(1)])
+    sender = FailingSender()
+    dispatcher = _dispatcher(monkeypatch, table, sender, use_wheel)
+
+    assert dispatcher.run_once() == []
+    assert len(sender.calls) == 1
+
+    # Ticks and polls within the backoff do not try again
+    for _ in range(20):
+        clock.now += 1
+        dispatcher._last_poll = None
+        dispatcher.run_once()
+    assert len(sender.calls) == 1
+    assert dispatcher.coalescer.stats.send_failures == 1
+
+    # Retried once the backoff passes, then backed off twice as long
+    clock.now += 10
+    dispatcher.run_once()
+    assert len(sender.calls) == 2
+    clock.now += 59
+    dispatcher.run_once()
+    assert len(sender.calls) == 2
+
+    sender.fail = False
+    clock.now += 1
+    delivered = dispatcher.run_once()
+    assert [digest.reminder_ids for digest in delivered] == [[1]]
+    assert len(sender.calls) == 3
+    assert table.rows == {}
+    assert dispatcher.coalescer._retry == {}
+
+
+def test_backoff_is_per_user(monkeypatch, clock):
+    table = FakeReminders([_reminder(1, user_id=1), _reminder(2, user_id=2)])
+    sender = FailingSender()
+    dispatcher = _dispatcher(monkeypatch, table, sender, use_wheel=True)
+
+    dispatcher.run_once()
+    assert len(sender.calls) == 2
+
+    # User 2's reminder was completed meanwhile; user 1 stays held
+    del table.rows[2]
+    sender.fail = False
+    clock.now += 1
+    dispatcher._last_poll = None
+    assert dispatcher.run_once() == []
+    assert list(dispatcher.coalescer._retry) == [1]
+
+
+def test_sent_digest_is_not_resent_when_marking_fails(monkeypatch, clock):
+    table = FakeReminders([_reminder(1)])
+    sender = FailingSender(fail=False)
+    dispatcher = _dispatcher(monkeypatch, table, sender, use_wheel=True)
+    table.fail_marking = True
+
+    assert len(dispatcher.run_once()) == 1
+    assert 1 in table.rows
+
+    # The row is still pending in the database, but is kept out until it is marked
+    for _ in range(3):
+        clock.now += 20
+        dispatcher._last_poll = None
+        dispatcher.run_once()
+    assert len(sender.calls) == 1
+
+    table.fail_marking = False
+    dispatcher._last_poll = None
+    dispatcher.run_once()
+    assert table.rows == {}
+    assert dispatcher._unmarked == set()
+    assert len(sender.calls) == 1
+
+
+def test_sent_and_coalesced_counts_reach_the_registry(monkeypatch, clock):
+    from notifications import coalescing
+
+    reminders = FakeReminders([_reminder(1), _reminder(2), _reminder(3, user_id=2)])
+    dispatcher = _dispatcher(monkeypatch, reminders, FailingSender(fail=False), use_wheel=False)
+    before = {counter: counter.value() for counter in (coalescing.MESSAGES_SENT, coalescing.REMINDERS_DELIVERED,
+                                                       coalescing.REMINDERS_COALESCED)}
+
+    dispatcher.run_once(flush=True)
+
+    assert coalescing.MESSAGES_SENT.value() - before[coalescing.MESSAGES_SENT] == 2
+    assert coalescing.REMINDERS_DELIVERED.value() - before[coalescing.REMINDERS_DELIVERED] == 3
+    assert coalescing.REMINDERS_COALESCED.value() - before[coalescing.REMINDERS_COALESCED] == 1
@@ -0,0 +1,120 @@
+"""Tests for nlu_server.fast_path.FastPathMatcher rules and matching."""
+import re
+
+import pytest
+import yaml
+
+from nlu_server.fast_path import DEFAULT_RULES_FILE, EXTRACTOR_NAME, FastPathMatcher, _compile
+
+# Entity markup in data/nlu.yml: [text](entity) or [text]{"entity": ...}
+_MARKUP = re.compile(r"\[([^\]]+)\](\([^)]*\)|\{[^}]*\})")
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return FastPathMatcher.from_file(DEFAULT_RULES_FILE, domain_path="domain.yml")
+
+
+def _intent(result):
+    return result["intent"]["name"] if result else None
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("list reminders", "list_reminders"),
+    ("  Show me all my reminders!  ", "list_reminders"),
+    ("what's next?", "ask_whats_next"),
+    ("help", "ask_faq"),
+    ("Good   morning", "greet"),
+    ("snooze", "snooze_reminder"),
+    ("no thanks.", "deny"),
+])
+def test_unambiguous_commands_match(matcher, text, intent):
+    result = matcher.match(text)
+
+    assert _intent(result) == intent
+    assert result["intent"]["confidence"] == 1.0
+    assert result["intent_ranking"] == [{"name": intent, "confidence": 1.0}]
+    assert result["text"] == text
+
+
+@pytest.mark.parametrize("text", [
+    "remind me to call mom at 5pm",
+    "list reminders for tomorrow",
+    "delete the dentist reminder",
+    "",
+    "?!",
+    "helpful",
+])
+def test_anything_else_falls_through_to_the_model(matcher, text):
+    assert matcher.match(text) is None
+
+
+def test_named_groups_become_entities_with_offsets(matcher):
+    text = "Delete reminder #42."
+    result = matcher.match(text)
+
+    assert _intent(result) == "delete_reminder"
+    entity, = result["entities"]
+    assert entity == {"entity": "reminder_id", "start": 17, "end": 19, "value": "42", "extractor": EXTRACTOR_NAME}
+    assert text[entity["start"]:entity["end"]] == "42"
+
+
+def test_optional_groups_that_did_not_match_are_not_entities(matcher):
+    assert matcher.match("snooze it")["entities"] == []
+    assert [e["value"] for e in matcher.match("snooze for 10 minutes")["entities"]] == ["10 minutes"]
+
+
+def test_rules_agree_with_the_training_data(matcher):
+    with open("data/nlu.yml") as nlu_file:
+        data = yaml.safe_load(nlu_file)
+
+    disagreements = []
+    for block in data.get("nlu", []):
+        if "intent" not in block:
+            continue
+        for line in block["examples"].splitlines():
+            example = _MARKUP.sub(r"\1", line.strip().lstrip("- ").strip())
+            result = matcher.match(example)
+            if result is not None and _intent(result) != block["intent"]:
+                disagreements.append((example, block["intent"], _intent(result)))
+    assert disagreements == []
+
+
+def test_space_in_a_pattern_matches_any_whitespace():
+    assert _compile("my reminders").fullmatch("my \t reminders")
+
+
+def _write_rules(tmp_path, rules):
+    path = tmp_path / "rules.yml"
+    path.write_text(yaml.safe_dump({"rules": rules}))
+    return str(path)
+
+
+def test_unknown_intent_is_rejected(tmp_path):
+    path = _write_rules(tmp_path, [{"intent": "order_pizza", "patterns": ["pizza"]}])
+
+    with pytest.raises(ValueError, match="unknown intent 'order_pizza'"):
+        FastPathMatcher.from_file(path, domain_path="domain.yml")
+    assert len(FastPathMatcher.from_file(path)) == 1
+
+
+def test_unknown_entity_is_rejected(tmp_path):
+    path = _write_rules(tmp_path, [{"intent": "greet", "patterns": ["hi (?P<nickname>\\w+)"]}])
+
+    with pytest.raises(ValueError, match="unknown entities: nickname"):
+        FastPathMatcher.from_file(path, domain_path="domain.yml")
+
+
+def test_invalid_pattern_is_rejected(tmp_path):
+    path = _write_rules(tmp_path, [{"intent": "greet", "patterns": ["(hi"]}])
+
+    with pytest.raises(ValueError, match="Invalid fast path pattern"):
+        FastPathMatcher.from_file(path)
+
+
+def test_rules_are_tried_in_order(tmp_path):
+    matcher = FastPathMatcher.from_file(_write_rules(tmp_path, [{"intent": "greet", "patterns": ["hello"]},
+                                                                {"intent": "help", "patterns": ["hel+o"]}]))
+
+    assert _intent(matcher.match("hello")) == "greet"
+    assert _intent(matcher.match("helllo")) == "help"
@@ -0,0 +1,68 @@
+"""
+Tests for notifications.followups.FollowupTrigger marking.
+
+get_due_followups and mark_notifications_sent are replaced with in-memory versions,
+and the Rasa API with a fake requests session.
+"""
+import pytest
+
+import notifications.followups as followups_module
+from notifications.followups import FollowupTrigger
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+
+class FakeSession:
+    """Answers trigger_intent calls with the next status code; an exception is raised instead."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.posted = []
+
+    def post(self, url, params=None, json=None, timeout=None, headers=None):
+        self.posted.append((url, json))
+        status = self.statuses.pop(0)
+        if isinstance(status, BaseException):
+            raise status
+        return FakeResponse(status)
+
+
+def _followup(followup_id, entities=None):
+    return {"id": followup_id, "sender_id": "web-user", "followup_intent": "EXTERNAL_reminder_due",
+            "followup_entities": entities or {}}
+
+
+@pytest.fixture
+def marked(monkeypatch):
+    marked = []
+    monkeypatch.setattr(followups_module, "mark_notifications_sent", lambda ids: marked.append(list(ids)) or ids)
+    return marked
+
+
+def test_each_followup_is_marked_as_it_is_triggered(monkeypatch, marked):
+    due = [_followup(1), _followup(2, {"task": "call mom", "reminder_id": 7}), _followup(3), _followup(4)]
+    monkeypatch.setattr(followups_module, "get_due_followups", lambda limit, buckets=None: due)
+    trigger = FollowupTrigger(rasa_url="http://rasa:5005", session=FakeSession([200, 200, 503, 404]))
+
+    assert trigger.run_once() == [1, 2]
+    # The delivered reminder is marked with its follow-up; the 503 is left for the next cycle,
+    # and the rejected one is marked so it is not retried forever
+    assert marked == [[1], [2, 7], [4]]
+    assert trigger.failed == 2
+
+
+def test_crash_mid_batch_keeps_earlier_marks(monkeypatch, marked):
+    class Crash(BaseException):
+        pass
+
+    due = [_followup(1), _followup(2)]
+    monkeypatch.setattr(followups_module, "get_due_followups", lambda limit, buckets=None: due)
+    trigger = FollowupTrigger(rasa_url="http://rasa:5005", session=FakeSession([200, Crash()]))
+
+    with pytest.raises(Crash):
+        trigger.run_once()
+    assert marked == [[1]]
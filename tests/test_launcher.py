@@ -0,0 +1,99 @@
+"""Tests for server.launcher restart scheduling and readiness reports."""
+import os
+
+import pytest
+
+pytest.importorskip("rasa_sdk")
+
+from server import launcher  # noqa: E402
+from server.launcher import Worker, WorkerSupervisor  # noqa: E402
+
+
+class FakeProcess:
+    """Stands in for subprocess.Popen; exit_code None means still running."""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.exit_code = None
+
+    def poll(self):
+        return self.exit_code
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    supervisor = WorkerSupervisor(workers=2, metrics_port=0)
+    supervisor._running = True
+    spawned = []
+
+    def spawn(slot):
+        worker = Worker(slot, FakeProcess(100 + len(spawned)), -1)
+        worker.started_at = 0.0
+        spawned.append(slot)
+        return worker
+
+    monkeypatch.setattr(supervisor, "_spawn", spawn)
+    monkeypatch.setattr(launcher.time, "sleep", lambda seconds: pytest.fail("_reap must not sleep"))
+    for slot in range(2):
+        supervisor.workers[slot] = spawn(slot)
+    spawned.clear()
+    supervisor.spawned = spawned
+    return supervisor
+
+
+def test_crashed_worker_restarts_at_its_deadline_without_blocking(supervisor):
+    supervisor.workers[0].process.exit_code = 1
+
+    supervisor._reap(now=1.0)  # crashed within the backoff window: 1s backoff
+    assert supervisor.spawned == []
+    assert supervisor._restart_at == {0: 2.0}
+
+    supervisor._reap(now=1.5)
+    assert supervisor.spawned == []
+
+    supervisor._reap(now=2.0)
+    assert supervisor.spawned == [0]
+    assert supervisor.workers[0].process.exit_code is None
+    assert supervisor._restart_at == {}
+
+
+def test_backoff_of_one_slot_does_not_delay_another(supervisor):
+    supervisor._failures[0] = 4  # slot 0 keeps crashing: next backoff 31s, capped at 30s
+    supervisor.workers[0].process.exit_code = 1
+    supervisor._reap(now=1.0)
+    assert supervisor._restart_at == {0: 31.0}
+
+    supervisor.workers[1].process.exit_code = 1
+    supervisor._reap(now=2.0)
+    supervisor._reap(now=3.0)
+    assert supervisor.spawned == [1]
+    assert 0 in supervisor._restart_at
+
+
+def test_long_lived_worker_restarts_immediately(supervisor):
+    supervisor._failures[0] = 3
+    supervisor.workers[0].process.exit_code = -9
+
+    supervisor._reap(now=launcher.MAX_RESTART_BACKOFF_SECONDS + 10)
+    assert supervisor.spawned == [0]
+    assert supervisor._failures[0] == 0
+
+
+def test_check_ready_reads_metrics_port_without_blocking():
+    read_fd, write_fd = os.pipe()
+    worker = Worker(0, FakeProcess(100), read_fd)
+    assert worker.check_ready() is None
+
+    os.write(write_fd, b"1 40123")
+    os.close(write_fd)
+    assert worker.check_ready() is True
+    assert worker.metrics_port == 40123
+    assert worker.ready_fd == -1
+
+
+def test_worker_exiting_before_ready_is_not_ready():
+    read_fd, write_fd = os.pipe()
+    worker = Worker(0, FakeProcess(100), read_fd)
+    os.close(write_fd)
+    assert worker.wait_ready(1) is False
+    assert worker.metrics_port is None
@@ -0,0 +1,49 @@
+"""Tests for monitoring.metrics exposition merging and the standalone /metrics listener."""
+import urllib.error
+import urllib.request
+
+import pytest
+
+from monitoring.metrics import MetricsRegistry, merge_expositions, serve_metrics
+
+
+def _registry(requests: int) -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests", ["action"]).inc("action_greet", amount=requests)
+    registry.histogram("latency_seconds", "Latency", buckets=(0.1,)).observe(0.05)
+    return registry
+
+
+def test_merge_labels_every_sample_and_keeps_one_header_per_family():
+    text = merge_expositions({"0": _registry(2).render(), "1": _registry(3).render()})
+    lines = text.splitlines()
+
+    assert lines.count("# HELP requests_total Requests") == 1
+    assert lines.count("# TYPE latency_seconds histogram") == 1
+    assert 'requests_total{worker="0",action="action_greet"} 2' in lines
+    assert 'requests_total{worker="1",action="action_greet"} 3' in lines
+    assert 'latency_seconds_bucket{worker="1",le="0.1"} 1' in lines
+    assert 'latency_seconds_sum{worker="0"} 0.05' in lines
+    # Samples of a family follow its header, whichever worker they came from
+    header = lines.index("# TYPE requests_total counter")
+    assert lines[header + 1:header + 3] == ['requests_total{worker="0",action="action_greet"} 2',
+                                            'requests_total{worker="1",action="action_greet"} 3']
+
+
+def test_merge_of_nothing_is_empty():
+    assert merge_expositions({}) == ""
+
+
+def test_serve_metrics_serves_render_on_metrics_only():
+    server = serve_metrics(0, "127.0.0.1", render=lambda: "up 1\n")
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{url}/metrics", timeout=5) as response:
+            assert response.read() == b"up 1\n"
+            assert response.headers["Content-Type"].startswith("text/plain")
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            urllib.request.urlopen(f"{url}/other", timeout=5)
+        assert excinfo.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,117 @@
+"""Tests for nlu_server.cache.ParseCache keys, entity offset mapping, eviction and model changes."""
+from nlu_server.cache import ParseCache, normalize
+
+
+def _parse(text, entities=(), intent="delete_reminder"):
+    return {"text": text, "intent": {"name": intent, "confidence": 0.97},
+            "entities": [dict(entity) for entity in entities]}
+
+
+def _entity(text, value, entity="reminder_id", literal=True):
+    start = text.index(value)
+    return {"entity": entity, "start": start, "end": start + len(value),
+            "value": value if literal else value.upper()}
+
+
+def test_normalize_collapses_case_and_whitespace_and_keeps_positions():
+    text = "  Show\t MY  list "
+    normalized, positions = normalize(text)
+
+    assert normalized == "show my list"
+    # Each character maps back to itself; a collapsed run maps to its last whitespace character
+    assert [text[position].lower() if not text[position].isspace() else " " for position in positions] \
+        == list(normalized)
+    assert positions[4] == 7
+
+
+def test_normalize_refuses_text_whose_length_changes_when_lowered():
+    assert normalize("İstanbul") is None
+
+
+def test_hit_is_shared_across_spacing_and_case_with_remapped_offsets():
+    cache = ParseCache(max_size=10)
+    cache.set_fingerprint("model-1")
+    first = "delete reminder 4"
+    cache.put(first, _parse(first, [_entity(first, "4")]))
+
+    second = "  Delete   REMINDER 4"
+    result = cache.get(second)
+
+    assert result["text"] == second
+    entity, = result["entities"]
+    assert second[entity["start"]:entity["end"]] == "4"
+    assert entity["value"] == "4"
+    assert cache.stats()["hits"] == 1
+
+
+def test_literal_values_follow_the_new_message_and_others_are_kept():
+    cache = ParseCache(max_size=10)
+    first = "remind me about Dentist"
+    cache.put(first, _parse(first, [_entity(first, "Dentist", "task"), _entity(first, "me", "who", literal=False)]))
+
+    result = cache.get("remind ME about dentist")
+    assert [entity["value"] for entity in result["entities"]] == ["dentist", "ME"]
+
+
+def test_cached_result_cannot_be_mutated_through_a_hit():
+    cache = ParseCache(max_size=10)
+    cache.put("hi", _parse("hi", intent="greet"))
+    cache.get("hi")["intent"]["name"] = "tampered"
+
+    assert cache.get("hi")["intent"]["name"] == "greet"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ParseCache(max_size=2)
+    for text in ("one", "two"):
+        cache.put(text, _parse(text))
+    cache.get("one")
+    cache.put("three", _parse("three"))
+
+    assert cache.get("two") is None
+    assert cache.get("one") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_new_model_drops_old_results_and_late_puts_are_ignored():
+    cache = ParseCache(max_size=10)
+    cache.set_fingerprint("model-1")
+    cache.put("hi", _parse("hi", intent="greet"))
+
+    cache.set_fingerprint("model-2")
+    assert cache.get("hi") is None
+    # A parse computed by the old model that finishes after the swap
+    cache.put("hi", _parse("hi", intent="greet"), fingerprint="model-1")
+    assert cache.get("hi") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_long_empty_and_unmappable_messages_are_not_cached():
+    cache = ParseCache(max_size=10, max_text_length=10)
+    for text in ("a much longer message", "   "):
+        cache.put(text, _parse(text))
+        assert cache.get(text) is None
+
+    text = "delete  4"
+    # The span starts on the first of two spaces, which collapse to one normalized character
+    cache.put(text, _parse(text, [{"entity": "reminder_id", "start": 6, "end": 9, "value": "  4"}]))
+    assert cache.get(text) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache_never_stores():
+    cache = ParseCache(max_size=0)
+    cache.put("hi", _parse("hi"))
+
+    assert cache.get("hi") is None
+    assert cache.stats()["misses"] == 0
+
+
+def test_hit_rate():
+    cache = ParseCache(max_size=10)
+    cache.put("hi", _parse("hi"))
+    cache.get("hi")
+    cache.get("hi")
+    cache.get("bye")
+
+    assert cache.stats()["hit_rate"] == round(2 / 3, 4)
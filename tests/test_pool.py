@@ -0,0 +1,212 @@
+"""
+Tests for db.pool.MonitoredConnectionPool checkout, recycling and adaptive sizing.
+
+psycopg2.connect is replaced with fake connections, so no database is needed.
+"""
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+import db.pool as pool_module
+from db.pool import MonitoredConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query):
+        if self.connection.broken:
+            raise RuntimeError("server closed the connection unexpectedly")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class FakeInfo:
+    transaction_status = extensions.TRANSACTION_STATUS_IDLE
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.info = FakeInfo()
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(**kwargs):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(pool_module.psycopg2, "connect", connect)
+    return opened
+
+
+def _pool(minconn=1, maxconn=2, **kwargs):
+    kwargs.setdefault("acquire_timeout", 5)
+    return MonitoredConnectionPool(minconn, maxconn, name="test", **kwargs)
+
+
+def _due_for_adapting(pool, waits):
+    """Make the next checkout adapt, having observed the given acquire waits."""
+    pool._last_adapt = time.monotonic() - pool_module.ADAPT_INTERVAL_SECONDS - 1
+    pool.stats_data.recent_waits.extend(waits)
+
+
+def test_opens_minconn_up_front_and_reuses_returned_connections(connections):
+    pool = _pool(minconn=2, maxconn=3)
+    assert len(connections) == 2
+
+    first = pool.getconn()
+    pool.putconn(first)
+    assert pool.getconn() is first
+    assert pool.stats()["created"] == 2
+
+
+def test_getconn_times_out_at_the_limit(connections):
+    pool = _pool(minconn=0, maxconn=1)
+    pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.05)
+    stats = pool.stats()
+    assert stats["acquire_timeouts"] == 1
+    assert stats["in_use"] == 1
+
+
+def test_returned_connection_wakes_a_waiter(connections):
+    pool = _pool(minconn=0, maxconn=1)
+    held = pool.getconn()
+    threading.Timer(0.05, pool.putconn, (held,)).start()
+
+    assert pool.getconn(timeout=2) is held
+
+
+def test_broken_idle_connection_is_replaced(connections, monkeypatch):
+    monkeypatch.setattr(pool_module, "HEALTH_CHECK_IDLE_SECONDS", 0)
+    pool = _pool(minconn=1, maxconn=1)
+    connections[0].broken = True
+
+    replacement = pool.getconn()
+    assert replacement is connections[1]
+    assert connections[0].closed
+    assert pool.stats()["discarded_broken"] == 1
+
+
+def test_expired_connection_is_recycled_on_return(connections):
+    pool = _pool(minconn=0, maxconn=1, max_lifetime=60)
+    connection = pool.getconn()
+    pool._created_at[id(connection)] -= 61
+
+    pool.putconn(connection)
+    assert connection.closed
+    assert pool.stats()["recycled"] == 1
+    assert pool.stats()["idle"] == 0
+
+
+def test_open_transaction_is_rolled_back_on_return(connections):
+    pool = _pool(minconn=0, maxconn=1)
+    connection = pool.getconn()
+    connection.info.transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+
+    pool.putconn(connection)
+    assert connection.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_adaptive_limit_grows_while_callers_wait_up_to_the_ceiling(connections):
+    pool = _pool(minconn=0, maxconn=2, adaptive=True, adaptive_max=3)
+
+    for expected in (3, 3):
+        _due_for_adapting(pool, [pool_module.GROW_WAIT_SECONDS * 2] * 20)
+        pool.putconn(pool.getconn())
+        assert pool.maxconn == expected
+
+
+def test_adaptive_limit_shrinks_when_idle_but_not_below_minconn(connections):
+    pool = _pool(minconn=2, maxconn=4, adaptive=True)
+    held = [pool.getconn() for _ in range(4)]
+    for connection in held:
+        pool.putconn(connection)
+
+    for expected in (3, 2, 2):
+        pool._peak_in_use = 0
+        _due_for_adapting(pool, [0.0] * 20)
+        pool.putconn(pool.getconn())
+        assert pool.maxconn == expected
+    # Idle connections beyond the limit were closed
+    assert pool.stats()["idle"] == 2
+    assert sum(1 for connection in connections if connection.closed) == 2
+
+
+def test_adaptive_limit_keeps_headroom_above_peak_usage(connections):
+    pool = _pool(minconn=0, maxconn=4, adaptive=True)
+    held = [pool.getconn() for _ in range(3)]
+
+    _due_for_adapting(pool, [0.0] * 20)
+    pool.putconn(held.pop())
+    pool.putconn(pool.getconn())
+    assert pool.maxconn == 4
+
+
+def test_growing_the_limit_wakes_a_waiter(connections):
+    pool = _pool(minconn=0, maxconn=1, adaptive=True, adaptive_max=2)
+    pool.getconn()
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append((pool.getconn(timeout=5), time.monotonic())))
+    waiter.start()
+    while pool.stats()["waiting"] == 0:
+        time.sleep(0.001)
+
+    grown_at = time.monotonic()
+    with pool._condition:
+        _due_for_adapting(pool, [pool_module.GROW_WAIT_SECONDS * 2] * 20)
+        pool._maybe_adapt()
+    waiter.join(5)
+
+    assert pool.maxconn == 2
+    assert acquired, "waiter did not get a connection"
+    # Woken by the growth, not by its 5s timeout
+    assert acquired[0][1] - grown_at < 1
+
+
+def test_closeall_fails_waiters_and_later_checkouts(connections):
+    pool = _pool(minconn=1, maxconn=1)
+    pool.getconn()
+    errors = []
+
+    def wait():
+        try:
+            pool.getconn(timeout=5)
+        except pool_module.PoolError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    while pool.stats()["waiting"] == 0:
+        time.sleep(0.001)
+    pool.closeall()
+    waiter.join(5)
+
+    assert len(errors) == 1 and not isinstance(errors[0], PoolTimeout)
+    with pytest.raises(pool_module.PoolError):
+        pool.getconn()
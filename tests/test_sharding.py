@@ -0,0 +1,125 @@
+"""Tests for notifications.sharding bucket assignment and ShardCoordinator leases."""
+import logging
+import random
+
+import pytest
+
+import notifications.sharding as sharding
+from notifications.sharding import ShardCoordinator, assign_buckets
+
+
+def _owners(workers, num_buckets=64):
+    return {bucket: worker for worker in workers for bucket in assign_buckets(worker, workers, num_buckets)}
+
+
+def _owners_of(worker, workers):
+    return sorted(bucket for bucket, owner in _owners(workers).items() if owner == worker)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 7, 64, 100])
+def test_every_bucket_has_exactly_one_owner_within_capacity(count):
+    workers = [f"worker-{i}" for i in range(count)]
+    shares = [assign_buckets(worker, workers) for worker in workers]
+
+    assert sorted(bucket for share in shares for bucket in share) == list(range(64))
+    assert max(len(share) for share in shares) == -(-64 // count)
+    assert all(share == sorted(share) for share in shares)
+
+
+def test_assignment_ignores_worker_order_and_duplicates():
+    workers = ["a", "b", "c", "d"]
+    shuffled = workers * 2
+    random.Random(3).shuffle(shuffled)
+
+    assert all(assign_buckets(worker, workers) == assign_buckets(worker, shuffled) for worker in workers)
+
+
+def test_worker_missing_from_the_live_list_still_gets_a_share():
+    # A worker whose heartbeat is not visible yet computes the assignment it is about to join
+    assert assign_buckets("new", ["a", "b"]) == _owners_of("new", ["a", "b", "new"])
+
+
+def test_joining_worker_takes_buckets_from_others_and_moves_few():
+    workers = [f"worker-{i}" for i in range(5)]
+    before, after = _owners(workers), _owners(workers + ["worker-5"])
+
+    moved = [bucket for bucket in before if before[bucket] != after[bucket]]
+    taken = [bucket for bucket in after if after[bucket] == "worker-5"]
+    assert set(taken) <= set(moved)
+    # Rehashing everything would move about 5/6 of the buckets
+    assert len(moved) <= 2 * 64 // 6
+
+
+def test_leaving_worker_hands_over_its_buckets_and_moves_few():
+    workers = [f"worker-{i}" for i in range(6)]
+    before, after = _owners(workers), _owners(workers[1:])
+
+    moved = [bucket for bucket in before if before[bucket] != after[bucket]]
+    assert {bucket for bucket in before if before[bucket] == "worker-0"} <= set(moved)
+    assert len(moved) <= 2 * 64 // 5
+
+
+def test_single_worker_owns_everything():
+    assert assign_buckets("only", [], num_buckets=8) == list(range(8))
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """Replaces the dispatcher_workers/dispatcher_shards queries with in-memory state."""
+    state = {"live": [], "leased": None, "heartbeats": [], "released": [], "release_error": None}
+
+    def claim_shards(worker_id, wanted, lease_seconds):
+        return list(wanted) if state["leased"] is None else [b for b in wanted if b in state["leased"]]
+
+    def release_worker(worker_id):
+        if state["release_error"]:
+            raise state["release_error"]
+        state["released"].append(worker_id)
+
+    monkeypatch.setattr(sharding, "heartbeat_worker", lambda worker_id, host, stale_after_seconds:
+                        state["heartbeats"].append((worker_id, stale_after_seconds)))
+    monkeypatch.setattr(sharding, "get_live_workers", lambda lease_seconds: list(state["live"]))
+    monkeypatch.setattr(sharding, "claim_shards", claim_shards)
+    monkeypatch.setattr(sharding, "release_worker", release_worker)
+    return state
+
+
+def test_refresh_heartbeats_and_holds_only_the_leases_it_got(database, caplog):
+    coordinator = ShardCoordinator("a", lease_seconds=30)
+    database["live"] = ["a", "b"]
+    wanted = assign_buckets("a", ["a", "b"])
+    # The previous owner of the rest has not released them yet
+    database["leased"] = wanted[:10]
+
+    with caplog.at_level(logging.INFO):
+        assert coordinator.refresh() == wanted[:10]
+    assert database["heartbeats"] == [("a", 300)]
+    assert f"waiting for {len(wanted) - 10} leases" in caplog.text
+
+    database["leased"] = None
+    assert coordinator.refresh() == coordinator.buckets == wanted
+
+
+def test_default_worker_id_is_unique_per_process():
+    assert ShardCoordinator(None).worker_id != ShardCoordinator(None).worker_id
+
+
+def test_shutdown_releases_the_buckets(database):
+    coordinator = ShardCoordinator("a")
+    database["live"] = ["a"]
+    coordinator.refresh()
+
+    coordinator.shutdown()
+    assert database["released"] == ["a"]
+    assert coordinator.buckets == []
+
+
+def test_failed_release_is_logged_and_buckets_are_dropped(database, caplog):
+    coordinator = ShardCoordinator("a")
+    database["live"] = ["a"]
+    coordinator.refresh()
+    database["release_error"] = RuntimeError("connection refused")
+
+    coordinator.shutdown()
+    assert "Worker a failed to release its shards: connection refused" in caplog.text
+    assert coordinator.buckets == []
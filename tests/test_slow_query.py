@@ -0,0 +1,84 @@
+"""
+Tests for db.slow_query: which slow statements are re-run under EXPLAIN ANALYZE.
+
+The mixin is put on a fake cursor, so no database is needed.
+"""
+import pytest
+from psycopg2 import extensions
+
+import db.slow_query as slow_query
+from db.slow_query import SlowQueryCursorMixin, normalize_sql, params_shape
+
+
+class FakeConnection:
+    class info:
+        transaction_status = extensions.TRANSACTION_STATUS_INTRANS
+
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, query, vars=None):
+        self.connection.executed.append(query)
+
+    def fetchall(self):
+        return [("Seq Scan on reminders",)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+class TimedCursor(SlowQueryCursorMixin, FakeCursor):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def explain_every_slow_query(monkeypatch):
+    monkeypatch.setattr(slow_query, "SLOW_QUERY_SECONDS", 1e-9)
+    monkeypatch.setattr(slow_query, "EXPLAIN_SAMPLE_RATE", 1.0)
+
+
+def _explains(query, read_only):
+    connection = FakeConnection()
+    cursor = TimedCursor(connection)
+    cursor.read_only = read_only
+    cursor.execute(query, (1,))
+    return [statement for statement in connection.executed if statement.startswith("EXPLAIN")]
+
+
+def test_read_only_cursor_gets_explain_analyze():
+    assert _explains("SELECT * FROM reminders WHERE user_id = %s", read_only=True) == [
+        "EXPLAIN (ANALYZE, BUFFERS) SELECT * FROM reminders WHERE user_id = %s"]
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT refresh_reminder_summary(ARRAY[%s]::integer[])",
+    "SELECT pg_advisory_lock(%s)",
+    "SELECT * FROM reminders WHERE id = %s",
+])
+def test_other_cursors_only_get_a_plain_explain(query):
+    assert _explains(query, read_only=False) == [f"EXPLAIN {query}"]
+
+
+def test_writes_are_never_analyzed_even_on_read_only_cursors():
+    assert _explains("UPDATE reminders SET title = 'x' WHERE id = %s", read_only=True) == [
+        "EXPLAIN UPDATE reminders SET title = 'x' WHERE id = %s"]
+
+
+def test_statements_without_a_plan_are_not_explained():
+    assert _explains("SET statement_timeout = %s", read_only=True) == []
+
+
+def test_normalize_sql_and_params_shape():
+    assert normalize_sql("SELECT *  FROM t\n WHERE a = 'x''y' AND b = 42") == "SELECT * FROM t WHERE a = ? AND b = ?"
+    assert params_shape((1, "a", [1, 2], None)) == "(int, str, list[2], None)"
@@ -0,0 +1,173 @@
+"""Tests for notifications.timing_wheel.TimingWheel expiry and NearTermSchedule syncing."""
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+from notifications.timing_wheel import NearTermSchedule, TimingWheel
+
+BASE_TIME = datetime(2026, 1, 5, 9, 0, tzinfo=timezone.utc)
+T0 = BASE_TIME.timestamp()
+
+
+def test_fires_within_a_tick_of_the_deadline_and_never_early():
+    wheel = TimingWheel(tick_seconds=0.25, horizon_seconds=60, now=T0)
+    wheel.schedule("a", T0 + 10.1)
+
+    assert wheel.advance(T0 + 10.2) == []
+    assert "a" in wheel
+    assert wheel.advance(T0 + 10.25) == ["a"]
+    assert len(wheel) == 0
+
+
+def test_expired_keys_are_returned_in_deadline_order():
+    wheel = TimingWheel(tick_seconds=1, horizon_seconds=1000, slots=4, now=T0)
+    for key, seconds in (("late", 900), ("soon", 3), ("middle", 70)):
+        wheel.schedule(key, T0 + seconds)
+
+    assert wheel.advance(T0 + 1000) == ["soon", "middle", "late"]
+
+
+def test_deadline_beyond_the_horizon_is_refused():
+    wheel = TimingWheel(tick_seconds=1, horizon_seconds=60, now=T0)
+
+    assert wheel.schedule("far", T0 + 61) is False
+    assert "far" not in wheel
+    assert wheel.schedule("edge", T0 + 60) is True
+
+
+def test_past_deadline_expires_on_the_next_advance():
+    wheel = TimingWheel(tick_seconds=1, horizon_seconds=60, now=T0)
+    wheel.schedule("overdue", T0 - 30)
+
+    assert wheel.advance(T0) == ["overdue"]
+
+
+def test_cancel_and_reschedule():
+    wheel = TimingWheel(tick_seconds=1, horizon_seconds=60, now=T0)
+    wheel.schedule("a", T0 + 5)
+    wheel.schedule("b", T0 + 5)
+    wheel.schedule("b", T0 + 20)
+
+    assert wheel.cancel("a") is True
+    assert wheel.cancel("a") is False
+    assert wheel.advance(T0 + 10) == []
+    assert wheel.advance(T0 + 20) == ["b"]
+
+
+def test_idle_wheel_jumps_ahead_and_measures_the_horizon_from_the_new_time():
+    wheel = TimingWheel(tick_seconds=1, horizon_seconds=60, now=T0)
+    assert wheel.advance(T0 + 86400) == []
+
+    assert wheel.schedule("a", T0 + 86400 + 30) is True
+    assert wheel.advance(T0 + 86400 + 30) == ["a"]
+
+
+def test_agrees_with_a_sorted_reference_across_levels_and_rotations():
+    rng = random.Random(11)
+    # Small slots so entries cascade through several levels and the overflow slot
+    wheel = TimingWheel(tick_seconds=1, horizon_seconds=40, slots=3, now=0)
+    pending = {}
+    now = 0
+    for step in range(400):
+        action = rng.random()
+        if action < 0.5:
+            key = rng.randrange(30)
+            deadline = now + rng.uniform(-2, 45)
+            pending.pop(key, None)
+            if wheel.schedule(key, deadline):
+                pending[key] = math.ceil(deadline)
+        elif action < 0.6:
+            key = rng.randrange(30)
+            assert wheel.cancel(key) == (pending.pop(key, None) is not None)
+        else:
+            now += rng.choice([0, 1, 2, 7, 30])
+            fired = wheel.advance(now)
+            expected = {key for key, tick in pending.items() if tick <= now}
+            assert set(fired) == expected, f"step {step}"
+            assert [pending[key] for key in fired] == sorted(pending[key] for key in fired)
+            for key in fired:
+                del pending[key]
+        assert len(wheel) == len(pending)
+
+
+def _reminder(reminder_id, seconds, user_id=1, title=None, naive=False):
+    reminder_time = BASE_TIME + timedelta(seconds=seconds)
+    if naive:
+        reminder_time = reminder_time.replace(tzinfo=None)
+    return {"id": reminder_id, "user_id": user_id, "title": title or f"task {reminder_id}",
+            "reminder_time": reminder_time}
+
+
+def _schedule(reminders):
+    schedule = NearTermSchedule(horizon_seconds=300, tick_seconds=1, now=T0)
+    schedule.sync(reminders, now=T0)
+    return schedule
+
+
+def test_sync_splits_reminders_into_due_and_scheduled():
+    schedule = _schedule([_reminder(1, -60), _reminder(2, 30), _reminder(3, 3600)])
+
+    # The reminder past the horizon is left for a later load
+    assert schedule.size == (1, 1)
+    assert [reminder["id"] for reminder in schedule.due_reminders()] == [1]
+
+
+def test_fired_reminders_become_due_only_once_confirmed():
+    schedule = _schedule([_reminder(1, 30), _reminder(2, 30), _reminder(3, 30)])
+    fired = schedule.advance(T0 + 30)
+    assert sorted(fired) == [1, 2, 3]
+    assert schedule.advance(T0 + 31) == []
+
+    # 2 was completed meanwhile and 3 was snoozed by ten minutes (past the horizon from now)
+    schedule.confirm(fired, [_reminder(1, 30), _reminder(3, 30 + 600)], now=T0 + 31)
+    assert [reminder["id"] for reminder in schedule.due_reminders()] == [1]
+    assert schedule.size == (0, 1)
+
+
+def test_snoozed_reminder_within_the_horizon_is_rescheduled():
+    schedule = _schedule([_reminder(1, 30)])
+    fired = schedule.advance(T0 + 30)
+    schedule.confirm(fired, [_reminder(1, 90)], now=T0 + 30)
+
+    assert schedule.due_reminders() == []
+    assert schedule.advance(T0 + 89) == []
+    assert schedule.advance(T0 + 90) == [1]
+
+
+def test_sync_drops_missing_reminders_and_reschedules_moved_ones():
+    schedule = _schedule([_reminder(1, 30), _reminder(2, 60), _reminder(3, -5)])
+    schedule.sync([_reminder(2, 120)], now=T0 + 1)
+
+    assert schedule.size == (1, 0)
+    assert schedule.advance(T0 + 60) == []
+    assert schedule.advance(T0 + 120) == [2]
+
+
+def test_sync_keeps_the_place_of_unmoved_reminders_but_picks_up_edits():
+    schedule = _schedule([_reminder(1, 30), _reminder(2, -5)])
+    schedule.sync([_reminder(1, 30, title="call mom"), _reminder(2, -5, title="pay rent")], now=T0 + 10)
+
+    assert [reminder["title"] for reminder in schedule.due_reminders()] == ["pay rent"]
+    assert schedule.advance(T0 + 30) == [1]
+
+
+def test_users_due_within_looks_only_at_scheduled_reminders():
+    schedule = _schedule([_reminder(1, 20, user_id=7), _reminder(2, 200, user_id=8), _reminder(3, -1, user_id=9)])
+
+    assert schedule.users_due_within(60, now=T0) == {7}
+    assert schedule.users_due_within(300, now=T0) == {7, 8}
+
+
+def test_delivered_reminders_are_forgotten():
+    schedule = _schedule([_reminder(1, -5), _reminder(2, 30)])
+    schedule.delivered([1, 2])
+
+    assert schedule.size == (0, 0)
+    assert schedule.advance(T0 + 30) == []
+
+
+def test_naive_reminder_times_are_utc():
+    schedule = _schedule([_reminder(1, 30, naive=True)])
+
+    assert schedule.advance(T0 + 29) == []
+    assert schedule.advance(T0 + 30) == [1]
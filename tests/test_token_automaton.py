@@ -0,0 +1,100 @@
+"""Tests for components.token_automaton.TokenAutomaton word-level phrase matching."""
+import random
+
+from components.token_automaton import TokenAutomaton, words
+
+
+def test_words_keep_offsets_and_apostrophes():
+    assert words("Call the doctor's office, 9am!") == [
+        ("Call", 0, 4), ("the", 5, 8), ("doctor's", 9, 17), ("office", 18, 24), ("9am", 26, 29)]
+
+
+def test_matches_case_folded_phrases_with_their_offsets():
+    automaton = TokenAutomaton.from_phrases([("New York", "city", None), ("dentist", "task", "dentist")])
+    text = "Dentist in NEW YORK tomorrow"
+
+    assert automaton.find(text) == [(0, 7, "task", "dentist"), (11, 19, "city", "NEW YORK")]
+
+
+def test_case_sensitive_automaton_needs_exact_words():
+    automaton = TokenAutomaton.from_phrases([("May", "month", None)], case_sensitive=True)
+
+    assert automaton.find("you may go") == []
+    assert automaton.find("in May") == [(3, 6, "month", "May")]
+
+
+def test_matches_whole_words_only():
+    automaton = TokenAutomaton.from_phrases([("cat", "animal", None)])
+
+    assert automaton.find("concatenate the category") == []
+
+
+def test_find_all_reports_overlapping_and_nested_phrases():
+    automaton = TokenAutomaton.from_phrases([
+        ("new york", "city", None), ("york", "city", None), ("new york city", "city", None),
+        ("york city", "place", None),
+    ])
+    found = sorted(automaton.find_all("visit new york city"))
+
+    assert found == [(6, 14, "city", "new york"), (6, 19, "city", "new york city"),
+                     (10, 14, "city", "york"), (10, 19, "place", "york city")]
+
+
+def test_find_prefers_leftmost_longest_per_label():
+    automaton = TokenAutomaton.from_phrases([
+        ("new york", "city", None), ("new york city", "city", None), ("york city", "place", None),
+    ])
+
+    assert automaton.find("new york city") == [(0, 13, "city", "new york city"), (4, 13, "place", "york city")]
+
+
+def test_failure_links_recover_after_a_partial_match():
+    automaton = TokenAutomaton.from_phrases([("a b c", "x", None), ("b d", "y", None)])
+
+    assert automaton.find_all("a b d") == [(2, 5, "y", "b d")]
+
+
+def test_phrases_added_after_build_are_matched():
+    automaton = TokenAutomaton.from_phrases([("gym", "place", None)])
+    automaton.add("swimming pool", "place")
+
+    assert [match[3] for match in automaton.find("gym then swimming pool")] == ["gym", "swimming pool"]
+    assert len(automaton) == 2
+
+
+def test_empty_phrase_is_ignored():
+    automaton = TokenAutomaton()
+
+    assert automaton.add("  ...  ", "x") is False
+    assert automaton.find("anything") == []
+    assert len(automaton) == 0
+
+
+def test_same_phrase_with_several_labels_reports_each_once():
+    automaton = TokenAutomaton()
+    automaton.add("paris", "city")
+    automaton.add("Paris", "name")
+    automaton.add("PARIS", "city")
+
+    assert sorted(automaton.find_all("paris")) == [(0, 5, "city", "paris"), (0, 5, "name", "paris")]
+
+
+def test_agrees_with_brute_force_on_random_phrases():
+    rng = random.Random(7)
+    vocabulary = ["a", "b", "c", "d"]
+    phrases = {" ".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 3))) for _ in range(30)}
+    automaton = TokenAutomaton.from_phrases((phrase, "p", None) for phrase in phrases)
+
+    for _ in range(50):
+        tokens = [rng.choice(vocabulary) for _ in range(rng.randint(0, 12))]
+        text = " ".join(tokens)
+        offsets = [start for _, start, _ in words(text)]
+        expected = set()
+        for phrase in phrases:
+            length = len(phrase.split())
+            for index in range(len(tokens) - length + 1):
+                if tokens[index:index + length] == phrase.split():
+                    start = offsets[index]
+                    end = offsets[index + length - 1] + 1
+                    expected.add((start, end, "p", text[start:end]))
+        assert set(automaton.find_all(text)) == expected
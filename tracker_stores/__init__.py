@@ -0,0 +1,3 @@
+"""
+Custom Rasa tracker stores referenced from endpoints.yml.
+"""
@@ -0,0 +1,35 @@
+"""
+Compact the stored history of every conversation, e.g. once after switching to
+CachedSQLTrackerStore:
+
+    python -m tracker_stores --endpoints endpoints.yml
+"""
+import argparse
+import logging
+
+from rasa.core.utils import AvailableEndpoints
+
+from tracker_stores.cached_sql import CachedSQLTrackerStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move events before each conversation's latest session into snapshots")
+    parser.add_argument("--endpoints", default="endpoints.yml", help="Endpoints file with the SQL tracker store")
+    parser.add_argument("--batch-size", type=int, default=500, help="Senders read per query")
+    args = parser.parse_args()
+
+    store_config = AvailableEndpoints.read_endpoints(args.endpoints).tracker_store
+    if store_config is None:
+        raise SystemExit(f"No tracker_store configured in {args.endpoints}")
+
+    store = CachedSQLTrackerStore(host=store_config.url, **store_config.kwargs)
+    moved = store.compact_all(batch_size=args.batch_size)
+    logger.info(f"Compacted {moved} events")
+
+
+if __name__ == "__main__":
+    main()
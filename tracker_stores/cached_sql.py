@@ -0,0 +1,272 @@
+"""
+SQL tracker store with a write-through tracker cache and history compaction.
+
+Rasa's SQLTrackerStore runs two queries over the sender's stored events on every
+turn: one to load the current session, and one to count the stored events
+before appending the new ones. Both grow with the conversation's history, which
+has no bound for long-lived SMS and WhatsApp senders.
+
+CachedSQLTrackerStore keeps the current session of recently active senders in
+process. Retrieving a cached sender needs no query, and saving inserts only the
+events added since the last save. When a new session starts, the events before
+it are moved into a single snapshot row per sender, in a background thread. The
+events table then only holds current sessions, so per-turn cost stays flat as
+conversations age. retrieve_full_tracker() still returns the complete history.
+
+    tracker_store:
+      type: tracker_stores.cached_sql.CachedSQLTrackerStore
+      dialect: "postgresql"
+      url: "localhost"
+      db: "rasa_db"
+      cache_size: 5000
+      cache_ttl: 300
+
+The cache assumes one Rasa server handles a given conversation at a time. With
+several replicas, route senders stickily or set cache_ttl to 0.
+"""
+import json
+import time
+import asyncio
+import logging
+import itertools
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Text
+
+import sqlalchemy as sa
+from rasa.core.brokers.broker import EventBroker
+from rasa.core.tracker_store import SQLTrackerStore
+from rasa.shared.core.domain import Domain
+from rasa.shared.core.events import Event, SessionStarted
+from rasa.shared.core.trackers import DialogueStateTracker
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _CachedSession:
+    """Events of a sender's current session as last saved or loaded."""
+
+    __slots__ = ("events", "stored_at")
+
+    def __init__(self, events: List[Event]):
+        self.events = events
+        self.stored_at = time.monotonic()
+
+
+def _current_session(events: List[Event]) -> List[Event]:
+    # Same cut as SQLTrackerStore's query: from the latest SessionStarted onwards
+    for index in range(len(events) - 1, -1, -1):
+        if isinstance(events[index], SessionStarted):
+            return events[index:]
+    return events
+
+
+class CachedSQLTrackerStore(SQLTrackerStore):
+    """SQLTrackerStore with an in-process cache of current sessions and compaction of older ones."""
+
+    class SQLSnapshot(SQLTrackerStore.Base):
+        """Compacted events of a sender's earlier sessions, oldest first."""
+
+        __tablename__ = "event_snapshots"
+
+        sender_id = sa.Column(sa.String(255), primary_key=True)
+        event_count = sa.Column(sa.Integer, nullable=False)
+        last_timestamp = sa.Column(sa.Float, nullable=False)
+        data = sa.Column(sa.Text, nullable=False)
+
+    def __init__(self, domain: Optional[Domain] = None, dialect: Text = "sqlite", host: Optional[Text] = None,
+                 port: Optional[int] = None, db: Text = "rasa.db", username: Optional[Text] = None,
+                 password: Optional[Text] = None, event_broker: Optional[EventBroker] = None,
+                 login_db: Optional[Text] = None, query: Optional[Dict] = None, cache_size: int = 5000,
+                 cache_ttl: float = 300, compact_on_session_start: bool = True, **kwargs: Dict[Text, Any]):
+        """
+        Initialize the store.
+
+        Args:
+            domain: Domain used to restore slots
+            dialect, host, port, db, username, password, login_db, query: As for SQLTrackerStore
+            event_broker: Broker new events are published to
+            cache_size: Senders whose current session is kept in memory (0 disables the cache)
+            cache_ttl: Seconds a cached session is trusted before it is reloaded (0 disables the cache)
+            compact_on_session_start: Move earlier sessions into a snapshot row when a new session starts
+        """
+        super().__init__(domain=domain, dialect=dialect, host=host, port=port, db=db, username=username,
+                         password=password, event_broker=event_broker, login_db=login_db, query=query, **kwargs)
+        self.cache_size = int(cache_size)
+        self.cache_ttl = float(cache_ttl)
+        self.compact_on_session_start = compact_on_session_start
+        self._cache: "OrderedDict[Text, _CachedSession]" = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # Cache
+
+    def _cached(self, sender_id: Text) -> Optional[_CachedSession]:
+        entry = self._cache.get(sender_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.cache_ttl:
+            del self._cache[sender_id]
+            return None
+        self._cache.move_to_end(sender_id)
+        return entry
+
+    def _remember(self, sender_id: Text, events: List[Event]) -> None:
+        if self.cache_size <= 0 or self.cache_ttl <= 0:
+            return
+        self._cache[sender_id] = _CachedSession(list(events))
+        self._cache.move_to_end(sender_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def forget(self, sender_id: Optional[Text] = None) -> None:
+        """
+        Drop cached sessions, e.g. after editing the events table directly.
+
+        Args:
+            sender_id: Sender to drop (None drops all)
+        """
+        if sender_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(sender_id, None)
+
+    async def retrieve(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        entry = self._cached(sender_id)
+        if entry is not None:
+            self.cache_hits += 1
+            return DialogueStateTracker.from_events(sender_id, list(entry.events), self.domain.slots)
+
+        self.cache_misses += 1
+        tracker = await super().retrieve(sender_id)
+        if tracker is not None:
+            self._remember(sender_id, list(tracker.events))
+        return tracker
+
+    def _additional_events(self, session: "sa.orm.Session", tracker: DialogueStateTracker) -> Iterator:
+        # A tracker built from the cached session starts with exactly the events already stored,
+        # so the new ones follow them and the count query over the sender's events is not needed
+        entry = self._cache.get(tracker.sender_id)
+        if entry is not None and entry.events and len(tracker.events) >= len(entry.events) \
+                and tracker.events[0].timestamp == entry.events[0].timestamp \
+                and tracker.events[len(entry.events) - 1].timestamp == entry.events[-1].timestamp:
+            return itertools.islice(tracker.events, len(entry.events), len(tracker.events))
+        return super()._additional_events(session, tracker)
+
+    async def save(self, tracker: DialogueStateTracker) -> None:
+        previous = self._cache.get(tracker.sender_id)
+        try:
+            await super().save(tracker)
+        except Exception:
+            self.forget(tracker.sender_id)
+            raise
+
+        events = list(tracker.events)
+        session_events = _current_session(events)
+        self._remember(tracker.sender_id, session_events)
+
+        # A SessionStarted among this turn's new events means earlier sessions can be compacted
+        stored_before = len(previous.events) if previous is not None else len(events)
+        new_session = any(isinstance(event, SessionStarted) for event in events[stored_before:])
+        if self.compact_on_session_start and new_session and len(session_events) < len(events):
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(None, self._compact_logged, tracker.sender_id)
+
+    # Compaction
+
+    def _compact_logged(self, sender_id: Text) -> None:
+        try:
+            self.compact(sender_id)
+        except Exception as e:
+            logger.error(f"Compacting tracker history of {sender_id} failed: {e}")
+
+    def compact(self, sender_id: Text) -> int:
+        """
+        Move a sender's events before the latest session start into their snapshot row.
+
+        Args:
+            sender_id: Conversation ID
+
+        Returns:
+            Number of events moved
+        """
+        with self.session_scope() as session:
+            session_start = (
+                session.query(sa.func.max(self.SQLEvent.timestamp))
+                .filter(self.SQLEvent.sender_id == sender_id,
+                        self.SQLEvent.type_name == SessionStarted.type_name)
+                .scalar()
+            )
+            if session_start is None:
+                return 0
+
+            old_events = (
+                session.query(self.SQLEvent)
+                .filter(self.SQLEvent.sender_id == sender_id, self.SQLEvent.timestamp < session_start)
+                .order_by(self.SQLEvent.timestamp, self.SQLEvent.id)
+                .all()
+            )
+            if not old_events:
+                return 0
+
+            snapshot = session.query(self.SQLSnapshot).filter_by(sender_id=sender_id).with_for_update().first()
+            compacted = [json.loads(event.data) for event in old_events]
+            if snapshot is None:
+                snapshot = self.SQLSnapshot(sender_id=sender_id, event_count=0, last_timestamp=0, data="[]")
+                session.add(snapshot)
+            snapshot.data = json.dumps(json.loads(snapshot.data) + compacted)
+            snapshot.event_count += len(compacted)
+            snapshot.last_timestamp = old_events[-1].timestamp
+
+            session.query(self.SQLEvent).filter(
+                self.SQLEvent.id.in_([event.id for event in old_events])
+            ).delete(synchronize_session=False)
+            session.commit()
+
+        logger.debug(f"Compacted {len(compacted)} events of {sender_id} into its snapshot")
+        return len(compacted)
+
+    def compact_all(self, batch_size: int = 500) -> int:
+        """
+        Compact every sender with events before their latest session, e.g. once after switching stores.
+
+        Args:
+            batch_size: Senders read per query
+
+        Returns:
+            Number of events moved
+        """
+        moved = 0
+        last_sender = ""
+        while True:
+            with self.session_scope() as session:
+                senders = [
+                    row[0] for row in
+                    session.query(self.SQLEvent.sender_id)
+                    .filter(self.SQLEvent.type_name == SessionStarted.type_name,
+                            self.SQLEvent.sender_id > last_sender)
+                    .group_by(self.SQLEvent.sender_id)
+                    .having(sa.func.count() > 1)
+                    .order_by(self.SQLEvent.sender_id)
+                    .limit(batch_size)
+                    .all()
+                ]
+            if not senders:
+                break
+            for sender_id in senders:
+                moved += self.compact(sender_id)
+            last_sender = senders[-1]
+            logger.info(f"Compacted {moved} events so far (up to sender {last_sender})")
+        return moved
+
+    async def retrieve_full_tracker(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        tracker = await super().retrieve_full_tracker(sender_id)
+        with self.session_scope() as session:
+            snapshot = session.query(self.SQLSnapshot).filter_by(sender_id=sender_id).first()
+            compacted = json.loads(snapshot.data) if snapshot is not None else []
+        if not compacted:
+            return tracker
+
+        events = compacted + [event.as_dict() for event in (tracker.events if tracker is not None else [])]
+        return DialogueStateTracker.from_dict(sender_id, events, self.domain.slots)